@@ -0,0 +1,363 @@
+"""Local mirror of each Delta Exchange account's open orders and positions.
+
+check_for_open_trades used to ask the REST API (live orders, then the
+position) for every account each time a signal fired. AccountMirror keeps
+that state in memory instead, fed by Delta's private WebSocket:
+
+  * one connection per account authenticates (key-auth), subscribes to the
+    `orders` and `positions` channels and applies their snapshot and
+    create/update/delete events;
+  * an account only answers from memory once both snapshots have arrived
+    since its last (re)connect; until then open_trades() returns None and
+    the bot falls back to the REST check;
+  * every RECONCILE_SECONDS the REST view is fetched and compared; any drift
+    is logged and the REST view replaces the mirror, unless events arrived
+    while the REST calls were in flight (then the next round decides);
+  * a connection silent for HEARTBEAT_TIMEOUT seconds is dropped and redone.
+
+The pre-trade check then is a dictionary lookup. serve_fake_exchange() is a
+local stand-in for the WebSocket that replays order/position events:
+
+    python Archive/account_mirror.py replay                # built-in bracket order scenario
+    python Archive/account_mirror.py replay --events account_events.jsonl
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+
+import websockets
+
+from order_router import product_orders, truncated_key
+
+DELTA_WS_URL = os.environ.get('DELTA_WS_URL', 'wss://socket.india.delta.exchange')
+RECONCILE_SECONDS = float(os.environ.get('ACCOUNT_RECONCILE_SECONDS', 60))
+HEARTBEAT_TIMEOUT = 35      # Delta sends a heartbeat every 30s once enabled
+RECONNECT_SECONDS = 5
+CHANNELS = ('orders', 'positions')
+OPEN_ORDER_STATES = frozenset({'open', 'pending'})
+
+def ws_signature(api_secret, timestamp):
+    """key-auth signature: HMAC-SHA256 of 'GET' + timestamp + '/live'."""
+    return hmac.new(api_secret.encode(), f"GET{timestamp}/live".encode(), hashlib.sha256).hexdigest()
+
+def position_size(position):
+    return float(position.get('size') or 0)
+
+def rest_account_state(client):
+    """(open orders, positions) of one account over REST, in the WebSocket snapshot format."""
+    orders = client.get_live_orders() or []
+    positions = client.request("GET", "/v2/positions/margined", auth=True).json().get('result') or []
+    return orders, positions
+
+class AccountState:
+    """Open orders and non-zero positions of one account, as last reported by the exchange."""
+
+    def __init__(self, api_key):
+        self.account = truncated_key(api_key)
+        self.orders = {}        # order id -> order
+        self.positions = {}     # product_symbol -> signed size
+        self.synced = set()     # channels whose snapshot arrived since the last (re)connect
+        self.events = 0
+        self.updated_at = None
+        self.reconciled = 0
+        self.drifts = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.synced.issuperset(CHANNELS)
+
+    def disconnected(self):
+        with self._lock:
+            self.synced.clear()
+
+    def apply(self, message):
+        """Fold one `orders` / `positions` channel message into the state."""
+        channel, action = message.get('type'), message.get('action')
+        with self._lock:
+            if action == 'snapshot':
+                rows = message.get('result') or []
+                if channel == 'orders':
+                    self.orders = {o['id']: o for o in rows if o.get('state') in OPEN_ORDER_STATES}
+                else:
+                    self.positions = {p['product_symbol']: position_size(p) for p in rows if position_size(p)}
+                self.synced.add(channel)
+            elif channel == 'orders':
+                if action == 'delete' or message.get('state') not in OPEN_ORDER_STATES:
+                    self.orders.pop(message.get('id'), None)
+                else:
+                    self.orders[message['id']] = message
+            elif channel == 'positions':
+                size = 0.0 if action == 'delete' else position_size(message)
+                if size:
+                    self.positions[message['product_symbol']] = size
+                else:
+                    self.positions.pop(message.get('product_symbol'), None)
+            else:
+                return
+            self.events += 1
+            self.updated_at = time.time()
+
+    def open_trades(self, symbol, any_product=False):
+        """(open orders in symbol, or in any product with any_product; position size in symbol), or None while not in sync."""
+        with self._lock:
+            if not self.ready:
+                return None
+            orders = self.orders.values() if any_product else product_orders(self.orders.values(), symbol)
+            return len(orders), self.positions.get(symbol, 0.0)
+
+    def reconcile(self, orders, positions, events_before):
+        """Compare with a REST view fetched since `events_before` events; adopt it if it differs."""
+        rest_orders = {o['id']: o for o in orders if o.get('state', 'open') in OPEN_ORDER_STATES}
+        rest_positions = {p['product_symbol']: position_size(p) for p in positions if position_size(p)}
+        with self._lock:
+            self.reconciled += 1
+            if set(rest_orders) == set(self.orders) and rest_positions == self.positions:
+                return True
+            if self.events != events_before:
+                return None   # the stream moved while REST was in flight; check again next round
+            print(f"Account mirror {self.account}: drift from REST, orders {sorted(self.orders)} -> {sorted(rest_orders)}, "
+                  f"positions {self.positions} -> {rest_positions}; using the REST view.")
+            sys.stdout.flush()
+            self.drifts += 1
+            self.orders, self.positions = rest_orders, rest_positions
+            return False
+
+class AccountMirror:
+    """Keeps an AccountState per client current from the private WebSocket, reconciled over REST."""
+
+    def __init__(self, clients, url=DELTA_WS_URL, reconcile_seconds=RECONCILE_SECONDS,
+                 fetch_state=rest_account_state, on_event=None):
+        self.clients = list(clients)
+        self.url = url
+        self.reconcile_seconds = reconcile_seconds
+        self.fetch_state = fetch_state
+        self.on_event = on_event
+        self.accounts = {c.api_key: AccountState(c.api_key) for c in self.clients}
+        self.connects = 0
+        self._thread = None
+
+    def start(self):
+        """Run the streams and the reconciliation timer on a daemon thread."""
+        self._thread = threading.Thread(target=lambda: asyncio.run(self.run()), name='account-mirror', daemon=True)
+        self._thread.start()
+        return self
+
+    async def run(self):
+        await asyncio.gather(*(self._stream(c) for c in self.clients), self._reconcile_loop())
+
+    async def _stream(self, client):
+        state = self.accounts[client.api_key]
+        while True:
+            try:
+                async with websockets.connect(self.url) as ws:
+                    self.connects += 1
+                    timestamp = str(int(time.time()))
+                    await ws.send(json.dumps({'type': 'key-auth', 'payload': {
+                        'api-key': client.api_key, 'timestamp': timestamp,
+                        'signature': ws_signature(client.api_secret, timestamp)}}))
+                    while True:
+                        raw = await asyncio.wait_for(ws.recv(), HEARTBEAT_TIMEOUT)
+                        try:
+                            message = json.loads(raw)
+                        except ValueError:
+                            print(f"Account mirror {state.account}: skipping malformed message {str(raw)[:200]}")
+                            continue
+                        if message.get('type') in ('key-auth', 'auth'):
+                            if not message.get('success'):
+                                raise ConnectionError(f"authentication refused: {message}")
+                            await ws.send(json.dumps({'type': 'subscribe', 'payload': {'channels': [
+                                {'name': channel, 'symbols': ['all']} for channel in CHANNELS]}}))
+                            await ws.send(json.dumps({'type': 'enable_heartbeat'}))
+                        elif message.get('type') in CHANNELS:
+                            try:
+                                state.apply(message)
+                                if self.on_event:
+                                    self.on_event(state, message)
+                            except (KeyError, TypeError, ValueError, AttributeError) as e:
+                                # One bad event is skipped; the next reconciliation corrects any drift it leaves
+                                print(f"Account mirror {state.account}: skipping {message.get('type')} event ({e!r})")
+                                sys.stdout.flush()
+            except (OSError, ConnectionError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+                print(f"Account mirror {state.account}: connection lost ({e!r}); REST checks until resynced, "
+                      f"reconnecting in {RECONNECT_SECONDS}s")
+                sys.stdout.flush()
+            except Exception as e:
+                print(f"Account mirror {state.account}: stream failed ({e!r}); REST checks until resynced, "
+                      f"reconnecting in {RECONNECT_SECONDS}s")
+                sys.stdout.flush()
+            finally:
+                state.disconnected()
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+    async def _reconcile_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reconcile_seconds)
+            for client in self.clients:
+                state = self.accounts[client.api_key]
+                if not state.ready:
+                    continue
+                events_before = state.events
+                try:
+                    orders, positions = await loop.run_in_executor(None, self.fetch_state, client)
+                    state.reconcile(orders, positions, events_before)
+                except Exception as e:
+                    print(f"Account mirror {state.account}: REST reconciliation failed: {e}")
+                    sys.stdout.flush()
+
+    def open_trades(self, api_key, symbol, any_product=False):
+        """(open order count, position size) for the account from memory, or None if it is not in sync."""
+        state = self.accounts.get(api_key)
+        return state.open_trades(symbol, any_product) if state else None
+
+    def report(self):
+        parts = [f"{s.account} {'in sync' if s.ready else 'NOT in sync'}, {s.events} events, "
+                 f"{s.reconciled} reconciliations, {s.drifts} drifts" for s in self.accounts.values()]
+        return f"Account mirror ({self.connects} connects): " + "; ".join(parts)
+
+# ==== Fake exchange ====
+async def serve_fake_exchange(events, secrets=None, host="127.0.0.1", port=0, delay=0.0,
+                              drop_after=None, reject_first=False):
+    """Start a local stand-in for Delta's private WebSocket.
+
+    key-auth is accepted (and checked against `secrets`, api key -> secret,
+    when given). After a subscribe the server sends a snapshot per channel,
+    then replays `events` (a list of `orders`/`positions` messages, or a
+    dict of such lists per api key) `delay` seconds apart. To exercise
+    reconnects, `reject_first` answers the first handshake with HTTP 503 and
+    `drop_after` closes an account's first connection after that many
+    events; its next connection gets snapshots of the events replayed so far
+    and resumes after them. Returns the server; its URL is
+    f"ws://{host}:{server.sockets[0].getsockname()[1]}".
+    """
+    sent = {}           # api key -> events replayed so far, across connections
+    handshakes = [0]
+
+    def process_request(connection, request):
+        handshakes[0] += 1
+        if reject_first and handshakes[0] == 1:
+            return connection.respond(503, "Service Unavailable\n")
+
+    def snapshots(replay, done):
+        book = AccountState(None)
+        for message in replay[:done]:
+            try:
+                book.apply(message)
+            except (KeyError, TypeError, ValueError, AttributeError):
+                pass
+        orders = [{k: v for k, v in o.items() if k not in ('type', 'action')} for o in book.orders.values()]
+        positions = [{'product_symbol': symbol, 'size': size} for symbol, size in book.positions.items()]
+        return {'orders': orders, 'positions': positions}
+
+    async def handler(ws):
+        try:
+            await session(ws)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def session(ws):
+        api_key = None
+        async for raw in ws:
+            request = json.loads(raw)
+            kind, payload = request.get('type'), request.get('payload') or {}
+            if kind == 'key-auth':
+                api_key = payload.get('api-key')
+                ok = secrets is None or (api_key in secrets and hmac.compare_digest(
+                    payload.get('signature', ''), ws_signature(secrets[api_key], payload.get('timestamp', ''))))
+                await ws.send(json.dumps({'type': 'key-auth', 'success': ok}))
+            elif kind == 'subscribe':
+                channels = [c['name'] for c in payload.get('channels', [])]
+                await ws.send(json.dumps({'type': 'subscriptions', 'channels': payload.get('channels', [])}))
+                replay = events.get(api_key, []) if isinstance(events, dict) else events
+                first = api_key not in sent
+                done = sent.setdefault(api_key, 0)
+                current = snapshots(replay, done)
+                for channel in channels:
+                    await ws.send(json.dumps({'type': channel, 'action': 'snapshot', 'result': current.get(channel, [])}))
+                for message in replay[done:]:
+                    if first and drop_after is not None and sent[api_key] >= drop_after:
+                        await ws.close()
+                        return
+                    sent[api_key] += 1
+                    if message.get('type') in channels:
+                        await ws.send(json.dumps(message))
+                        await asyncio.sleep(delay)
+
+    return await websockets.serve(handler, host, port, process_request=process_request)
+
+def bracket_order_events(symbol='BTCUSD', product_id=27, size=2):
+    """Order and position events of one bracket trade: entry fill, SL/TP resting, stop hit, flat."""
+    def order(order_id, action, state, order_type, stop_order_type=None):
+        return {'type': 'orders', 'action': action, 'id': order_id, 'product_id': product_id,
+                'product_symbol': symbol, 'state': state, 'size': size, 'order_type': order_type,
+                'stop_order_type': stop_order_type}
+    def position(action, position_size):
+        return {'type': 'positions', 'action': action, 'product_id': product_id,
+                'product_symbol': symbol, 'size': position_size}
+    return [
+        order(101, 'create', 'open', 'market_order'),
+        order(102, 'create', 'pending', 'limit_order', 'stop_loss_order'),
+        order(103, 'create', 'pending', 'limit_order', 'take_profit_order'),
+        order(101, 'update', 'closed', 'market_order'),
+        position('create', size),
+        order(102, 'update', 'closed', 'limit_order', 'stop_loss_order'),
+        position('update', 0),
+        order(103, 'update', 'cancelled', 'limit_order', 'take_profit_order'),
+    ]
+
+class _ReplayClient:
+    api_key = 'replay-account-key-0001'
+    api_secret = 'replay-secret'
+
+async def replay(events, delay=0.0, lookups=100000):
+    """Mirror one account against serve_fake_exchange(events), printing its view after every event."""
+    client = _ReplayClient()
+    server = await serve_fake_exchange(events, {client.api_key: client.api_secret}, delay=delay)
+    url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    expected = sum(1 for e in events if e.get('type') in CHANNELS) + len(CHANNELS)   # + the two snapshots
+    done = asyncio.Event()
+
+    def on_event(state, message):
+        print(f"  {message['type']:9s} {message.get('action', ''):8s} -> open orders {sorted(state.orders)}, "
+              f"positions {state.positions}, check {state.open_trades(message.get('product_symbol', 'BTCUSD'))}")
+        if state.events >= expected:
+            done.set()
+
+    mirror = AccountMirror([client], url=url, reconcile_seconds=3600, on_event=on_event)
+    task = asyncio.create_task(mirror.run())
+    try:
+        await asyncio.wait_for(done.wait(), timeout=10 + delay * len(events))
+        started = time.perf_counter()
+        for _ in range(lookups):
+            mirror.open_trades(client.api_key, 'BTCUSD')
+        print(f"Pre-trade check from the mirror: {(time.perf_counter() - started) / lookups * 1e6:.2f} µs per call")
+        print(mirror.report())
+    finally:
+        task.cancel()
+        server.close()
+        await server.wait_closed()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    r = sub.add_parser('replay', help="Mirror a fake exchange replaying order/position events.")
+    r.add_argument('--events', help="JSONL of orders/positions messages (default: a bracket trade on BTCUSD).")
+    r.add_argument('--delay', type=float, default=0.0, help="Seconds between replayed events.")
+    args = parser.parse_args(argv)
+    if args.command == 'replay':
+        if args.events:
+            with open(args.events) as f:
+                events = [json.loads(line) for line in f if line.strip()]
+        else:
+            events = bracket_order_events()
+        asyncio.run(replay(events, args.delay))
+
+if __name__ == "__main__":
+    main()
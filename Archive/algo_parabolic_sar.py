@@ -1,14 +1,20 @@
 import sys
-import time
-import pandas as pd
 import requests
 import datetime
-from ta.trend import PSARIndicator, EMAIndicator, ADXIndicator # Import PSAR, EMA, ADX
-from ta.momentum import RSIIndicator # Import RSI
-from delta_rest_client import DeltaRestClient, OrderType
 import pytz
 import os
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import HttpClient
+from candle_store import RESOLUTION_SECONDS, CandleFetchError, CandleStore, delta_candle_fetcher
+from indicators import IndicatorEngine
+from psar_strategy import bracket_prices, entry_signals, indicators as strategy_indicators
+from scheduler import CandleScheduler
+from order_router import OrderRouter, bracket_order_payload, delta_clients, has_open_trades
+from product_registry import ProductRegistry, delta_product_fetcher
+from account_mirror import AccountMirror
+from resampler import Resampler
+
 # ==== Store all client credentials here ====
 # WARNING: API KEYS AND SECRETS ARE HARDCODED BELOW.
 # THIS IS HIGHLY INSECURE FOR PRODUCTION OR PUBLIC REPOSITORIES.
@@ -58,25 +64,49 @@ order_quantity = 2 # Quantity remains 2 as per your instruction
 # Define the target timezone
 INDIA_TZ = pytz.timezone('Asia/Kolkata')
 
-# ==== Helper Function for Price Rounding ====
-def round_to_tick_size(price, tick_size):
-    """
-    Rounds a price to the nearest multiple of the exchange's tick size.
-    Ensures inputs are floats for division and handles zero tick_size.
-    """
-    try:
-        price_f = float(price)
-        tick_size_f = float(tick_size)
-    except (ValueError, TypeError) as e:
-        print(f"Error converting price ({price}) or tick_size ({tick_size}) to float in round_to_tick_size: {e}")
-        sys.stdout.flush()
-        return float(price) if isinstance(price, (int, float)) else 0.0
+# Shared keep-alive client for Delta Exchange and Telegram (rate limits, retries, latency stats)
+HTTP = HttpClient(headers={'Accept': 'application/json'})
 
-    if tick_size_f == 0:
-        print("Warning: tick_size is zero in round_to_tick_size. Returning original price.")
-        sys.stdout.flush()
-        return price_f
-    return round(price_f / tick_size_f) * tick_size_f
+# Product id and tick size, loaded once and reloaded in the background instead of fetched per order
+PRODUCTS = ProductRegistry(delta_product_fetcher(HTTP)).start()
+
+# One base-resolution history is downloaded and kept; Time_period bars are built
+# from it locally, so changing Time_period needs no new history download.
+BASE_RESOLUTION = Time_period if RESOLUTION_SECONDS[Time_period] < RESOLUTION_SECONDS['5m'] else '5m'
+
+# Fetch enough historical data for all indicators (PSAR, EMAs, ADX, RSI)
+# PSAR needs previous data, ADX needs 2*ADX_PERIOD for good results
+# At least 30 days, and 4x the longest indicator period at Time_period
+required_history_seconds = max(30 * 86400, 4 * max(LONG_EMA_PERIOD, ADX_PERIOD, RSI_PERIOD) * RESOLUTION_SECONDS[Time_period])
+
+# Candles are kept locally (and on disk) and only the bars since the last
+# stored one are fetched each minute, instead of the whole window.
+CANDLES = CandleStore(symbol, BASE_RESOLUTION, delta_candle_fetcher(HTTP),
+                      history_seconds=required_history_seconds + 86400)
+
+# Time_period bars from the base candles; each new base bar only updates the forming bar
+BARS = Resampler(Time_period, BASE_RESOLUTION, max_bars=required_history_seconds // RESOLUTION_SECONDS[Time_period] + 1)
+
+# The parameters above, as passed to the strategy functions shared with the backtester
+STRATEGY = {
+    'PSAR_AF': PSAR_AF, 'PSAR_MAX_AF': PSAR_MAX_AF,
+    'SHORT_EMA_PERIOD': SHORT_EMA_PERIOD, 'LONG_EMA_PERIOD': LONG_EMA_PERIOD,
+    'ADX_PERIOD': ADX_PERIOD, 'ADX_THRESHOLD': ADX_THRESHOLD,
+    'RSI_PERIOD': RSI_PERIOD, 'RSI_OVERBOUGHT': RSI_OVERBOUGHT, 'RSI_OVERSOLD': RSI_OVERSOLD, 'RSI_MIDLINE': RSI_MIDLINE,
+    'TP_RISK_RATIO': TP_RISK_RATIO, 'SL_PERCENTAGE': SL_PERCENTAGE,
+}
+
+# Streaming PSAR/EMA/ADX/RSI: same values as the `ta` indicators, updated once per new candle
+INDICATORS = IndicatorEngine(lambda: strategy_indicators(STRATEGY))
+
+# Wakes once per Time_period candle close (+ CANDLE_SETTLE_SECONDS) instead of polling every second
+SCHEDULER = CandleScheduler(Time_period)
+
+# One cached DeltaRestClient per account; a signal is checked and placed on all accounts in parallel
+ORDERS = OrderRouter(delta_clients(client_credentials))
+
+# Open orders and positions per account, kept current from Delta's private WebSocket
+MIRROR = AccountMirror(ORDERS.clients).start()
 
 # ==== Function to send Telegram messages ====
 def send_telegram_message(message):
@@ -95,9 +125,9 @@ def send_telegram_message(message):
         'parse_mode': 'Markdown' # Optional: allows bold, italics, etc.
     }
     try:
-        response = requests.post(url, json=payload)
+        response = HTTP.post(url, json=payload, timeout=10)
         response.raise_for_status() # Raise an exception for HTTP errors
-        print(f"Telegram message sent successfully.")
+        print("Telegram message sent successfully.")
         sys.stdout.flush()
     except requests.exceptions.RequestException as e:
         print(f"Error sending Telegram message: {e}")
@@ -110,45 +140,17 @@ def send_telegram_message(message):
 # ==== Function to check for open orders and positions ====
 def check_for_open_trades(client, symbol):
     """
-    Checks if there are any open orders or current positions for the given symbol
-    for a specific client account.
+    Checks if there are any open orders, or a current position in the given symbol,
+    for a specific client account (see order_router.has_open_trades).
     Args:
         client (DeltaRestClient): An initialized DeltaRestClient instance.
         symbol (str): The trading pair symbol.
     Returns:
         bool: True if there are open orders or a non-zero position, False otherwise.
     """
-    truncated_api_key = client.api_key[:6] + '...' + client.api_key[-4:] if client.api_key else "N/A"
-    try:
-        open_orders_response = client.get_live_orders()
-        if open_orders_response and isinstance(open_orders_response, list) and len(open_orders_response) > 0:
-            print(f"Client {truncated_api_key}: Found {len(open_orders_response)} open order(s). Skipping new order.")
-            sys.stdout.flush()
-            return True
-
-        product = client.get_product(symbol)
-        market_id = product['id']
-
-        position_response = client.get_position(product_id=market_id)
-
-        if position_response and isinstance(position_response, dict) and 'size' in position_response:
-            position_size = float(position_response.get('size', 0))
-            if abs(position_size) > 0:
-                print(f"Client {truncated_api_key}: Found an open position of size {position_size} for {symbol}. Skipping new order.")
-                sys.stdout.flush()
-                return True
-
-        print(f"Client {truncated_api_key}: No open orders or current positions found. Ready to place new order.")
-        sys.stdout.flush()
-        return False
-
-    except Exception as e:
-        print(f"Client {truncated_api_key}: Error checking for open trades: {e}")
-        sys.stdout.flush()
-        import traceback
-        traceback.print_exc()
-        sys.stdout.flush()
-        return True
+    # From the local mirror when it is in sync with the exchange (see Archive/account_mirror.py), else over REST.
+    # Any open order on the account blocks a new entry, whatever its product.
+    return has_open_trades(client, symbol, PRODUCTS, MIRROR, any_product=True)
 
 
 # ==== Trade Execution Function ====
@@ -163,56 +165,35 @@ def place_order(client, side, symbol, size, entry_price_estimate, stop_loss_pric
         entry_price_estimate (float): The estimated entry price (e.g., current close).
         stop_loss_price (float): The calculated Stop Loss price.
         take_profit_price (float): The calculated Take Profit price.
+    Returns:
+        dict: The order as sent (entry estimate, rounded SL/TP) with the exchange response, or None if it failed.
     """
     truncated_api_key = client.api_key[:6] + '...' + client.api_key[-4:] if client.api_key else "N/A"
     try:
-        product = client.get_product(symbol)
+        # From memory, no REST call on the order path (see Archive/product_registry.py)
+        product = PRODUCTS.get(symbol)
         market_id = product['id']
-        tick_size = product.get('tick_size', 0.01)
 
         print(f"Client {truncated_api_key}: Preparing bracket order for {symbol} with market ID: {market_id}")
         sys.stdout.flush()
 
-        if side not in ['buy', 'sell']:
-            raise ValueError("Invalid side, must be 'buy' or 'sell'")
-
-        # Round SL/TP to tick size
-        stop_loss_price = round_to_tick_size(stop_loss_price, tick_size)
-        take_profit_price = round_to_tick_size(take_profit_price, tick_size)
+        # Round SL/TP to tick size, as in the runner's orders (order_router.bracket_order_payload)
+        payload = bracket_order_payload(product, side, size, stop_loss_price, take_profit_price)
+        stop_loss_price, take_profit_price = payload['bracket_stop_loss_price'], payload['bracket_take_profit_price']
 
         print(f"Client {truncated_api_key}: Calculated Entry Estimate: {entry_price_estimate:.2f}, SL: {stop_loss_price:.2f}, TP: {take_profit_price:.2f}")
         sys.stdout.flush()
 
-        payload = {
-            "product_id": market_id,
-            "size": size,
-            "side": side,
-            "order_type": "market_order",
-            "post_only": False,
-            "bracket_stop_loss_price": stop_loss_price,
-            "bracket_take_profit_price": take_profit_price,
-            "bracket_stop_loss_limit_price": stop_loss_price, # Assuming limit price is same as trigger price for simplicity
-            "bracket_take_profit_limit_price": take_profit_price, # Assuming limit price is same as trigger price for simplicity
-        }
-
         response = client.request("POST", "/v2/orders", payload, auth=True)
         order_response_data = response.json()
         print(f"Client {truncated_api_key}: Bracket order placed for {side.upper()}. Response: {order_response_data}")
         sys.stdout.flush()
-
-        # Send Telegram notification after successful order placement
-        telegram_message = (
-            f"🔔 *TRADE ALERT!* 🔔\n"
-            f"Client: `{truncated_api_key}`\n"
-            f"Symbol: `{symbol}`\n"
-            f"Side: *{side.upper()}*\n"
-            f"Quantity: `{size}`\n"
-            f"Entry Est: `{entry_price_estimate:.2f}`\n"
-            f"SL: `{stop_loss_price:.2f}`\n"
-            f"TP: `{take_profit_price:.2f}`\n"
-            f"Response: ```json\n{order_response_data}\n```"
-        )
-        send_telegram_message(telegram_message)
+        return {
+            'entry_price_estimate': entry_price_estimate,
+            'stop_loss_price': stop_loss_price,
+            'take_profit_price': take_profit_price,
+            'response': order_response_data,
+        }
 
     except Exception as e:
         print(f"Client {truncated_api_key}: Order failed: {e}")
@@ -228,214 +209,121 @@ def place_order(client, side, symbol, size, entry_price_estimate, stop_loss_pric
             f"Error: `{e}`"
         )
         send_telegram_message(telegram_error_message)
+        return None
+
+
+def send_trade_alert(truncated_api_key, side, symbol, size, order):
+    """Telegram notification for an order returned by place_order (sent once every account has been routed)."""
+    telegram_message = (
+        f"🔔 *TRADE ALERT!* 🔔\n"
+        f"Client: `{truncated_api_key}`\n"
+        f"Symbol: `{symbol}`\n"
+        f"Side: *{side.upper()}*\n"
+        f"Quantity: `{size}`\n"
+        f"Entry Est: `{order['entry_price_estimate']:.2f}`\n"
+        f"SL: `{order['stop_loss_price']:.2f}`\n"
+        f"TP: `{order['take_profit_price']:.2f}`\n"
+        f"Response: ```json\n{order['response']}\n```"
+    )
+    send_telegram_message(telegram_message)
 
 
 # ==== Main Loop ====
 while True:
+    # Sleep until the next Time_period candle has closed, plus a settle delay
+    candle_close = SCHEDULER.wait()
+
+    if candle_close % 3600 == 0: # Hourly HTTP latency and scheduler summary, before any `continue` below can skip it
+        HTTP.print_latency_report()
+        ORDERS.print_latency_report()
+        print(PRODUCTS.report())
+        print(MIRROR.report())
+        print(SCHEDULER.report())
+        sys.stdout.flush()
+
     # Get current time in UTC, then convert to India timezone
     current_utc_time = datetime.datetime.now(pytz.utc)
     current_ist_time = current_utc_time.astimezone(INDIA_TZ)
+    sys.stdout.flush()
 
-    cmin = current_ist_time.strftime("%M")
-    csec = current_ist_time.strftime("%S")
-
-    time.sleep(1)
-
-    if int(cmin) % 1 == 0 and int(csec) == 6: # Execute at 6 seconds past every minute
-        sys.stdout.flush()
-
-        # Fetch enough historical data for all indicators (PSAR, EMAs, ADX, RSI)
-        # PSAR needs previous data, ADX needs 2*ADX_PERIOD for good results
-
-        # Set timedelta for sufficient data
-        # INCREASED REQUIRED HISTORY DAYS FOR MORE ROBUST INDICATOR CALCULATION
-        required_history_days = 90 # Default to a higher value for safety, adjust as needed per Time_period
-        if Time_period == '5m':
-            required_history_days = 30 # Current value is 30 days. Consider increasing if data is still insufficient.
-        elif Time_period == '1h':
-            required_history_days = 60
-        elif Time_period == '1d':
-            required_history_days = 500
-
-        start_date = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=required_history_days), datetime.time(0, 0, 0))
-        start_timestamp = int(pytz.utc.localize(start_date).timestamp())
-        end_timestamp = int(datetime.datetime.now(pytz.utc).timestamp())
-
-        headers = {'Accept': 'application/json'}
-        r = requests.get(
-            'https://api.india.delta.exchange/v2/history/candles',
-            params={'resolution': Time_period, 'symbol': symbol, 'start': start_timestamp, 'end': end_timestamp},
-            headers=headers
-        )
+    try:
+        CANDLES.sync()
+        fetch_error = None
+    except CandleFetchError as e:
+        fetch_error = e
+
+    if fetch_error is None:
+        # Ensure enough data for all calculations, including PSAR initial period
+        # Roughly doubled for robustness is a good heuristic.
+        # ADX_PERIOD * 2 or similar is often needed for indicators to stabilize.
+        min_data_needed = max(LONG_EMA_PERIOD, ADX_PERIOD, RSI_PERIOD) * 2
+
+        bars = BARS.sync(CANDLES.data)
+        if len(bars) < min_data_needed:
+            print(f"Not enough historical data ({len(bars)} candles) from API to calculate all indicators. Need at least {min_data_needed}. Waiting for more data.")
+            sys.stdout.flush()
+            continue
+
+        # ==== Calculate Indicators ====
+        # Only bars closed since the last tick are folded into the indicator state;
+        # the signal is evaluated on the two most recently closed candles.
+        if not BARS.complete(candle_close):
+            bars = bars[bars['time'] < candle_close - BARS.step] # Its last base bar is not out yet: not a new candle
+        previous, latest = INDICATORS.sync(bars, until=candle_close)[-2:] # For comparing PSAR flip and EMA crossover
+        if not SCHEDULER.new_bar(latest['time']):
+            print(f"> No new {Time_period} candle closed since the last evaluation. Skipping.")
+            sys.stdout.flush()
+            continue
 
-        if r.status_code == 200 and 'result' in r.json():
-            candles_data = r.json()['result']
-            if not candles_data: # Check if candles_data is empty
-                print("No candles data returned from API. Waiting for next interval.")
-                sys.stdout.flush()
-                time.sleep(55)
-                continue
-
-            df = pd.DataFrame(candles_data)
-            df['date_time'] = pd.to_datetime(df['time'], unit='s').dt.tz_localize('UTC').dt.tz_convert(INDIA_TZ).dt.tz_localize(None)
-            df = df.sort_values(by='time', ascending=True).reset_index(drop=True)
-
-            # Ensure enough data for all calculations, including PSAR initial period
-            # Roughly doubled for robustness is a good heuristic.
-            # ADX_PERIOD * 2 or similar is often needed for indicators to stabilize.
-            min_data_needed = max(LONG_EMA_PERIOD, ADX_PERIOD, RSI_PERIOD) * 2
-
-            if len(df) < min_data_needed:
-                print(f"Not enough historical data ({len(df)} candles) from API to calculate all indicators. Need at least {min_data_needed}. Waiting for more data.")
-                sys.stdout.flush()
-                time.sleep(55)
-                continue
-
-            # ==== Calculate Indicators ====
-            # PSAR
-            psar_indicator = PSARIndicator(
-                high=df['high'],
-                low=df['low'],
-                close=df['close'],
-                step=PSAR_AF,
-                max_step=PSAR_MAX_AF
-            )
-            df['psar'] = psar_indicator.psar()
-            df['psar_up'] = psar_indicator.psar_up()
-            df['psar_down'] = psar_indicator.psar_down()
-
-            # EMAs
-            df['short_ema'] = EMAIndicator(df.close, SHORT_EMA_PERIOD).ema_indicator()
-            df['long_ema'] = EMAIndicator(df.close, LONG_EMA_PERIOD).ema_indicator()
-
-            # ADX
-            adx_indicator = ADXIndicator(
-                high=df['high'],
-                low=df['low'],
-                close=df['close'],
-                window=ADX_PERIOD
-            )
-            df['adx'] = adx_indicator.adx()
-            df['plus_di'] = adx_indicator.adx_pos()
-            df['minus_di'] = adx_indicator.adx_neg()
+        # PSAR_up and PSAR_down are designed to have NaNs when not active, so don't check them.
+        columns_to_check_for_nan = ['psar', 'short_ema', 'long_ema', 'adx', 'rsi']
+        if latest[columns_to_check_for_nan].isna().any() or previous[columns_to_check_for_nan].isna().any():
+            print("Indicators are still warming up. Not enough valid data for a signal.")
+            sys.stdout.flush()
+            continue
 
-            # RSI
-            df['rsi'] = RSIIndicator(df.close, RSI_PERIOD).rsi()
+        latest['date_time'] = datetime.datetime.fromtimestamp(latest['time'], INDIA_TZ).replace(tzinfo=None)
 
-            # --- CRITICAL FIX: Only drop NaNs from relevant indicator columns ---
-            # PSAR_up and PSAR_down are designed to have NaNs when not active, so don't drop based on them.
-            columns_to_check_for_nan = ['psar', 'short_ema', 'long_ema', 'adx', 'rsi']
-            df_cleaned = df.dropna(subset=columns_to_check_for_nan).reset_index(drop=True)
+        print(f"> Running PSAR algo at: [{current_ist_time.strftime('%H:%M:%S')}]. Latest Close: {latest['close']:.2f}, PSAR: {latest['psar']:.2f}, ADX: {latest['adx']:.2f}, RSI: {latest['rsi']:.2f}")
+        sys.stdout.flush()
 
-            if df_cleaned.empty or len(df_cleaned) < 2: # Need at least two clean rows for comparison
-                print(f"DataFrame is empty or has insufficient rows after dropping NaN values from indicators. Not enough valid data for a signal.")
-                sys.stdout.flush()
-                time.sleep(55)
-                continue
+        signal_type = None
+        entry_price = float(latest['close']) # Default entry price
 
-            latest = df_cleaned.iloc[-1]
-            previous = df_cleaned.iloc[-2] # For comparing PSAR flip and EMA crossover
+        # ==== Signal Logic (Parabolic SAR with ADX, EMA, and RSI Filters) ====
+        # Shared with Archive/backtest.py, see psar_strategy.entry_signals
+        buy_signal, sell_signal = entry_signals(latest, previous, STRATEGY)
+        if buy_signal:
+            signal_type = 'buy'
+        if sell_signal:
+            signal_type = 'sell'
 
-            print(f"> Running PSAR algo at: [{current_ist_time.strftime('%H:%M:%S')}]. Latest Close: {latest['close']:.2f}, PSAR: {latest['psar']:.2f}, ADX: {latest['adx']:.2f}, RSI: {latest['rsi']:.2f}")
+        if signal_type:
+            print(f"{signal_type.upper()} 🔔signal detected at {latest['date_time']} (Close: {latest['close']:.2f})")
             sys.stdout.flush()
 
-            signal_type = None
-            entry_price = float(latest['close']) # Default entry price
-
-            # ==== Signal Logic (Parabolic SAR with ADX, EMA, and RSI Filters) ====
-
-            # General trend determination using EMAs
-            is_uptrend_ema = latest['short_ema'] > latest['long_ema'] and previous['short_ema'] > previous['long_ema']
-            is_downtrend_ema = latest['short_ema'] < latest['long_ema'] and previous['short_ema'] < previous['long_ema']
-            is_choppy_ema = not is_uptrend_ema and not is_downtrend_ema # EMAs are crossed or very close
-
-            # ADX filtering for trend strength
-            is_strong_trend = latest['adx'] > ADX_THRESHOLD
-
-            # Buy Signal Conditions
-            # 1. PSAR flips from above to below price (bullish flip)
-            psar_buy_flip = (previous['psar'] > previous['close'] and latest['psar'] < latest['close']) or \
-                            (pd.isna(previous['psar_down']) and pd.notna(latest['psar_up'])) # Check for initial PSAR up trend
-
-            # 2. EMA confirmation: Short EMA is above Long EMA or just crossed over
-            ema_buy_confirmation = (latest['short_ema'] > latest['long_ema']) or \
-                                   (previous['short_ema'] <= previous['long_ema'] and latest['short_ema'] > latest['long_ema'])
-
-            # 3. RSI confirmation: Not overbought, and showing bullish momentum
-            rsi_buy_confirmation = latest['rsi'] < RSI_OVERBOUGHT and latest['rsi'] > RSI_MIDLINE
-
-            if psar_buy_flip and ema_buy_confirmation and rsi_buy_confirmation and is_strong_trend:
-                signal_type = 'buy'
-                # print(f"DEBUG: BUY conditions met: PSAR Flip ({psar_buy_flip}), EMA Confirm ({ema_buy_confirmation}), RSI Confirm ({rsi_buy_confirmation}), Strong Trend ({is_strong_trend})") # Debug Print removed
-                sys.stdout.flush()
-
-            # Sell Signal Conditions
-            # 1. PSAR flips from below to above price (bearish flip)
-            psar_sell_flip = (previous['psar'] < previous['close'] and latest['psar'] > latest['close']) or \
-                             (pd.isna(previous['psar_up']) and pd.notna(latest['psar_down'])) # Check for initial PSAR down trend
-
-            # 2. EMA confirmation: Short EMA is below Long EMA or just crossed over
-            ema_sell_confirmation = (latest['short_ema'] < latest['long_ema']) or \
-                                    (previous['short_ema'] >= previous['long_ema'] and latest['short_ema'] < latest['long_ema'])
-
-            # 3. RSI confirmation: Not oversold, and showing bearish momentum
-            rsi_sell_confirmation = latest['rsi'] > RSI_OVERSOLD and latest['rsi'] < RSI_MIDLINE
-
-
-            if psar_sell_flip and ema_sell_confirmation and rsi_sell_confirmation and is_strong_trend:
-                signal_type = 'sell'
-                # print(f"DEBUG: SELL conditions met: PSAR Flip ({psar_sell_flip}), EMA Confirm ({ema_sell_confirmation}), RSI Confirm ({rsi_sell_confirmation}), Strong Trend ({is_strong_trend})") # Debug Print removed
-                sys.stdout.flush()
-
-            if signal_type:
-                print(f"{signal_type.upper()} 🔔signal detected at {latest['date_time']} (Close: {latest['close']:.2f})")
-                sys.stdout.flush()
-
-                # Calculate SL/TP based on percentage logic from entry_price
-                stop_loss_price = 0.0
-                take_profit_price = 0.0
-
-                if signal_type == 'buy':
-                    stop_loss_price = entry_price * (1 - SL_PERCENTAGE)
-                    risk_points = entry_price - stop_loss_price
-                    take_profit_price = entry_price + (risk_points * TP_RISK_RATIO)
-                elif signal_type == 'sell':
-                    stop_loss_price = entry_price * (1 + SL_PERCENTAGE)
-                    risk_points = stop_loss_price - entry_price
-                    take_profit_price = entry_price - (risk_points * TP_RISK_RATIO)
-
-                # Ensure risk_points is positive for calculation
-                if risk_points <= 0:
-                    # Fallback to a very small percentage if risk is invalid (e.g., if SL_PERCENTAGE is 0)
-                    risk_points = entry_price * 0.001
-                    if signal_type == 'buy':
-                        stop_loss_price = entry_price - risk_points
-                        take_profit_price = entry_price + (risk_points * TP_RISK_RATIO)
-                    else: # sell
-                        stop_loss_price = entry_price + risk_points
-                        take_profit_price = entry_price - (risk_points * TP_RISK_RATIO)
-                    print(f"Adjusted risk points due to initial non-positive value. New risk: {risk_points:.2f}")
-                    sys.stdout.flush()
-
-                for creds in client_credentials:
-                    client = DeltaRestClient(
-                        base_url='https://api.india.delta.exchange',
-                        api_key=creds['api_key'],
-                        api_secret=creds['api_secret']
-                    )
-                    if not check_for_open_trades(client, symbol):
-                        place_order(client, signal_type, symbol, order_quantity, entry_price, stop_loss_price, take_profit_price)
-                    else:
-                        truncated_api_key = client.api_key[:6] + '...' + client.api_key[-4:]
-                        print(f"Client {truncated_api_key}: Skipping order placement due to existing open trades.")
-                        sys.stdout.flush()
-            else:
-                print(f"> No trade signal detected for PSAR algo at: [{current_ist_time.strftime('%H:%M:%S')}]")
-                sys.stdout.flush()
+            # Calculate SL/TP based on percentage logic from entry_price
+            stop_loss_price, take_profit_price = bracket_prices(signal_type == 'buy', latest, STRATEGY)
 
+            # Every account is checked and submitted at once (see Archive/order_router.py)
+            results = ORDERS.route(
+                lambda client: check_for_open_trades(client, symbol),
+                lambda client: place_order(client, signal_type, symbol, order_quantity, entry_price, stop_loss_price, take_profit_price),
+            )
+            for result in results:
+                if result.outcome == 'placed':
+                    send_trade_alert(result.account, signal_type, symbol, order_quantity, result.order)
+                elif result.outcome == 'open_trades':
+                    print(f"Client {result.account}: Skipping order placement due to existing open trades.")
+                    sys.stdout.flush()
+                elif result.outcome in ('timeout', 'busy', 'error'):
+                    send_telegram_message(f"⚠️ *ORDER NOT CONFIRMED* ⚠️\nClient: `{result.account}`\nSymbol: `{symbol}`\n"
+                                          f"Side: *{signal_type.upper()}*\nStatus: `{result.outcome}`")
         else:
-            print(f"Error fetching data: {r.status_code}. Response: {r.text}")
+            print(f"> No trade signal detected for PSAR algo at: [{current_ist_time.strftime('%H:%M:%S')}]")
             sys.stdout.flush()
-            send_telegram_message(f"❌ *Data Fetch Error!* ❌\nStatus Code: `{r.status_code}`\nResponse: `{r.text}`")
 
-        time.sleep(55) # Sleep for almost the rest of the minute
+    else:
+        print(f"Error fetching data: {fetch_error.status_code}. Response: {fetch_error.text}")
+        sys.stdout.flush()
+        send_telegram_message(f"❌ *Data Fetch Error!* ❌\nStatus Code: `{fetch_error.status_code}`\nResponse: `{fetch_error.text}`")
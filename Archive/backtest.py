@@ -0,0 +1,214 @@
+"""Vectorized backtest of the bots' strategies over a candle history.
+
+The indicators come from indicators.indicator_columns() (the same values
+the live IndicatorEngine produces) and the entries from the strategy
+module's entry_signals() (psar_strategy for algo_parabolic_sar.py,
+rsi_adx_strategy for trading_bot.py), evaluated on every closed candle at
+once. Each entry is filled at the signal candle's close with the bot's
+bracket:
+
+  * exits are found with a vectorized first-touch search: the bars after
+    every candidate entry are scanned in blocks of growing width for the
+    first one whose range reaches the stop or the target. When a bar
+    reaches both, the stop is assumed to come first; a bar opening beyond
+    a level fills at its open;
+  * like the bot, which skips a signal while a trade is open, an entry is
+    only taken at or after the candle where the previous trade exited.
+
+    python Archive/backtest.py --candles Archive/candles_BTCUSD_5m.npy
+    python Archive/backtest.py --bars 105120          # a year of synthetic 5m bars
+    python Archive/backtest.py --strategy rsi_adx
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import psar_strategy
+import rsi_adx_strategy
+from indicators import IndicatorEngine, indicator_columns, load_candles, random_walk_candles
+
+FEE_RATE = 0.0005             # per side, on notional (Delta taker fee)
+FIRST_TOUCH_BLOCK = 64        # bars scanned per entry in the first block; doubles for unresolved entries
+FIRST_TOUCH_MAX_CELLS = 4_000_000
+
+STRATEGIES = {
+    'psar': psar_strategy,
+    'rsi_adx': rsi_adx_strategy,
+}
+
+def shifted(columns):
+    """The previous candle's value for every column (NaN for the first candle)."""
+    out = {}
+    for name, values in columns.items():
+        values = np.asarray(values, dtype=float)
+        out[name] = np.concatenate([[np.nan], values[:-1]])
+    return out
+
+def strategy_entries(candles, strategy=psar_strategy, params=None, columns=None):
+    """(buy, sell) boolean arrays, one per candle, as the live bot would signal at that candle's close."""
+    params = params or strategy.DEFAULT_PARAMS
+    if columns is None:
+        columns = indicator_columns(candles, lambda: strategy.indicators(params))
+    latest = dict(columns, **{field: np.asarray(candles[field], dtype=float)
+                              for field in ('open', 'high', 'low', 'close', 'volume')})
+    previous = shifted(latest)
+    buy, sell = strategy.entry_signals(latest, previous, params)
+    ready = np.ones(len(candles), dtype=bool)
+    for name in strategy.REQUIRED_COLUMNS:
+        ready &= ~np.isnan(latest[name]) & ~np.isnan(previous[name])
+    return buy & ready, sell & ready
+
+def first_touch(high, low, entries, is_long, stop, target):
+    """For each entry bar: (exit bar, stopped out?) of the first later bar reaching stop or target; exit -1 if none."""
+    n = len(high)
+    exit_bar = np.full(len(entries), -1)
+    stopped = np.zeros(len(entries), dtype=bool)
+    pending = np.arange(len(entries))
+    offset, block = 1, FIRST_TOUCH_BLOCK
+    while pending.size and offset < n:
+        width = max(1, min(block, FIRST_TOUCH_MAX_CELLS // pending.size, n - offset))
+        bars = entries[pending, None] + offset + np.arange(width)
+        inside = bars < n
+        bars = np.minimum(bars, n - 1)
+        h, l = high[bars], low[bars]
+        long_ = is_long[pending, None]
+        s, t = stop[pending, None], target[pending, None]
+        stop_hit = inside & np.where(long_, l <= s, h >= s)
+        hit = stop_hit | (inside & np.where(long_, h >= t, l <= t))
+        found = hit.any(axis=1)
+        first = hit.argmax(axis=1)
+        rows = np.nonzero(found)[0]
+        exit_bar[pending[rows]] = bars[rows, first[rows]]
+        stopped[pending[rows]] = stop_hit[rows, first[rows]]
+        pending = pending[~found]
+        offset += width
+        block *= 2
+    return exit_bar, stopped
+
+def simulate(candles, buy, sell, strategy=psar_strategy, params=None, fee_rate=FEE_RATE):
+    """Trades (DataFrame) taken from the buy/sell signals with the bot's bracket and one position at a time."""
+    params = params or strategy.DEFAULT_PARAMS
+    open_, high, low, close = (np.asarray(candles[f], dtype=float) for f in ('open', 'high', 'low', 'close'))
+    entries = np.nonzero(buy | sell)[0]
+    is_long = ~sell[entries]   # the bot checks sell after buy, so sell wins a tie
+    entry_price = close[entries]
+    signal_candles = {'close': entry_price, 'low': low[entries], 'high': high[entries]}
+    stop, target = strategy.bracket_prices(is_long, signal_candles, params)
+    exit_bar, stopped = first_touch(high, low, entries, is_long, stop, target)
+
+    # One position at a time: skip entries before the previous trade's exit candle.
+    taken = []
+    free_from = 0
+    for k, bar in enumerate(entries.tolist()):
+        if bar < free_from:
+            continue
+        taken.append(k)
+        if exit_bar[k] < 0:
+            break   # still open at the end of the history
+        free_from = exit_bar[k]
+    taken = np.array(taken, dtype=int)
+
+    entries, is_long, entry_price = entries[taken], is_long[taken], entry_price[taken]
+    stop, target, exit_bar, stopped = stop[taken], target[taken], exit_bar[taken], stopped[taken]
+    closed = exit_bar >= 0
+    bar = np.where(closed, exit_bar, len(close) - 1)
+    level = np.where(stopped, stop, target)
+    # A bar opening beyond the level fills at its open.
+    gapped = np.where(is_long == stopped, open_[bar] < level, open_[bar] > level)
+    exit_price = np.where(closed, np.where(gapped, open_[bar], level), close[-1])
+    direction = np.where(is_long, 1.0, -1.0)
+    pnl = direction * (exit_price - entry_price) - fee_rate * (entry_price + exit_price)
+    times = np.asarray(candles['time'])
+    return pd.DataFrame({
+        'entry_time': times[entries],
+        'exit_time': times[bar],
+        'side': np.where(is_long, 'buy', 'sell'),
+        'entry': entry_price,
+        'stop_loss': stop,
+        'take_profit': target,
+        'exit': exit_price,
+        'outcome': np.where(~closed, 'open', np.where(stopped, 'stop', 'target')),
+        'bars_held': bar - entries,
+        'pnl': pnl,
+        'return_pct': pnl / entry_price * 100,
+    })
+
+def summarize(trades):
+    """PnL, win rate and drawdown of the closed trades (PnL in price points per 1 unit traded)."""
+    closed = trades[trades['outcome'] != 'open']
+    pnl = closed['pnl'].to_numpy()
+    equity = np.cumsum(pnl)
+    drawdown = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:] - equity
+    growth = np.cumprod(1 + closed['return_pct'].to_numpy() / 100)
+    peak = np.maximum.accumulate(np.concatenate([[1.0], growth]))[1:]
+    wins, losses = pnl[pnl > 0], pnl[pnl <= 0]
+    return {
+        'trades': len(closed),
+        'open_trades': len(trades) - len(closed),
+        'win_rate_pct': 100 * len(wins) / len(pnl) if len(pnl) else 0.0,
+        'total_pnl': float(pnl.sum()),
+        'total_return_pct': float((growth[-1] - 1) * 100) if len(growth) else 0.0,
+        'avg_trade': float(pnl.mean()) if len(pnl) else 0.0,
+        'profit_factor': float(wins.sum() / -losses.sum()) if losses.sum() < 0 else float('inf'),
+        'max_drawdown': float(drawdown.max()) if len(drawdown) else 0.0,
+        'max_drawdown_pct': float(((peak - growth) / peak).max() * 100) if len(growth) else 0.0,
+        'avg_bars_held': float(closed['bars_held'].mean()) if len(closed) else 0.0,
+    }
+
+def backtest(candles, strategy=psar_strategy, params=None, columns=None, fee_rate=FEE_RATE):
+    """(trades, summary) of a strategy module over a CANDLE_DTYPE array."""
+    buy, sell = strategy_entries(candles, strategy, params, columns)
+    trades = simulate(candles, buy, sell, strategy, params, fee_rate)
+    return trades, summarize(trades)
+
+def check_against_live(candles, strategy=psar_strategy, params=None, closes=500):
+    """Replay the last `closes` candle closes through IndicatorEngine and entry_signals like the bot; returns mismatches."""
+    params = params or strategy.DEFAULT_PARAMS
+    buy, sell = strategy_entries(candles, strategy, params)
+    required = list(strategy.REQUIRED_COLUMNS)
+    engine = IndicatorEngine(lambda: strategy.indicators(params))
+    mismatches = 0
+    for i in range(max(2, len(candles) - closes), len(candles)):
+        previous, latest = engine.sync(candles[:i + 1])[-2:]
+        ready = not (latest[required].isna().any() or previous[required].isna().any())
+        live_buy, live_sell = strategy.entry_signals(latest, previous, params)
+        mismatches += (bool(live_buy and ready), bool(live_sell and ready)) != (bool(buy[i]), bool(sell[i]))
+    return mismatches
+
+def print_summary(summary, candles, elapsed):
+    days = (int(candles['time'][-1]) - int(candles['time'][0])) / 86400 if len(candles) else 0
+    print(f"{len(candles)} candles ({days:.0f} days) backtested in {elapsed * 1000:.0f} ms")
+    print(f"Trades: {summary['trades']} closed, {summary['open_trades']} open | "
+          f"win rate {summary['win_rate_pct']:.1f}% | avg hold {summary['avg_bars_held']:.1f} bars")
+    print(f"PnL: {summary['total_pnl']:.2f} points ({summary['total_return_pct']:.2f}% compounded) | "
+          f"avg trade {summary['avg_trade']:.2f} | profit factor {summary['profit_factor']:.2f}")
+    print(f"Max drawdown: {summary['max_drawdown']:.2f} points ({summary['max_drawdown_pct']:.2f}%)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--strategy', choices=STRATEGIES, default='psar')
+    parser.add_argument('--candles', help="CandleStore .npy or candles API .json; a seeded random walk if omitted.")
+    parser.add_argument('--bars', type=int, default=105120, help="Random-walk length (default: a year of 5m bars).")
+    parser.add_argument('--fee', type=float, default=FEE_RATE, help="Fee rate per side.")
+    parser.add_argument('--trades', help="Write the trade list to this CSV.")
+    parser.add_argument('--check-live', type=int, metavar='CLOSES',
+                        help="Also replay the last CLOSES closes through the live signal path and compare.")
+    args = parser.parse_args(argv)
+
+    candles = load_candles(args.candles) if args.candles else random_walk_candles(args.bars)
+    started = time.perf_counter()
+    strategy = STRATEGIES[args.strategy]
+    trades, summary = backtest(candles, strategy, fee_rate=args.fee)
+    print_summary(summary, candles, time.perf_counter() - started)
+    if args.trades:
+        trades.to_csv(args.trades, index=False)
+        print(f"Trades written to {args.trades}")
+    if args.check_live:
+        mismatches = check_against_live(candles, strategy, closes=args.check_live)
+        print(f"Live signal path: {mismatches} mismatching closes out of the last {args.check_live}")
+        raise SystemExit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Incremental OHLCV candle store for the Delta Exchange bots.
+
+The bots used to download their whole lookback window from
+/v2/history/candles every minute (about 8,600 5m bars for the PSAR bot)
+to act on the last bar. CandleStore keeps the bars in memory, persists
+them to disk, and per tick only fetches from the last stored bar onward:
+
+  * the first sync (or a restart after a long gap) backfills the retention
+    window in pages of MAX_BARS_PER_REQUEST;
+  * later syncs refetch the last REVISE_BARS bars too, so the bar that was
+    still forming last time is overwritten with its final values;
+  * holes inside the stored range are refetched once; bars the exchange
+    still does not return (no trades) are remembered and not asked for again.
+
+frame() returns a DataFrame with the API's columns (time, open, high, low,
+close, volume), oldest first, including the still-forming bar as the bots
+expect.
+"""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+DELTA_BASE_URL = 'https://api.india.delta.exchange'
+MAX_BARS_PER_REQUEST = 2000
+REVISE_BARS = 2
+CANDLE_STORE_DIR = os.environ.get('CANDLE_STORE_DIR', os.path.dirname(os.path.abspath(__file__)))
+
+RESOLUTION_SECONDS = {
+    '1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
+    '1h': 3600, '2h': 7200, '4h': 14400, '6h': 21600, '1d': 86400, '1w': 604800,
+}
+
+CANDLE_DTYPE = np.dtype([('time', 'i8'), ('open', 'f8'), ('high', 'f8'), ('low', 'f8'),
+                         ('close', 'f8'), ('volume', 'f8')])
+
+class CandleFetchError(Exception):
+    """Non-200 answer from the candles endpoint; carries the status and body for reporting."""
+
+    def __init__(self, status_code, text):
+        super().__init__(f"{status_code}: {text}")
+        self.status_code = status_code
+        self.text = text
+
+def delta_candle_fetcher(http, base_url=DELTA_BASE_URL):
+    """fetch(symbol, resolution, start, end) over /v2/history/candles with the shared HTTP client."""
+    def fetch(symbol, resolution, start, end):
+        r = http.get(f'{base_url}/v2/history/candles',
+                     params={'resolution': resolution, 'symbol': symbol, 'start': start, 'end': end})
+        body = r.json() if r.status_code == 200 else None
+        if body is None or 'result' not in body:
+            raise CandleFetchError(r.status_code, r.text)
+        return body['result']
+    return fetch
+
+def to_candles(rows):
+    """API candle dicts -> CANDLE_DTYPE array sorted by time, one row per time (last one wins)."""
+    data = np.array([(int(r['time']), r['open'], r['high'], r['low'], r['close'], r.get('volume') or 0)
+                     for r in rows], dtype=CANDLE_DTYPE)
+    if not len(data):
+        return data
+    data = data[np.argsort(data['time'], kind='stable')]
+    last = np.append(data['time'][1:] != data['time'][:-1], True)
+    return data[last]
+
+class CandleStore:
+    """Bars of one symbol/resolution: loaded once, then topped up incrementally."""
+
+    def __init__(self, symbol, resolution, fetch, history_seconds, path=None, clock=time.time):
+        self.symbol = symbol
+        self.resolution = resolution
+        self.step = RESOLUTION_SECONDS[resolution]
+        self.fetch = fetch
+        self.history_seconds = history_seconds
+        self.path = path or os.path.join(CANDLE_STORE_DIR, f"candles_{symbol}_{resolution}.npy")
+        self.clock = clock
+        self.data = np.empty(0, dtype=CANDLE_DTYPE)
+        self.empty_gaps = set()   # (start, end) holes the exchange had no bars for
+        self.load()
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def last_time(self):
+        return int(self.data['time'][-1]) if len(self.data) else None
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            data = np.load(self.path, allow_pickle=False)
+            if data.dtype != CANDLE_DTYPE:
+                raise ValueError(f"unexpected dtype {data.dtype}")
+            self.data = data
+            print(f"Loaded {len(data)} {self.symbol} {self.resolution} candles from {self.path}")
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable candle store {self.path}: {e}")
+
+    def save(self):
+        tmp = f"{self.path}.tmp.npy"
+        np.save(tmp, self.data)
+        os.replace(tmp, self.path)
+
+    def _fetch_range(self, start, end):
+        """All bars in [start, end], fetched in pages the endpoint accepts."""
+        pages = []
+        page_span = MAX_BARS_PER_REQUEST * self.step
+        while start <= end:
+            page_end = min(start + page_span - self.step, end)
+            pages.append(to_candles(self.fetch(self.symbol, self.resolution, start, page_end)))
+            start = page_end + self.step
+        return to_candles([]) if not pages else np.concatenate(pages)
+
+    def _merge(self, rows):
+        """Insert or overwrite bars; returns (bars not stored before, stored bars whose values changed)."""
+        if not len(rows):
+            return 0, 0
+        overlap = np.isin(self.data['time'], rows['time'])
+        seen = np.isin(rows['time'], self.data['time'])
+        revised = int(np.sum(self.data[overlap] != rows[seen]))
+        merged = np.concatenate([self.data[~overlap], rows])
+        self.data = merged[np.argsort(merged['time'], kind='stable')]
+        return int(np.sum(~seen)), revised
+
+    def gaps(self):
+        """(start, end) time ranges of missing bars inside the stored range."""
+        times = self.data['time']
+        idx = np.nonzero(np.diff(times) > self.step)[0]
+        return [(int(times[i]) + self.step, int(times[i + 1]) - self.step) for i in idx]
+
+    def sync(self, now=None):
+        """Fetch what is missing up to now and persist; returns the number of new bars."""
+        now = int(self.clock() if now is None else now)
+        oldest = now - self.history_seconds
+        oldest -= oldest % self.step
+        last = self.last_time
+        if last is None or last < oldest:
+            start = oldest
+            print(f"Backfilling {self.symbol} {self.resolution} candles from {start}...")
+        else:
+            start = max(last - REVISE_BARS * self.step, oldest)
+        added, revised = self._merge(self._fetch_range(start, now))
+
+        for gap in self.gaps():
+            if gap in self.empty_gaps or gap[1] < oldest:
+                continue
+            filled, _ = self._merge(self._fetch_range(*gap))
+            if not filled:
+                self.empty_gaps.add(gap)
+            added += filled
+
+        if len(self.data) and self.data['time'][0] < oldest:
+            self.data = self.data[self.data['time'] >= oldest]
+        if added or revised:
+            self.save()
+        return added
+
+    def frame(self, since=None):
+        """Bars as a DataFrame (oldest first), optionally only those at or after `since` (epoch seconds)."""
+        data = self.data if since is None else self.data[self.data['time'] >= since]
+        return pd.DataFrame(data)
@@ -1,6 +1,7 @@
-mport requests
+import requests
 import time
 import datetime
+import io
 import json
 import os
 import matplotlib
@@ -263,34 +264,22 @@ def calculate_gamma_exposure():
         timestamp_str = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
         historical_filename = f"gex_chart_{timestamp_str}.png" 
         
-        # Define a temporary local path for the image before upload
-        temp_dir = "/tmp" # Standard temporary directory on Linux systems (including GitHub Actions runners)
-        historical_temp_filepath = os.path.join(temp_dir, historical_filename)
-
-        # Save the plot locally
-        plt.savefig(historical_temp_filepath)
-        print(f"Plot saved locally to: {historical_temp_filepath}")
+        # Render once into memory; both S3 keys get the same bytes.
+        buffer = io.BytesIO()
+        plt.savefig(buffer, format='png')
+        plt.close() # Close the plot to free memory
+        png_bytes = buffer.getvalue()
+        print(f"Plot rendered in memory ({len(png_bytes) / 1024:.0f} KiB)")
 
-        # Upload the timestamped file to S3
-        s3.upload_file(historical_temp_filepath, bucket_name, historical_filename,
-                       ExtraArgs={'ContentType': 'image/png'})
+        # Upload the timestamped chart to S3
+        s3.put_object(Bucket=bucket_name, Key=historical_filename, Body=png_bytes, ContentType='image/png')
         print(f"Plot uploaded to S3 as: s3://{bucket_name}/{historical_filename}")
 
         # You can optionally also upload this as the 'latest' file if you want a fixed URL for the newest one
         latest_filename = "latest_gex_chart_from_action.png" # A distinct name to avoid conflict with EC2's latest
-        latest_temp_filepath = os.path.join(temp_dir, latest_filename)
-        plt.savefig(latest_temp_filepath) # Save it again for the 'latest' version
-        s3.upload_file(latest_temp_filepath, bucket_name, latest_filename,
-                       ExtraArgs={'ContentType': 'image/png'})
+        s3.put_object(Bucket=bucket_name, Key=latest_filename, Body=png_bytes, ContentType='image/png')
         print(f"Plot also uploaded as 'latest_gex_chart_from_action.png' to S3.")
 
-
-        plt.close() # Close the plot to free memory
-
-        # Clean up local temporary files
-        os.remove(historical_temp_filepath) 
-        os.remove(latest_temp_filepath)
-        
         print("Data collection cycle completed successfully.")
 
     except Exception as e:
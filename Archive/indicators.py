@@ -0,0 +1,528 @@
+"""Streaming PSAR, EMA, RSI and ADX for the Delta bots.
+
+The bots rebuilt a DataFrame every minute and ran the `ta` indicators over
+the whole history to read the last two rows. Here each indicator keeps its
+recursive state (EMA weights, Wilder sums, PSAR trend/AF/extreme point) and
+update() folds in one bar in constant time, reproducing `ta`'s numbers
+exactly, warm-up NaNs and zeros included.
+
+IndicatorEngine feeds a CandleStore's bars to a set of indicators. Closed
+bars are committed once; the last `pending` bars (the forming one and the
+one CandleStore may still revise) are evaluated on a copy of the state every
+tick, so a signal costs the same whether the store holds one day or a year.
+
+The *_column(s) functions compute the same values over a whole history
+for backtests. Parity of both against `ta` on recorded candles, and the
+per-tick cost:
+
+    python Archive/indicators.py parity [--candles Archive/candles_BTCUSD_5m.npy]
+    python Archive/indicators.py bench
+"""
+import argparse
+import copy
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from candle_store import CANDLE_DTYPE, REVISE_BARS
+
+CANDLE_FIELDS = CANDLE_DTYPE.names
+NAN = float('nan')
+
+class Ewm:
+    """pandas' ewm(...).mean() one value at a time (no NaN inputs)."""
+
+    def __init__(self, alpha, adjust=False, min_periods=0):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.min_periods = min_periods
+        self.new_wt = 1.0 if adjust else alpha
+        self.weighted = None
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, x):
+        x = float(x)
+        self.nobs += 1
+        if self.weighted is None:
+            self.weighted = x
+        else:
+            self.old_wt *= 1.0 - self.alpha
+            if self.weighted != x:
+                self.weighted = (self.old_wt * self.weighted + self.new_wt * x) / (self.old_wt + self.new_wt)
+            self.old_wt = self.old_wt + self.new_wt if self.adjust else 1.0
+        return self.weighted if self.nobs >= self.min_periods else NAN
+
+class EMA:
+    """ta.trend.EMAIndicator(window) of one candle field; adjust=True gives pandas' ewm(span=window) default."""
+
+    def __init__(self, window, source='close', adjust=False):
+        self.source = source
+        self.ewm = Ewm(2.0 / (window + 1), adjust=adjust, min_periods=0 if adjust else window)
+
+    def update(self, bar):
+        return self.ewm.update(bar[self.source])
+
+class RSI:
+    """ta.momentum.RSIIndicator(window): Wilder-smoothed gains over losses."""
+
+    def __init__(self, window=14, source='close'):
+        self.source = source
+        self.up = Ewm(1.0 / window, min_periods=window)
+        self.down = Ewm(1.0 / window, min_periods=window)
+        self.prev = None
+
+    def update(self, bar):
+        x = float(bar[self.source])
+        diff = 0.0 if self.prev is None else x - self.prev
+        self.prev = x
+        up = self.up.update(diff if diff > 0 else 0.0)
+        down = self.down.update(-diff if diff < 0 else 0.0)
+        if down == 0:
+            return 100.0
+        return 100 - 100 / (1 + up / down)
+
+class ADX:
+    """ta.trend.ADXIndicator(window): update() returns (adx, adx_pos, adx_neg).
+
+    Follows `ta`'s indexing: the Wilder sums are seeded with bars 1..window,
+    +DI/-DI are 0 up to bar `window`, and ADX is 0 until bar 2*window-1,
+    where it starts as the mean DX of bars window..2*window-1.
+    """
+
+    def __init__(self, window=14):
+        self.window = window
+        self.i = -1
+        self.prev = None
+        self.trs = self.dip = self.din = 0.0
+        self.dx_sum = 0.0
+        self.adx = 0.0
+
+    def update(self, bar):
+        high, low, close = float(bar['high']), float(bar['low']), float(bar['close'])
+        self.i += 1
+        prev, self.prev = self.prev, (high, low, close)
+        if prev is None:
+            return 0.0, 0.0, 0.0
+        prev_high, prev_low, prev_close = prev
+        tr = max(high, prev_close) - min(low, prev_close)
+        diff_up = high - prev_high
+        diff_down = prev_low - low
+        pos = diff_up if diff_up > diff_down and diff_up > 0 else 0.0
+        neg = diff_down if diff_down > diff_up and diff_down > 0 else 0.0
+
+        w = self.window
+        if self.i <= w:
+            self.trs += tr
+            self.dip += pos
+            self.din += neg
+            if self.i < w:
+                return 0.0, 0.0, 0.0
+        else:
+            self.trs = self.trs - self.trs / float(w) + tr
+            self.dip = self.dip - self.dip / float(w) + pos
+            self.din = self.din - self.din / float(w) + neg
+
+        dip = 100 * (self.dip / self.trs) if self.trs != 0 else 0.0
+        din = 100 * (self.din / self.trs) if self.trs != 0 else 0.0
+        dx = 100 * abs((dip - din) / (dip + din)) if dip + din != 0 else 0.0
+        if self.i < 2 * w - 1:
+            self.dx_sum += dx
+        elif self.i == 2 * w - 1:
+            self.adx = (self.dx_sum + dx) / w
+        else:
+            self.adx = ((self.adx * (w - 1)) + dx) / float(w)
+        if self.i == w:
+            return self.adx, 0.0, 0.0
+        return self.adx, dip, din
+
+class PSAR:
+    """ta.trend.PSARIndicator(step, max_step): update() returns (psar, psar_up, psar_down)."""
+
+    def __init__(self, step=0.02, max_step=0.2):
+        self.step = step
+        self.max_step = max_step
+        self.i = -1
+        self.up_trend = True
+        self.af = step
+        self.up_trend_high = self.down_trend_low = None
+        self.psar = None
+        self.highs = ()   # (high[i-2], high[i-1])
+        self.lows = ()
+
+    def update(self, bar):
+        high, low, close = float(bar['high']), float(bar['low']), float(bar['close'])
+        self.i += 1
+        if self.i < 2:
+            if self.i == 0:
+                self.up_trend_high, self.down_trend_low = high, low
+            self.psar = close
+            self.highs = self.highs + (high,)
+            self.lows = self.lows + (low,)
+            return close, NAN, NAN
+
+        reversal = False
+        (high2, high1), (low2, low1) = self.highs, self.lows
+        if self.up_trend:
+            psar = self.psar + self.af * (self.up_trend_high - self.psar)
+            if low < psar:
+                reversal = True
+                psar = self.up_trend_high
+                self.down_trend_low = low
+                self.af = self.step
+            else:
+                if high > self.up_trend_high:
+                    self.up_trend_high = high
+                    self.af = min(self.af + self.step, self.max_step)
+                if low2 < psar:
+                    psar = low2
+                elif low1 < psar:
+                    psar = low1
+        else:
+            psar = self.psar - self.af * (self.psar - self.down_trend_low)
+            if high > psar:
+                reversal = True
+                psar = self.down_trend_low
+                self.up_trend_high = high
+                self.af = self.step
+            else:
+                if low < self.down_trend_low:
+                    self.down_trend_low = low
+                    self.af = min(self.af + self.step, self.max_step)
+                if high2 > psar:
+                    psar = high2
+                elif high1 > psar:
+                    psar = high1
+
+        self.up_trend = self.up_trend != reversal
+        self.psar = psar
+        self.highs = (high1, high)
+        self.lows = (low1, low)
+        return (psar, psar, NAN) if self.up_trend else (psar, NAN, psar)
+
+class IndicatorEngine:
+    """Indicator rows for the newest bars of a CandleStore, updated incrementally.
+
+    `build` returns a dict mapping a column name (or a tuple of names, for
+    indicators returning several values) to a fresh indicator. Bars are
+    expected in time order; bars appearing behind the committed ones (a
+    refilled gap) do not rewind the state.
+    """
+
+    def __init__(self, build, pending=REVISE_BARS):
+        self.build = build
+        self.pending = pending
+        self.reset()
+
+    def reset(self):
+        self.indicators = self.build()
+        self.last_time = None
+        self.bars = 0
+
+    @staticmethod
+    def _apply(indicators, bar):
+        row = {name: bar[name].item() for name in CANDLE_FIELDS}
+        for columns, indicator in indicators.items():
+            value = indicator.update(bar)
+            if isinstance(columns, tuple):
+                row.update(zip(columns, value))
+            else:
+                row[columns] = value
+        return row
+
+    def sync(self, candles, until=None):
+        """Commit new closed bars from a CANDLE_DTYPE array; returns rows (pd.Series, oldest first) for the pending bars.
+
+        With `until` (epoch seconds), bars opening at or after it are left out,
+        e.g. the candle that started at the close being evaluated.
+        """
+        if until is not None:
+            candles = candles[:int(np.searchsorted(candles['time'], until))]
+        final = len(candles) - self.pending
+        start = 0 if self.last_time is None else int(np.searchsorted(candles['time'], self.last_time, side='right'))
+        for bar in candles[start:final]:
+            self._apply(self.indicators, bar)
+            self.last_time = int(bar['time'])
+            self.bars += 1
+        preview = copy.deepcopy(self.indicators)
+        return [pd.Series(self._apply(preview, bar)) for bar in candles[max(start, final):]]
+
+# Whole-history versions of the same indicators, for backtests: the same
+# arithmetic as the classes above (and `ta`), but recursions run over plain
+# float lists and everything else is vectorized.
+
+def ema_column(values, window, adjust=False):
+    """EMAIndicator(window).ema_indicator(); adjust=True is pandas' ewm(span=window).mean()."""
+    series = pd.Series(values, dtype=float)
+    if adjust:
+        return series.ewm(span=window).mean().to_numpy()
+    return series.ewm(span=window, min_periods=window, adjust=False).mean().to_numpy()
+
+def rsi_column(close, window=14):
+    """RSIIndicator(window).rsi()."""
+    diff = np.diff(np.asarray(close, dtype=float), prepend=np.nan)
+    up = pd.Series(np.where(diff > 0, diff, 0.0)).ewm(alpha=1 / window, min_periods=window, adjust=False).mean()
+    down = pd.Series(np.where(diff < 0, -diff, 0.0)).ewm(alpha=1 / window, min_periods=window, adjust=False).mean()
+    up, down = up.to_numpy(), down.to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(down == 0, 100.0, 100 - (100 / (1 + up / down)))
+
+def adx_columns(high, low, close, window=14):
+    """(adx, adx_pos, adx_neg) of ADXIndicator(window), indexed like ADX.update()."""
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    n, w = len(close), window
+    adx, plus_di, minus_di = np.zeros(n), np.zeros(n), np.zeros(n)
+    if n <= w:
+        return adx, plus_di, minus_di
+    tr = np.maximum(high[1:], close[:-1]) - np.minimum(low[1:], close[:-1])
+    diff_up = high[1:] - high[:-1]
+    diff_down = low[:-1] - low[1:]
+    pos = np.where((diff_up > diff_down) & (diff_up > 0), diff_up, 0.0)
+    neg = np.where((diff_down > diff_up) & (diff_down > 0), diff_down, 0.0)
+
+    smoothed = []
+    for values in (tr.tolist(), pos.tolist(), neg.tolist()):
+        total = 0.0
+        for x in values[:w]:   # bars 1..w
+            total += x
+        out = [total]
+        for x in values[w:]:
+            total = total - total / float(w) + x
+            out.append(total)
+        smoothed.append(np.array(out))   # bars w..n-1
+    trs, dip_sum, din_sum = smoothed
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dip = np.where(trs != 0, 100 * (dip_sum / trs), 0.0)
+        din = np.where(trs != 0, 100 * (din_sum / trs), 0.0)
+        dx = np.where(dip + din != 0, 100 * np.abs((dip - din) / (dip + din)), 0.0)
+    plus_di[w + 1:], minus_di[w + 1:] = dip[1:], din[1:]
+
+    dx = dx.tolist()
+    if len(dx) >= w:
+        total = 0.0
+        for x in dx[:w]:
+            total += x
+        value = total / w
+        out = [value]
+        for x in dx[w:]:
+            value = ((value * (w - 1)) + x) / float(w)
+            out.append(value)
+        adx[2 * w - 1:] = out
+    return adx, plus_di, minus_di
+
+def psar_columns(high, low, close, step=0.02, max_step=0.2):
+    """(psar, psar_up, psar_down) of PSARIndicator(step, max_step)."""
+    highs, lows, closes = (np.asarray(a, dtype=float).tolist() for a in (high, low, close))
+    n = len(closes)
+    psar = list(closes)
+    psar_up, psar_down = [NAN] * n, [NAN] * n
+    if not n:
+        return np.array(psar), np.array(psar_up), np.array(psar_down)
+    up_trend = True
+    af = step
+    up_trend_high, down_trend_low = highs[0], lows[0]
+    for i in range(2, n):
+        reversal = False
+        high, low = highs[i], lows[i]
+        if up_trend:
+            value = psar[i - 1] + af * (up_trend_high - psar[i - 1])
+            if low < value:
+                reversal = True
+                value = up_trend_high
+                down_trend_low = low
+                af = step
+            else:
+                if high > up_trend_high:
+                    up_trend_high = high
+                    af = min(af + step, max_step)
+                if lows[i - 2] < value:
+                    value = lows[i - 2]
+                elif lows[i - 1] < value:
+                    value = lows[i - 1]
+        else:
+            value = psar[i - 1] - af * (psar[i - 1] - down_trend_low)
+            if high > value:
+                reversal = True
+                value = down_trend_low
+                up_trend_high = high
+                af = step
+            else:
+                if low < down_trend_low:
+                    down_trend_low = low
+                    af = min(af + step, max_step)
+                if highs[i - 2] > value:
+                    value = highs[i - 2]
+                elif highs[i - 1] > value:
+                    value = highs[i - 1]
+        up_trend = up_trend != reversal
+        psar[i] = value
+        if up_trend:
+            psar_up[i] = value
+        else:
+            psar_down[i] = value
+    return np.array(psar), np.array(psar_up), np.array(psar_down)
+
+def column_spec(candles, indicator):
+    """(key, compute) for one indicator: equal keys give equal columns over the same candles."""
+    high, low, close = candles['high'], candles['low'], candles['close']
+    if isinstance(indicator, PSAR):
+        return ('psar', indicator.step, indicator.max_step), \
+            lambda: psar_columns(high, low, close, indicator.step, indicator.max_step)
+    if isinstance(indicator, ADX):
+        return ('adx', indicator.window), lambda: adx_columns(high, low, close, indicator.window)
+    if isinstance(indicator, RSI):
+        window = round(1 / indicator.up.alpha)
+        return ('rsi', indicator.source, window), lambda: rsi_column(candles[indicator.source], window)
+    window = round(2 / indicator.ewm.alpha - 1)
+    return ('ema', indicator.source, window, indicator.ewm.adjust), \
+        lambda: ema_column(candles[indicator.source], window, indicator.ewm.adjust)
+
+def indicator_columns(candles, build, cache=None):
+    """{column: array} over a whole CANDLE_DTYPE array for the indicators `build` returns.
+
+    `cache` (any mapping) keeps columns by column_spec key, so parameter sets
+    sharing an indicator configuration compute it once.
+    """
+    columns = {}
+    for names, indicator in build().items():
+        key, compute = column_spec(candles, indicator)
+        values = cache.get(key) if cache is not None else None
+        if values is None:
+            values = compute()
+            if cache is not None:
+                cache[key] = values
+        if isinstance(names, tuple):
+            columns.update(zip(names, values))
+        else:
+            columns[names] = values
+    return columns
+
+def ta_frame(candles, build):
+    """The same columns computed with `ta` (and pandas) over the whole array, as the bots used to."""
+    from ta.momentum import RSIIndicator
+    from ta.trend import ADXIndicator, EMAIndicator, PSARIndicator
+
+    df = pd.DataFrame(candles)
+    for columns, indicator in build().items():
+        if isinstance(indicator, PSAR):
+            psar = PSARIndicator(df['high'], df['low'], df['close'], step=indicator.step, max_step=indicator.max_step)
+            values = (psar.psar(), psar.psar_up(), psar.psar_down())
+        elif isinstance(indicator, ADX):
+            adx = ADXIndicator(df['high'], df['low'], df['close'], window=indicator.window)
+            values = (adx.adx(), adx.adx_pos(), adx.adx_neg())
+        elif isinstance(indicator, RSI):
+            values = RSIIndicator(df[indicator.source], round(1 / indicator.up.alpha)).rsi()
+        elif indicator.ewm.adjust:
+            values = df[indicator.source].ewm(span=round(2 / indicator.ewm.alpha - 1)).mean()
+        else:
+            values = EMAIndicator(df[indicator.source], round(2 / indicator.ewm.alpha - 1)).ema_indicator()
+        if isinstance(columns, tuple):
+            for column, series in zip(columns, values):
+                df[column] = series.to_numpy()
+        else:
+            df[columns] = values.to_numpy()
+    return df
+
+def demo_indicators():
+    """Every indicator the two bots use, with their parameters."""
+    return {
+        ('psar', 'psar_up', 'psar_down'): PSAR(0.02, 0.2),
+        'short_ema': EMA(20),
+        'long_ema': EMA(50),
+        ('adx', 'plus_di', 'minus_di'): ADX(14),
+        'rsi': RSI(14),
+        'rsi_30': RSI(30),
+        'vol_ema': EMA(14, source='volume', adjust=True),
+    }
+
+def load_candles(path):
+    """Candles recorded by CandleStore (.npy) or saved from /v2/history/candles (.json)."""
+    if path.endswith('.npy'):
+        return np.load(path, allow_pickle=False)
+    import json
+    from candle_store import to_candles
+    with open(path) as f:
+        rows = json.load(f)
+    return to_candles(rows['result'] if isinstance(rows, dict) else rows)
+
+def random_walk_candles(count, seed=11, start=1760000000, step=300):
+    rng = np.random.default_rng(seed)
+    close = 120000 * np.exp(np.cumsum(rng.normal(0, 0.002, count)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) * (1 + rng.exponential(0.0008, count))
+    low = np.minimum(open_, close) * (1 - rng.exponential(0.0008, count))
+    volume = rng.integers(0, 500, count).astype(float)   # zero-volume bars happen on quiet minutes
+    out = np.empty(count, dtype=CANDLE_DTYPE)
+    out['time'] = start + step * np.arange(count)
+    out['open'], out['high'], out['low'], out['close'], out['volume'] = open_, high, low, close, volume
+    return out
+
+def max_rel_error(a, b):
+    """Largest relative difference between two columns; inf if their NaNs differ."""
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    if not np.array_equal(np.isnan(a), np.isnan(b)):
+        return math.inf
+    ok = ~np.isnan(a)
+    return float(np.max(np.abs(a[ok] - b[ok]) / np.maximum(np.abs(b[ok]), 1e-12), initial=0.0))
+
+def parity(candles, build=demo_indicators, rtol=1e-9):
+    """Compare `ta` with the streamed values and with indicator_columns(); returns {column: max relative error}."""
+    expected = ta_frame(candles, build)
+    indicators = build()
+    rows = pd.DataFrame([IndicatorEngine._apply(indicators, bar) for bar in candles])
+    columns = indicator_columns(candles, build)
+    # The engine's preview path (deepcopy + pending bars) must agree with the committed path.
+    engine = IndicatorEngine(build)
+    engine.sync(candles[:-5])
+    tail = pd.DataFrame(engine.sync(candles))
+    errors = {}
+    for column in columns:
+        streamed = rows[column].to_numpy(float)
+        errors[column] = max(max_rel_error(streamed, expected[column]),
+                             max_rel_error(columns[column], expected[column]))
+        t = tail[column].to_numpy(float)
+        if not np.allclose(t, streamed[-len(t):], rtol=rtol, atol=0, equal_nan=True):
+            errors[column] = math.inf
+    return errors
+
+def bench(sizes=(1000, 10000, 50000), ticks=50, build=demo_indicators):
+    """Per-tick cost of recomputing with `ta` vs one IndicatorEngine.sync, by history length."""
+    print(f"{'bars':>7} {'ta recompute':>14} {'engine tick':>12}")
+    for n in sizes:
+        candles = random_walk_candles(n + ticks)
+        started = time.perf_counter()
+        ta_frame(candles[:n], build)
+        ta_ms = (time.perf_counter() - started) * 1000
+        engine = IndicatorEngine(build)
+        engine.sync(candles[:n])
+        started = time.perf_counter()
+        for i in range(ticks):
+            engine.sync(candles[:n + i + 1])
+        tick_ms = (time.perf_counter() - started) * 1000 / ticks
+        print(f"{n:>7} {ta_ms:>12.1f}ms {tick_ms:>10.2f}ms")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('parity', help="Compare streamed values with `ta` over recorded candles.")
+    p.add_argument('--candles', help="CandleStore .npy or candles API .json; a seeded random walk if omitted.")
+    p.add_argument('--bars', type=int, default=5000, help="Random-walk length when no --candles is given.")
+    p.add_argument('--rtol', type=float, default=1e-9)
+    sub.add_parser('bench', help="Per-tick cost vs history length.")
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        bench()
+        return
+    candles = load_candles(args.candles) if args.candles else random_walk_candles(args.bars)
+    errors = parity(candles, rtol=args.rtol)
+    failed = [column for column, err in errors.items() if not err <= args.rtol]
+    for column, err in errors.items():
+        print(f"{column:<10} max rel err {err:.2e} {'FAIL' if column in failed else 'ok'}")
+    print(f"{len(candles)} bars: {'FAIL ' + ', '.join(failed) if failed else 'all columns match ta'}")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
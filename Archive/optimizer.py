@@ -0,0 +1,225 @@
+"""Parallel parameter sweep over the bots' strategy constants.
+
+Every parameter set is backtested with backtest.py over the same candles:
+
+  * a process pool evaluates the sets; the candle array is placed in shared
+    memory once and each worker maps it, nothing is pickled per task;
+  * sets are ordered so those sharing indicator settings (PSAR AF, EMA and
+    RSI periods, ...) are adjacent and land in the same worker chunk, where
+    an LRU cache of indicator columns computes each setting once;
+  * each result is appended to a JSONL checkpoint as it arrives; rerunning
+    the same command skips the sets already in the file.
+
+    python Archive/optimizer.py --strategy psar --candles Archive/candles_BTCUSD_5m.npy
+    python Archive/optimizer.py --strategy rsi_adx --search random --samples 200 --workers 4
+    python Archive/optimizer.py --param ADX_THRESHOLD=20,25,30 --param TP_RISK_RATIO=2,3
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import random
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtest import FEE_RATE, STRATEGIES, backtest
+from candle_store import CANDLE_DTYPE
+from indicators import indicator_columns, load_candles, random_walk_candles
+
+# Values tried per constant. Indicator settings come first: sets are sorted
+# on these keys in this order, which keeps shared indicator columns together.
+SEARCH_SPACES = {
+    'psar': {
+        'PSAR_AF': [0.01, 0.02, 0.03],
+        'PSAR_MAX_AF': [0.1, 0.2, 0.3],
+        'SHORT_EMA_PERIOD': [10, 20, 30],
+        'LONG_EMA_PERIOD': [50, 100, 200],
+        'ADX_THRESHOLD': [20, 25, 30, 35],
+        'TP_RISK_RATIO': [1.5, 2.0, 3.0, 4.0],
+        'SL_PERCENTAGE': [0.003, 0.005, 0.01],
+    },
+    'rsi_adx': {
+        'RSI_Period': [14, 21, 30],
+        'ADX_Len': [14],
+        'adx_follow': [15, 20, 25],
+        'adx_BT': [35, 40, 45],
+        'adx_BTU': [50, 55, 60],
+        'TP_RISK_RATIO': [2, 3, 4, 5],
+    },
+}
+INDICATOR_CACHE_SIZE = 32   # column sets kept per worker (~1-2.5 MB each for a year of 5m bars)
+
+class LRUCache(OrderedDict):
+    """Mapping that drops the least recently used entry beyond maxsize."""
+
+    def __init__(self, maxsize):
+        super().__init__()
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+
+    def get(self, key, default=None):
+        if key in self:
+            self.move_to_end(key)
+            self.hits += 1
+            return self[key]
+        self.misses += 1
+        return default
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+def parameter_sets(space, search='grid', samples=None, seed=0):
+    """Every combination of the space (grid) or `samples` distinct ones (random), sorted by the space's key order."""
+    keys = list(space)
+    combos = list(itertools.product(*(space[k] for k in keys)))
+    if search == 'random' and samples and samples < len(combos):
+        combos = random.Random(seed).sample(combos, samples)
+    combos.sort()
+    return [dict(zip(keys, values)) for values in combos]
+
+def candles_fingerprint(candles):
+    """Short id of a candle array, so a checkpoint is only resumed over the same data."""
+    return hashlib.sha1(np.ascontiguousarray(candles).tobytes()).hexdigest()[:12]
+
+def result_key(params):
+    return json.dumps(params, sort_keys=True)
+
+def load_checkpoint(path, data_id, strategy, fee_rate):
+    """{params key: record} of the results already in path for this data, strategy and fee."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue   # a line cut short by an interrupt
+            if (record.get('data'), record.get('strategy'), record.get('fee_rate')) == (data_id, strategy, fee_rate):
+                done[result_key(record['params'])] = record
+    return done
+
+# ==== Worker side ====
+_worker = {}
+
+def _init_worker(shm_name, length, strategy, fee_rate, cache_size):
+    # Workers share the parent's resource tracker, so attaching does not hand them ownership.
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker.update(
+        shm=shm,
+        candles=np.ndarray((length,), dtype=CANDLE_DTYPE, buffer=shm.buf),
+        strategy=STRATEGIES[strategy],
+        fee_rate=fee_rate,
+        cache=LRUCache(cache_size),
+    )
+
+def _evaluate(params):
+    strategy = _worker['strategy']
+    full = dict(strategy.DEFAULT_PARAMS, **params)
+    started = time.perf_counter()
+    candles, cache = _worker['candles'], _worker['cache']
+    misses = cache.misses
+    columns = indicator_columns(candles, lambda: strategy.indicators(full), cache)
+    _, summary = backtest(candles, strategy, full, columns=columns, fee_rate=_worker['fee_rate'])
+    return params, summary, time.perf_counter() - started, cache.misses - misses
+
+# ==== Parent side ====
+def sweep(candles, strategy, sets, results_path, workers=None, fee_rate=FEE_RATE,
+          cache_size=INDICATOR_CACHE_SIZE):
+    """Evaluate the parameter sets not yet in results_path; returns every record for this data (old and new)."""
+    data_id = candles_fingerprint(candles)
+    done = load_checkpoint(results_path, data_id, strategy, fee_rate)
+    todo = [params for params in sets if result_key(params) not in done]
+    print(f"{len(sets)} parameter sets, {len(sets) - len(todo)} already in {results_path}, {len(todo)} to run")
+    if not todo:
+        return list(done.values())
+
+    workers = workers or os.cpu_count() or 1
+    shm = shared_memory.SharedMemory(create=True, size=max(candles.nbytes, 1))
+    try:
+        np.ndarray(candles.shape, dtype=CANDLE_DTYPE, buffer=shm.buf)[:] = candles
+        chunksize = max(1, min(64, len(todo) // (workers * 4)))
+        started = time.perf_counter()
+        computed = 0
+        with open(results_path, 'a') as out, ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=(shm.name, len(candles), strategy, fee_rate, cache_size)) as pool:
+            try:
+                for n, (params, summary, seconds, misses) in enumerate(pool.map(_evaluate, todo, chunksize=chunksize), 1):
+                    record = {'strategy': strategy, 'data': data_id, 'fee_rate': fee_rate,
+                              'params': params, 'summary': summary, 'seconds': round(seconds, 4)}
+                    out.write(json.dumps(record) + '\n')
+                    out.flush()
+                    done[result_key(params)] = record
+                    computed += misses
+                    if n % max(1, len(todo) // 20) == 0 or n == len(todo):
+                        elapsed = time.perf_counter() - started
+                        print(f"  {n}/{len(todo)} done, {n / elapsed:.1f} sets/s")
+            except KeyboardInterrupt:
+                pool.shutdown(wait=False, cancel_futures=True)
+                print(f"Interrupted: {len(done)} results kept in {results_path}; rerun the same command to resume.")
+                raise
+        print(f"Indicator columns computed {computed} times for {len(todo)} sets (the rest came from worker caches)")
+    finally:
+        shm.close()
+        shm.unlink()
+    return list(done.values())
+
+def print_leaderboard(records, sort_key='total_return_pct', top=10, min_trades=20):
+    ranked = sorted((r for r in records if r['summary']['trades'] >= min_trades),
+                    key=lambda r: r['summary'][sort_key], reverse=sort_key != 'max_drawdown_pct')
+    print(f"Top {min(top, len(ranked))} of {len(ranked)} sets with >= {min_trades} trades, by {sort_key}:")
+    for r in ranked[:top]:
+        s = r['summary']
+        print(f"  return {s['total_return_pct']:8.2f}% | win {s['win_rate_pct']:5.1f}% | trades {s['trades']:5d} | "
+              f"PF {s['profit_factor']:5.2f} | DD {s['max_drawdown_pct']:6.2f}% | {r['params']}")
+
+def parse_param(text):
+    name, _, values = text.partition('=')
+    return name, [json.loads(v) for v in values.split(',')]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--strategy', choices=STRATEGIES, default='psar')
+    parser.add_argument('--candles', help="CandleStore .npy or candles API .json; a seeded random walk if omitted.")
+    parser.add_argument('--bars', type=int, default=105120, help="Random-walk length (default: a year of 5m bars).")
+    parser.add_argument('--search', choices=('grid', 'random'), default='grid')
+    parser.add_argument('--samples', type=int, default=500, help="Parameter sets drawn by --search random.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=V1,V2,...',
+                        help="Replace the values tried for one constant (repeatable).")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count).")
+    parser.add_argument('--fee', type=float, default=FEE_RATE)
+    parser.add_argument('--results', help="JSONL checkpoint (default: sweep_<strategy>.jsonl).")
+    parser.add_argument('--sort', default='total_return_pct',
+                        choices=('total_return_pct', 'total_pnl', 'profit_factor', 'win_rate_pct', 'max_drawdown_pct'))
+    parser.add_argument('--min-trades', type=int, default=20)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    space = dict(SEARCH_SPACES[args.strategy])
+    for text in args.param:
+        name, values = parse_param(text)
+        if name not in STRATEGIES[args.strategy].DEFAULT_PARAMS:
+            parser.error(f"unknown {args.strategy} constant {name}")
+        space[name] = values
+    sets = parameter_sets(space, args.search, args.samples, args.seed)
+    candles = load_candles(args.candles) if args.candles else random_walk_candles(args.bars)
+    results = args.results or f"sweep_{args.strategy}.jsonl"
+
+    started = time.perf_counter()
+    records = sweep(candles, args.strategy, sets, results, args.workers, args.fee)
+    print(f"Sweep finished in {time.perf_counter() - started:.1f}s over {len(candles)} candles")
+    wanted = {result_key(params) for params in sets}
+    print_leaderboard([r for r in records if result_key(r['params']) in wanted], args.sort, args.top, args.min_trades)
+
+if __name__ == "__main__":
+    main()
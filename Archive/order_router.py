@@ -0,0 +1,273 @@
+"""Concurrent order fan-out across the bots' Delta Exchange accounts.
+
+On a signal the bots used to walk client_credentials one account at a time,
+building a new DeltaRestClient and running the open-trade check and the
+order for each in turn, so the last account was filled seconds after the
+first and the gap grew with every account added. OrderRouter instead:
+
+  * builds one DeltaRestClient per account at startup and keeps it, so each
+    account's keep-alive session (and its TLS connection) is reused;
+  * runs check + place for all accounts at once on a thread pool, each
+    account in its own thread with its own session;
+  * waits at most ORDER_TIMEOUT_SECONDS for the accounts. A late account is
+    reported as timed out (its request may still go through) and is skipped
+    on later signals until its submission has returned, so a slow account
+    never gets a second order stacked on top of the first;
+  * records each account's placement latency (signal to order acknowledged)
+    and the skew between the first and the last placed order per signal.
+
+    python Archive/order_router.py bench --accounts 8 --latency 0.25
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from delta_rest_client import DeltaRestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import LatencyHistogram
+
+DELTA_BASE_URL = 'https://api.india.delta.exchange'
+ORDER_TIMEOUT_SECONDS = float(os.environ.get('ORDER_TIMEOUT_SECONDS', 15))
+
+# outcome: 'placed', 'open_trades' (check found an order/position or failed),
+# 'failed' (place returned nothing), 'error' (check/place raised),
+# 'timeout' (still running at the deadline) or 'busy' (last submission still running)
+OrderResult = namedtuple('OrderResult', 'client account outcome seconds order')
+
+def truncated_key(api_key):
+    return api_key[:6] + '...' + api_key[-4:] if api_key else "N/A"
+
+def delta_clients(credentials, base_url=DELTA_BASE_URL):
+    """One DeltaRestClient per credentials dict, created once and reused for every signal."""
+    return [DeltaRestClient(base_url=base_url, api_key=creds['api_key'], api_secret=creds['api_secret'])
+            for creds in credentials]
+
+def round_to_tick(price, tick_size):
+    return round(float(price) / tick_size) * tick_size if tick_size else float(price)
+
+def product_orders(orders, symbol, product_id=None):
+    """The orders for one product; an order naming neither its symbol nor its id is kept, to stay on the safe side."""
+    matching = []
+    for order in orders:
+        if order.get('product_symbol') is not None:
+            match = order['product_symbol'] == symbol
+        elif order.get('product_id') is not None and product_id is not None:
+            match = order['product_id'] == product_id
+        else:
+            match = True
+        if match:
+            matching.append(order)
+    return matching
+
+def has_open_trades(client, symbol, products, mirror=None, any_product=False):
+    """check for route(): True if the account has an open order in symbol (in any product with
+    any_product, the bots' rule) or a position in symbol.
+
+    Answered from an AccountMirror when it is in sync, else over REST; the
+    product id is only looked up from `products` when the REST check needs it.
+    A failed check counts as open trades.
+    """
+    account = truncated_key(client.api_key)
+    mirrored = mirror.open_trades(client.api_key, symbol, any_product) if mirror else None
+    if mirrored is not None:
+        open_orders, position_size = mirrored
+    else:
+        try:
+            orders = client.get_live_orders() or []
+            if not any_product:
+                orders = product_orders(orders, symbol, products.product_id(symbol))
+            open_orders, position_size = len(orders), 0.0
+            if not open_orders:
+                position = client.get_position(product_id=products.product_id(symbol))
+                position_size = float((position or {}).get('size') or 0)
+        except Exception as e:
+            print(f"Client {account}: Error checking for open trades: {e}")
+            sys.stdout.flush()
+            return True
+    if open_orders:
+        print(f"Client {account}: Found {open_orders} open order(s). Skipping new order.")
+    elif position_size:
+        print(f"Client {account}: Found an open position of size {position_size} for {symbol}. Skipping new order.")
+    else:
+        print(f"Client {account}: No open orders or current positions found. Ready to place new order.")
+    sys.stdout.flush()
+    return bool(open_orders or position_size)
+
+def bracket_order_payload(product, side, size, stop_loss_price, take_profit_price):
+    """/v2/orders body of a market order with a bracket, SL/TP rounded to the product's tick size."""
+    if side not in ('buy', 'sell'):
+        raise ValueError("Invalid side, must be 'buy' or 'sell'")
+    stop_loss_price = round_to_tick(stop_loss_price, product['tick_size'])
+    take_profit_price = round_to_tick(take_profit_price, product['tick_size'])
+    return {
+        "product_id": product['id'],
+        "size": size,
+        "side": side,
+        "order_type": "market_order",
+        "post_only": False,
+        "bracket_stop_loss_price": stop_loss_price,
+        "bracket_take_profit_price": take_profit_price,
+        "bracket_stop_loss_limit_price": stop_loss_price,
+        "bracket_take_profit_limit_price": take_profit_price,
+    }
+
+def place_bracket_order(client, product, side, size, stop_loss_price, take_profit_price):
+    """place for route(): the bracket order as sent, with the exchange response, or None if it failed."""
+    try:
+        payload = bracket_order_payload(product, side, size, stop_loss_price, take_profit_price)
+        response = client.request("POST", "/v2/orders", payload, auth=True)
+        return dict(payload, response=response.json())
+    except Exception as e:
+        print(f"Client {truncated_key(client.api_key)}: Order failed: {e}")
+        return None
+
+class OrderRouter:
+    """route() submits one signal to every account in parallel; report() summarizes placement latency."""
+
+    def __init__(self, clients, timeout=ORDER_TIMEOUT_SECONDS):
+        self.clients = list(clients)
+        self.timeout = timeout
+        self.pool = ThreadPoolExecutor(max_workers=max(1, len(self.clients)), thread_name_prefix='order')
+        self.latency = {truncated_key(c.api_key): LatencyHistogram() for c in self.clients}
+        self.skew = LatencyHistogram()
+        self.outcomes = {}
+        self._busy = set()
+        self._lock = threading.Lock()
+
+    def _submit(self, client, check, place, started):
+        if check(client):
+            return 'open_trades', None, time.perf_counter() - started
+        order = place(client)
+        return ('placed' if order else 'failed'), order, time.perf_counter() - started
+
+    def _release(self, account):
+        with self._lock:
+            self._busy.discard(account)
+
+    def route(self, check, place):
+        """Run check(client) and, where it returns False, place(client) for every account at once.
+
+        check returns True when the account already has an open order or
+        position (or the check failed); place returns the order on success
+        and a falsy value on failure. Returns one OrderResult per account,
+        in client order.
+        """
+        started = time.perf_counter()
+        futures = {}
+        results = {}
+        for client in self.clients:
+            account = truncated_key(client.api_key)
+            with self._lock:
+                if account in self._busy:
+                    results[account] = OrderResult(client, account, 'busy', 0.0, None)
+                    continue
+                self._busy.add(account)
+            future = self.pool.submit(self._submit, client, check, place, started)
+            future.add_done_callback(lambda _, account=account: self._release(account))
+            futures[future] = (client, account)
+
+        done, _ = wait(futures, timeout=self.timeout)
+        for future, (client, account) in futures.items():
+            if future not in done:
+                results[account] = OrderResult(client, account, 'timeout', self.timeout, None)
+                continue
+            try:
+                outcome, order, seconds = future.result()
+            except Exception as e:
+                print(f"Client {account}: Order submission raised: {e}")
+                outcome, order, seconds = 'error', None, time.perf_counter() - started
+            results[account] = OrderResult(client, account, outcome, seconds, order)
+
+        ordered = [results[truncated_key(c.api_key)] for c in self.clients]
+        self._record(ordered)
+        return ordered
+
+    def _record(self, results):
+        placed = [r.seconds for r in results if r.outcome == 'placed']
+        for r in results:
+            self.outcomes[r.outcome] = self.outcomes.get(r.outcome, 0) + 1
+            if r.outcome == 'placed':
+                self.latency[r.account].record(r.seconds)
+            elif r.outcome in ('failed', 'error', 'timeout'):
+                self.latency[r.account].record(r.seconds, ok=False)
+        if len(placed) > 1:
+            self.skew.record(max(placed) - min(placed))
+        line = ", ".join(f"{r.account} {r.outcome} {r.seconds * 1000:.0f}ms" for r in results)
+        skew = f" | skew {(max(placed) - min(placed)) * 1000:.0f}ms" if len(placed) > 1 else ""
+        print(f"Orders routed: {line}{skew}")
+        sys.stdout.flush()
+
+    def report(self):
+        """Placement latency per account and first-to-last skew per signal."""
+        lines = [f"{account}: {histogram.summary()}" for account, histogram in self.latency.items() if histogram.total]
+        if self.skew.total:
+            lines.append(f"skew first-to-last placed: {self.skew.summary()}")
+        if lines:
+            lines.append("outcomes: " + ", ".join(f"{k}={v}" for k, v in sorted(self.outcomes.items())))
+        return lines
+
+    def print_latency_report(self):
+        lines = self.report()
+        if lines:
+            print("Order placement latency by account:")
+            for line in lines:
+                print(f"  {line}")
+
+# ==== Bench ====
+class _SimulatedClient:
+    """Stands in for DeltaRestClient in the bench: every call takes `latency` seconds."""
+
+    def __init__(self, n, latency):
+        self.api_key = f"acct{n:02d}-simulated-{n:04d}"
+        self.latency = latency
+
+    def call(self):
+        time.sleep(self.latency)
+
+def bench(accounts, latency, calls_per_account=5):
+    """Sequential loop (as the bots did) vs OrderRouter, with simulated per-call latency."""
+    clients = [_SimulatedClient(n, latency) for n in range(accounts)]
+
+    def check(client):
+        for _ in range(calls_per_account - 2):   # live orders, product, position
+            client.call()
+        return False
+
+    def place(client):
+        for _ in range(2):                        # product, POST /v2/orders
+            client.call()
+        return {'ok': True}
+
+    started = time.perf_counter()
+    finished = []
+    for client in clients:
+        if not check(client):
+            place(client)
+        finished.append(time.perf_counter() - started)
+    print(f"Sequential: first placed {finished[0] * 1000:.0f}ms, last {finished[-1] * 1000:.0f}ms, "
+          f"skew {(finished[-1] - finished[0]) * 1000:.0f}ms")
+
+    router = OrderRouter(clients)
+    results = router.route(check, place)
+    seconds = [r.seconds for r in results]
+    print(f"Routed:     first placed {min(seconds) * 1000:.0f}ms, last {max(seconds) * 1000:.0f}ms, "
+          f"skew {(max(seconds) - min(seconds)) * 1000:.0f}ms")
+    router.pool.shutdown()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    b = sub.add_parser('bench', help="Compare sequential and routed fan-out with simulated accounts.")
+    b.add_argument('--accounts', type=int, default=8)
+    b.add_argument('--latency', type=float, default=0.25, help="Seconds per simulated API call.")
+    args = parser.parse_args(argv)
+    if args.command == 'bench':
+        bench(args.accounts, args.latency)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Delta Exchange product metadata (id, tick size) served from memory.
+
+check_for_open_trades and place_order each called client.get_product(symbol)
+for every account on every signal, only to read the product id and tick
+size, which almost never change. ProductRegistry loads the product list
+once at startup and serves both from memory:
+
+  * a daemon thread reloads the list every PRODUCT_REGISTRY_TTL seconds;
+    when a reload fails the previous list keeps being served;
+  * a symbol missing from the list (e.g. listed since the last reload) is
+    fetched on its own once and added;
+  * the order path only reads a dict, so it makes no REST call at all
+    unless the very first load failed. A failed load (Delta down, an error
+    page) never raises: the bots start with an empty table and the reload
+    is retried every PRODUCT_RETRY_SECONDS until it succeeds.
+"""
+import os
+import sys
+import threading
+import time
+
+import requests
+
+DELTA_BASE_URL = 'https://api.india.delta.exchange'
+PRODUCT_REGISTRY_TTL = float(os.environ.get('PRODUCT_REGISTRY_TTL', 3600))
+PRODUCT_RETRY_SECONDS = 60   # reload interval while no product list has loaded yet
+PRODUCTS_PAGE_SIZE = 500
+
+# Only these fields are used by the bots; tick_size arrives as a string.
+PRODUCT_FIELDS = ('id', 'symbol', 'tick_size', 'contract_type', 'contract_value')
+
+def delta_product_fetcher(http, base_url=DELTA_BASE_URL, contract_types='perpetual_futures,futures'):
+    """(fetch_all(), fetch_one(symbol)) over /v2/products with the shared HTTP client; both return None on failure."""
+    def fetch_all():
+        products, after = [], None
+        while True:
+            params = {'states': 'live', 'page_size': PRODUCTS_PAGE_SIZE}
+            if contract_types:
+                params['contract_types'] = contract_types
+            if after:
+                params['after'] = after
+            try:
+                r = http.get(f'{base_url}/v2/products', params=params)
+                body = r.json() if r.status_code == 200 else None
+            except (requests.RequestException, ValueError) as e:   # retries exhausted, or not JSON
+                print(f"Product list fetch failed: {e}")
+                return None
+            if body is None or 'result' not in body:
+                print(f"Product list fetch failed: {r.status_code} {r.text[:200]}")
+                return None
+            products.extend(body['result'])
+            after = (body.get('meta') or {}).get('after')
+            if not after:
+                return products
+
+    def fetch_one(symbol):
+        try:
+            r = http.get(f'{base_url}/v2/products/{symbol}')
+            body = r.json() if r.status_code == 200 else None
+        except (requests.RequestException, ValueError) as e:
+            print(f"Product {symbol} fetch failed: {e}")
+            return None
+        if body is None or 'result' not in body:
+            print(f"Product {symbol} fetch failed: {r.status_code} {r.text[:200]}")
+            return None
+        return body['result']
+
+    return fetch_all, fetch_one
+
+def trim(product):
+    trimmed = {k: product.get(k) for k in PRODUCT_FIELDS}
+    trimmed['tick_size'] = float(trimmed['tick_size'] or 0)
+    return trimmed
+
+class ProductRegistry:
+    """Symbol -> product metadata, reloaded in the background every `ttl` seconds."""
+
+    def __init__(self, fetchers, ttl=PRODUCT_REGISTRY_TTL, clock=time.time):
+        self.fetch_all, self.fetch_one = fetchers
+        self.ttl = ttl
+        self.clock = clock
+        self.products = {}
+        self.fetched_at = None
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.lookups = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        """Reload the product list; keep serving the old one if the fetch fails. Returns True on success."""
+        try:
+            products = self.fetch_all()
+        except Exception as e:
+            print(f"Product list fetch raised: {e!r}")
+            products = None
+        if not products:
+            self.failed_reloads += 1
+            if self.fetched_at is not None:
+                print(f"Product reload failed; serving the list from {self.clock() - self.fetched_at:.0f}s ago.")
+            else:
+                print(f"Product list not loaded; retrying in {min(self.ttl, PRODUCT_RETRY_SECONDS):.0f}s.")
+            sys.stdout.flush()
+            return False
+        indexed = {p['symbol']: trim(p) for p in products}
+        with self._lock:
+            # Symbols fetched on their own since the last reload stay until the list includes them
+            self.products = dict(self.products, **indexed)
+            self.fetched_at = self.clock()
+        self.reloads += 1
+        return True
+
+    def start(self):
+        """Load the list now, then reload it every ttl seconds on a daemon thread."""
+        if self.refresh():
+            print(f"Product registry: {len(self.products)} products loaded, reloading every {self.ttl:.0f}s")
+        else:
+            print("Product registry: starting empty; orders look products up once the list loads")
+        sys.stdout.flush()
+        self._thread = threading.Thread(target=self._run, name='product-registry', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.ttl if self.fetched_at is not None else min(self.ttl, PRODUCT_RETRY_SECONDS)):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.failed_reloads += 1
+                print(f"Product reload raised: {e}")
+                sys.stdout.flush()
+
+    def stop(self):
+        self._stop.set()
+
+    def get(self, symbol):
+        """Product metadata for symbol (id, tick_size as float, ...) from memory; raises KeyError if Delta has none."""
+        self.lookups += 1
+        product = self.products.get(symbol)
+        if product is not None:
+            return product
+        self.misses += 1
+        if not self.products:
+            self.refresh()   # the startup load failed: try the list again
+            product = self.products.get(symbol)
+        if product is None:
+            try:
+                fetched = self.fetch_one(symbol)
+            except Exception as e:
+                print(f"Product {symbol} fetch raised: {e!r}")
+                fetched = None
+            if fetched:
+                product = trim(fetched)
+                with self._lock:
+                    self.products[symbol] = product
+        if product is None:
+            if self.fetched_at is None:
+                raise KeyError(f"Delta product {symbol} unavailable: the product list has not loaded")
+            raise KeyError(f"Unknown Delta product {symbol}")
+        return product
+
+    def product_id(self, symbol):
+        return self.get(symbol)['id']
+
+    def tick_size(self, symbol):
+        return self.get(symbol)['tick_size']
+
+    def report(self):
+        age = f"{self.clock() - self.fetched_at:.0f}s old" if self.fetched_at else "never loaded"
+        return (f"Products: {len(self.products)} cached ({age}), {self.reloads} reloads, "
+                f"{self.failed_reloads} failed, {self.lookups} lookups, {self.misses} not in memory")
@@ -0,0 +1,80 @@
+"""Entry rules of the PSAR algo, shared by the live bot and the backtester.
+
+algo_parabolic_sar.py evaluates them on the last two closed candles (pandas
+rows from IndicatorEngine); backtest.py evaluates them on whole-history
+NumPy columns, with `previous` being the columns shifted by one bar. Only
+elementwise operators are used, so the same code serves both.
+
+Parameters are passed as a dict keyed by the bot's constant names.
+"""
+import numpy as np
+import pandas as pd
+
+from indicators import ADX, EMA, PSAR, RSI
+
+# The live bot's values (Archive/algo_parabolic_sar.py)
+DEFAULT_PARAMS = {
+    'PSAR_AF': 0.02,
+    'PSAR_MAX_AF': 0.2,
+    'SHORT_EMA_PERIOD': 20,
+    'LONG_EMA_PERIOD': 50,
+    'ADX_PERIOD': 14,
+    'ADX_THRESHOLD': 25,
+    'RSI_PERIOD': 14,
+    'RSI_OVERBOUGHT': 70,
+    'RSI_OVERSOLD': 30,
+    'RSI_MIDLINE': 50,
+    'TP_RISK_RATIO': 3.0,
+    'SL_PERCENTAGE': 0.005,
+}
+
+# Columns that must be set on both candles before a signal is trusted
+# (psar_up/psar_down are NaN by design while the other trend is active).
+REQUIRED_COLUMNS = ('psar', 'short_ema', 'long_ema', 'adx', 'rsi')
+
+def indicators(params):
+    """IndicatorEngine / indicator_columns build for these parameters."""
+    return {
+        ('psar', 'psar_up', 'psar_down'): PSAR(step=params['PSAR_AF'], max_step=params['PSAR_MAX_AF']),
+        'short_ema': EMA(params['SHORT_EMA_PERIOD']),
+        'long_ema': EMA(params['LONG_EMA_PERIOD']),
+        ('adx', 'plus_di', 'minus_di'): ADX(params['ADX_PERIOD']),
+        'rsi': RSI(params['RSI_PERIOD']),
+    }
+
+def entry_signals(latest, previous, params):
+    """(buy, sell): PSAR flip confirmed by the EMAs, RSI momentum and a strong ADX."""
+    # ADX filtering for trend strength
+    is_strong_trend = latest['adx'] > params['ADX_THRESHOLD']
+
+    # Buy: PSAR flips from above to below price (or the first up trend), short EMA above long EMA
+    # (or just crossed over), RSI not overbought and above the midline
+    psar_buy_flip = ((previous['psar'] > previous['close']) & (latest['psar'] < latest['close'])) | \
+                    (pd.isna(previous['psar_down']) & pd.notna(latest['psar_up']))
+    ema_buy_confirmation = (latest['short_ema'] > latest['long_ema']) | \
+                           ((previous['short_ema'] <= previous['long_ema']) & (latest['short_ema'] > latest['long_ema']))
+    rsi_buy_confirmation = (latest['rsi'] < params['RSI_OVERBOUGHT']) & (latest['rsi'] > params['RSI_MIDLINE'])
+
+    # Sell: the mirror image
+    psar_sell_flip = ((previous['psar'] < previous['close']) & (latest['psar'] > latest['close'])) | \
+                     (pd.isna(previous['psar_up']) & pd.notna(latest['psar_down']))
+    ema_sell_confirmation = (latest['short_ema'] < latest['long_ema']) | \
+                            ((previous['short_ema'] >= previous['long_ema']) & (latest['short_ema'] < latest['long_ema']))
+    rsi_sell_confirmation = (latest['rsi'] > params['RSI_OVERSOLD']) & (latest['rsi'] < params['RSI_MIDLINE'])
+
+    buy = psar_buy_flip & ema_buy_confirmation & rsi_buy_confirmation & is_strong_trend
+    sell = psar_sell_flip & ema_sell_confirmation & rsi_sell_confirmation & is_strong_trend
+    return buy, sell
+
+def bracket_prices(is_buy, candle, params):
+    """(stop_loss, take_profit) at SL_PERCENTAGE from the close and TP_RISK_RATIO times that risk."""
+    entry_price = candle['close']
+    direction = np.where(is_buy, 1.0, -1.0)
+    risk_points = entry_price * params['SL_PERCENTAGE']
+    # Fallback to a very small percentage if risk is invalid (e.g., if SL_PERCENTAGE is 0)
+    risk_points = np.where(risk_points > 0, risk_points, entry_price * 0.001)
+    stop_loss = entry_price - direction * risk_points
+    take_profit = entry_price + direction * risk_points * params['TP_RISK_RATIO']
+    if np.ndim(stop_loss) == 0:
+        return float(stop_loss), float(take_profit)
+    return stop_loss, take_profit
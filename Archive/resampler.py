@@ -0,0 +1,194 @@
+"""Higher-timeframe candles built locally from one base-resolution history.
+
+algo_parabolic_sar.py chose `required_history_days` per Time_period and
+downloaded 30 to 500 days of bars at that resolution, so switching to 1h
+or 1d meant a fresh download. Resampler keeps a single base history (the
+CandleStore's 5m bars) and derives 15m/1h/1d bars from it:
+
+  * buckets are UTC-aligned, like Delta's own candles: open of the first
+    base bar, max high, min low, close of the last, summed volume. A
+    bucket the base history only partly covers at its start is dropped;
+  * like IndicatorEngine, base bars are committed once they are final and
+    the last `pending` ones (which CandleStore may still revise) are folded
+    into a copy of the forming bucket every sync. A new base bar costs one
+    fold, whatever the history length or the timeframe;
+  * complete(close) tells whether the base bars of the bucket ending at
+    `close` have all been published, so a bar is not evaluated half-built.
+
+resample() computes the same bars over a whole array at once (backtests,
+parity):
+
+    python Archive/resampler.py parity [--candles Archive/candles_BTCUSD_5m.npy]
+    python Archive/resampler.py bench
+"""
+import argparse
+import time
+
+import numpy as np
+
+from candle_store import CANDLE_DTYPE, RESOLUTION_SECONDS, REVISE_BARS
+
+def check_timeframe(step, base_step):
+    if step % base_step or 86400 % step:
+        raise ValueError(f"cannot build {step}s bars from {base_step}s candles "
+                         f"(needs a multiple of the base that divides a day)")
+
+def resample(base, step):
+    """`step`-second OHLCV bars (UTC-aligned) from a finer CANDLE_DTYPE array; a leading partial bucket is dropped."""
+    if not len(base):
+        return base[:0]
+    buckets = base['time'] - base['time'] % step
+    starts = np.concatenate([[0], np.nonzero(np.diff(buckets))[0] + 1])
+    ends = np.append(starts[1:], len(base)) - 1
+    out = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    out['time'] = buckets[starts]
+    out['open'] = base['open'][starts]
+    out['high'] = np.maximum.reduceat(base['high'], starts)
+    out['low'] = np.minimum.reduceat(base['low'], starts)
+    out['close'] = base['close'][ends]
+    out['volume'] = np.add.reduceat(base['volume'], starts)
+    return out[1:] if base['time'][0] != buckets[0] else out
+
+class Resampler:
+    """`resolution` bars of a base-resolution CANDLE_DTYPE stream, updated one base bar at a time."""
+
+    def __init__(self, resolution, base_resolution, pending=REVISE_BARS, max_bars=None):
+        self.resolution = resolution
+        self.step = RESOLUTION_SECONDS[resolution]
+        self.base_step = RESOLUTION_SECONDS[base_resolution]
+        check_timeframe(self.step, self.base_step)
+        self.pending = pending
+        self.max_bars = max_bars
+        self.reset()
+
+    def reset(self):
+        self._buffer = np.empty(1024, dtype=CANDLE_DTYPE)
+        self._count = 0          # completed buckets in _buffer; the preview tail is written after them
+        self._partial = None     # [time, open, high, low, close, volume] of the forming bucket's final bars
+        self._skip = None        # start of a leading bucket the history only partly covers
+        self.last_time = None
+        self.bars = 0
+        self.data = self._buffer[:0]
+        self.last_base_time = None
+
+    def _fold(self, partial, bar):
+        """(completed bucket or None, forming bucket) after adding one base bar (time, o, h, l, c, v)."""
+        bucket = bar[0] - bar[0] % self.step
+        if partial is None or partial[0] != bucket:
+            if partial is None and self.last_time is None and bar[0] != bucket:
+                self._skip = bucket
+            return partial, [bucket, bar[1], bar[2], bar[3], bar[4], bar[5]]
+        if bar[2] > partial[2]:
+            partial[2] = bar[2]
+        if bar[3] < partial[3]:
+            partial[3] = bar[3]
+        partial[4] = bar[4]
+        partial[5] += bar[5]
+        return None, partial
+
+    def _reserve(self, size):
+        if size > len(self._buffer):
+            grown = np.empty(max(size, 2 * len(self._buffer)), dtype=CANDLE_DTYPE)
+            grown[:self._count] = self._buffer[:self._count]
+            self._buffer = grown
+
+    def _append(self, bucket):
+        if bucket[0] == self._skip:
+            return
+        self._reserve(self._count + 1)
+        self._buffer[self._count] = tuple(bucket)
+        self._count += 1
+        if self.max_bars and self._count >= 2 * self.max_bars:
+            self._buffer[:self.max_bars] = self._buffer[self._count - self.max_bars:self._count]
+            self._count = self.max_bars
+
+    def sync(self, base):
+        """Fold in the base bars newer than the last committed one; returns the bars, forming one included."""
+        final = len(base) - self.pending
+        start = 0 if self.last_time is None else int(np.searchsorted(base['time'], self.last_time, side='right'))
+        for bar in base[start:final].tolist():
+            done, self._partial = self._fold(self._partial, bar)
+            if done is not None:
+                self._append(done)
+            self.last_time = bar[0]
+            self.bars += 1
+
+        partial = list(self._partial) if self._partial is not None else None
+        tail = []
+        for bar in base[max(start, final):].tolist():
+            done, partial = self._fold(partial, bar)
+            if done is not None and done[0] != self._skip:
+                tail.append(done)
+        if partial is not None and partial[0] != self._skip:
+            tail.append(partial)
+        self._reserve(self._count + len(tail))
+        for i, bucket in enumerate(tail):
+            self._buffer[self._count + i] = tuple(bucket)
+        self.data = self._buffer[:self._count + len(tail)]
+        if len(base):
+            self.last_base_time = int(base['time'][-1])
+        return self.data
+
+    def complete(self, close):
+        """True once the base bar ending at `close` (or a later one) has been synced."""
+        return self.last_base_time is not None and self.last_base_time >= close - self.base_step
+
+def parity(candles, resolutions=('15m', '1h', '1d'), base_resolution='5m', chunk=7):
+    """Feed candles to a Resampler a few bars at a time, revising the pending ones; returns mismatching bars per resolution."""
+    mismatches = {}
+    for resolution in resolutions:
+        resampler = Resampler(resolution, base_resolution)
+        stream = candles.copy()
+        for end in range(chunk, len(candles) + chunk, chunk):
+            # The tail is first seen with provisional values, then revised, as CandleStore does
+            provisional = stream[:end].copy()
+            provisional['close'][-1:] *= 1.001
+            provisional['high'][-1:] *= 1.002
+            resampler.sync(provisional)
+            resampler.sync(stream[:end])
+        expected = resample(candles, RESOLUTION_SECONDS[resolution])
+        got = resampler.data
+        mismatches[resolution] = (len(got) != len(expected)) or int(sum(
+            np.sum(~np.isclose(got[f], expected[f], rtol=1e-12)) for f in CANDLE_DTYPE.names))
+    return mismatches
+
+def bench(sizes=(10000, 100000), ticks=200, resolution='1h', base_resolution='5m'):
+    """Per-tick cost of a full resample() vs Resampler.sync, by base history length."""
+    from indicators import random_walk_candles
+    step = RESOLUTION_SECONDS[resolution]
+    print(f"{'base bars':>9} {'full resample':>14} {'incremental':>12}")
+    for n in sizes:
+        candles = random_walk_candles(n + ticks)
+        started = time.perf_counter()
+        for i in range(ticks):
+            resample(candles[:n + i + 1], step)
+        full_ms = (time.perf_counter() - started) * 1000 / ticks
+        resampler = Resampler(resolution, base_resolution)
+        resampler.sync(candles[:n])
+        started = time.perf_counter()
+        for i in range(ticks):
+            resampler.sync(candles[:n + i + 1])
+        tick_ms = (time.perf_counter() - started) * 1000 / ticks
+        print(f"{n:>9} {full_ms:>12.3f}ms {tick_ms:>10.3f}ms")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('parity', help="Incremental vs full resampling over recorded 5m candles.")
+    p.add_argument('--candles', help="CandleStore .npy or candles API .json; a seeded random walk if omitted.")
+    p.add_argument('--bars', type=int, default=20000, help="Random-walk length when no --candles is given.")
+    sub.add_parser('bench', help="Per-tick cost vs history length.")
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        bench()
+        return
+    from indicators import load_candles, random_walk_candles
+    candles = load_candles(args.candles) if args.candles else random_walk_candles(args.bars)
+    mismatches = parity(candles)
+    for resolution, count in mismatches.items():
+        print(f"{resolution:<4} {'ok' if not count else f'{count} mismatching values'}")
+    raise SystemExit(1 if any(mismatches.values()) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Entry rules of trading_bot.py (RSI momentum with volume and ADX filters).
+
+Same conventions as psar_strategy.py: `latest`/`previous` are pandas rows
+in the live bot and whole-history NumPy columns in backtests, parameters
+are a dict keyed by the bot's constant names, and only elementwise
+operations are used.
+"""
+import numpy as np
+
+from indicators import ADX, EMA, RSI
+
+# The live bot's values (Archive/trading_bot.py)
+DEFAULT_PARAMS = {
+    'RSI_Period': 30,
+    'Vol_EMA_Pd': 14,
+    'ADX_Len': 14,
+    'adx_follow': 20,
+    'adx_BT': 45,
+    'adx_BTU': 50,
+    'TP_RISK_RATIO': 5,
+}
+
+REQUIRED_COLUMNS = ('rsi', 'VolEMA', 'adx')
+
+def indicators(params):
+    """IndicatorEngine / indicator_columns build for these parameters."""
+    return {
+        'rsi': RSI(params['RSI_Period']),
+        'VolEMA': EMA(params['Vol_EMA_Pd'], source='volume', adjust=True),
+        ('adx', 'plus_di', 'minus_di'): ADX(params['ADX_Len']),
+    }
+
+def signal_columns(latest, previous, params):
+    """Follow_Sell, Follow_Buy, BT_Sell and BT_Buy for the latest candle, plus the Prsi and vol_change they use."""
+    rsi, prsi, adx = latest['rsi'], previous['rsi'], latest['adx']
+    previous_volume = previous['volume']
+    vol_change = (latest['volume'] - previous_volume) / (previous_volume + (previous_volume == 0))   # 0 -> 1
+    volume_spike = (latest['volume'] > latest['VolEMA']) & (adx >= params['adx_follow']) & (vol_change >= 0.75)
+    return {
+        'Prsi': prsi,
+        'vol_change': vol_change,
+        'Follow_Sell': ((prsi - rsi) >= 3.0) & (prsi > 50) & (prsi < 55) & volume_spike,
+        'Follow_Buy': ((rsi - prsi) >= 3.0) & (prsi < 50) & (prsi > 45) & volume_spike,
+        'BT_Sell': ((prsi - rsi) >= 3.0) & (prsi > 65) & (adx >= params['adx_BT']) & (adx < params['adx_BTU']),
+        'BT_Buy': ((rsi - prsi) >= 3.0) & (prsi < 35) & (adx >= params['adx_BT']) & (adx < params['adx_BTU']),
+    }
+
+def entry_signals(latest, previous, params):
+    """(buy, sell), checked in the bot's order: Follow_Sell, Follow_Buy, BT_Sell, BT_Buy."""
+    signals = signal_columns(latest, previous, params)
+    follow_sell, follow_buy = signals['Follow_Sell'], signals['Follow_Buy']
+    sell = follow_sell | (np.logical_not(follow_buy) & signals['BT_Sell'])
+    buy = np.logical_not(sell) & (follow_buy | signals['BT_Buy'])
+    return buy, sell
+
+def bracket_prices(is_buy, candle, params):
+    """(stop_loss, take_profit): stop beyond the signal candle's low/high, target TP_RISK_RATIO times that risk."""
+    entry_price = candle['close']
+    direction = np.where(is_buy, 1.0, -1.0)
+    risk_points = direction * (entry_price - np.where(is_buy, candle['low'], candle['high']))
+    # A candle closing at its extreme leaves no risk: fall back to 0.1% of the entry
+    risk_points = np.where(risk_points > 0, risk_points, entry_price * 0.001)
+    stop_loss = entry_price - direction * risk_points
+    take_profit = entry_price + direction * risk_points * params['TP_RISK_RATIO']
+    if np.ndim(stop_loss) == 0:
+        return float(stop_loss), float(take_profit)
+    return stop_loss, take_profit
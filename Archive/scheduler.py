@@ -0,0 +1,70 @@
+"""Candle-close scheduler for the Delta bots.
+
+The bots used to wake every second and act when the IST clock read hh:mm:06,
+re-evaluating a 5m strategy five times per bar and missing the minute
+entirely when an iteration ran past the 6th second. CandleScheduler sleeps
+until the next candle close (UTC-aligned, as Delta's candles are) plus a
+settle delay for the exchange to publish the closed bar:
+
+  * the sleep target is recomputed from the wall clock after every wake-up,
+    so early wake-ups and clock drift do not shift the schedule;
+  * if an evaluation overruns one or more closes, the next wait() returns
+    the most recent missed close straight away and counts the ones skipped;
+  * new_bar() tells the bot whether the exchange has actually published a
+    newer closed candle than the last one evaluated.
+"""
+import os
+import time
+
+from candle_store import RESOLUTION_SECONDS
+
+SETTLE_SECONDS = float(os.environ.get('CANDLE_SETTLE_SECONDS', 6))
+
+class CandleScheduler:
+    """wait() for each `resolution` candle close; one evaluation per close."""
+
+    def __init__(self, resolution, settle=SETTLE_SECONDS, clock=time.time, sleep=time.sleep):
+        self.step = RESOLUTION_SECONDS[resolution]
+        self.settle = settle
+        self.clock = clock
+        self.sleep = sleep
+        self.last_close = None
+        self.last_bar = None
+        self.evaluations = 0
+        self.missed_closes = 0
+        self.stale_closes = 0
+        self.max_lateness = 0.0
+
+    def wait(self):
+        """Block until the next close + settle; returns that close time (epoch seconds)."""
+        now = self.clock()
+        due = int((now - self.settle) // self.step * self.step)   # latest close whose wake-up time has passed
+        if self.last_close is not None and due > self.last_close:
+            missed = (due - self.last_close) // self.step - 1
+            if missed:
+                print(f"Evaluation overran {missed} candle close(s); catching up with the latest one.")
+            self.missed_closes += missed
+            close = due
+        else:
+            close = due + self.step
+            while True:
+                remaining = close + self.settle - self.clock()
+                if remaining <= 0:
+                    break
+                self.sleep(remaining)
+            self.max_lateness = max(self.max_lateness, -remaining)
+        self.last_close = close
+        self.evaluations += 1
+        return close
+
+    def new_bar(self, bar_time):
+        """True (and remembered) if bar_time is newer than the last evaluated candle."""
+        if self.last_bar is not None and bar_time <= self.last_bar:
+            self.stale_closes += 1
+            return False
+        self.last_bar = bar_time
+        return True
+
+    def report(self):
+        return (f"Scheduler: {self.evaluations} closes, {self.missed_closes} missed by overruns, "
+                f"{self.stale_closes} without a new candle, max wake-up lateness {self.max_lateness * 1000:.0f}ms")
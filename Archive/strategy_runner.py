@@ -0,0 +1,326 @@
+"""One process running many (strategy, symbol, timeframe) instances.
+
+Each bot script hardcodes one symbol and one Time_period, so another market
+or timeframe meant another copy of the script and another workflow job.
+StrategyRunner hosts any number of instances of the strategy modules used
+by the bots (psar_strategy, rsi_adx_strategy):
+
+  * candles are fetched once per symbol, at a base resolution: the finest
+    timeframe among that symbol's instances. Coarser timeframes are
+    resampled locally from the base bars (resampler.Resampler, one bar
+    folded in per close), so BTCUSD 5m and BTCUSD 1h share one CandleStore
+    and one fetch per close;
+  * the runner wakes on every close of the finest timeframe, syncs the
+    symbols with an instance closing there (in parallel), then evaluates
+    those instances concurrently on a thread pool, each with its own
+    IndicatorEngine;
+  * a signal goes through the same OrderRouter / AccountMirror /
+    ProductRegistry path as the bots, to the accounts configured in the
+    environment (DELTA_API_KEY_1 / DELTA_API_SECRET_1, _2, ...). Without
+    accounts, or with --dry-run, signals are only logged;
+  * per-instance evaluation latency and per-symbol sync latency are
+    printed with the hourly report.
+
+    python Archive/strategy_runner.py                                  # the two bots' setups
+    python Archive/strategy_runner.py --instance psar:BTCUSD:5m:2 --instance psar:ETHUSD:15m:1 \\
+                                      --instance rsi_adx:BTCUSD:1h:5 --dry-run
+    python Archive/strategy_runner.py --config runner.json
+
+A config file holds {"instances": [{"strategy": "psar", "symbol": "BTCUSD",
+"timeframe": "15m", "quantity": 2, "params": {"ADX_THRESHOLD": 30}}, ...]}.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import HttpClient, LatencyHistogram
+from account_mirror import AccountMirror
+from backtest import STRATEGIES
+from candle_store import RESOLUTION_SECONDS, CandleFetchError, CandleStore, delta_candle_fetcher
+from indicators import IndicatorEngine
+from order_router import OrderRouter, delta_clients, has_open_trades, place_bracket_order
+from product_registry import ProductRegistry, delta_product_fetcher
+from resampler import Resampler
+from scheduler import CandleScheduler
+
+HISTORY_BARS = int(os.environ.get('RUNNER_HISTORY_BARS', 500))   # warm-up bars per instance, at its timeframe
+RUNNER_THREADS = int(os.environ.get('RUNNER_THREADS', 8))
+TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
+TELEGRAM_CHAT_ID = os.environ.get('TELEGRAM_CHAT_ID')
+
+# What Archive/algo_parabolic_sar.py and Archive/trading_bot.py run
+DEFAULT_INSTANCES = [
+    {'strategy': 'psar', 'symbol': 'BTCUSD', 'timeframe': '5m', 'quantity': 2},
+    {'strategy': 'rsi_adx', 'symbol': 'BTCUSD', 'timeframe': '5m', 'quantity': 5},
+]
+
+def resolution_name(seconds):
+    for name, step in RESOLUTION_SECONDS.items():
+        if step == seconds:
+            return name
+    raise ValueError(f"no Delta candle resolution of {seconds}s")
+
+def credentials_from_env(environ=os.environ):
+    """[{'api_key', 'api_secret'}] from DELTA_API_KEY_n / DELTA_API_SECRET_n, n = 1, 2, ..."""
+    credentials = []
+    n = 1
+    while environ.get(f'DELTA_API_KEY_{n}'):
+        credentials.append({'api_key': environ[f'DELTA_API_KEY_{n}'], 'api_secret': environ.get(f'DELTA_API_SECRET_{n}')})
+        n += 1
+    return credentials
+
+class Instance:
+    """One strategy module on one symbol and timeframe, with its own indicator state."""
+
+    def __init__(self, strategy, symbol, timeframe, quantity=1, params=None, history_bars=HISTORY_BARS):
+        self.name = f"{strategy}:{symbol}:{timeframe}"
+        self.strategy = STRATEGIES[strategy]
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.step = RESOLUTION_SECONDS[timeframe]
+        self.quantity = quantity
+        self.params = dict(self.strategy.DEFAULT_PARAMS, **(params or {}))
+        self.history_bars = history_bars
+        self.engine = IndicatorEngine(lambda: self.strategy.indicators(self.params))
+        self.latency = LatencyHistogram()
+        self.evaluations = 0
+        self.stale = 0
+        self.signals = 0
+
+    def evaluate(self, candles, close):
+        """(side or None, latest row) for the bar that closed at `close`; None if the exchange has not published it."""
+        rows = self.engine.sync(candles, until=close)
+        if len(rows) < 2 or rows[-1]['time'] != close - self.step:
+            self.stale += 1
+            return None
+        previous, latest = rows[-2:]
+        self.evaluations += 1
+        required = list(self.strategy.REQUIRED_COLUMNS)
+        if latest[required].isna().any() or previous[required].isna().any():
+            return None, latest
+        buy, sell = self.strategy.entry_signals(latest, previous, self.params)
+        # Sell wins a tie, as in algo_parabolic_sar.py (rsi_adx never signals both)
+        return ('sell' if sell else 'buy' if buy else None), latest
+
+class StrategyRunner:
+    """Syncs one CandleStore per symbol and evaluates every instance due at each candle close."""
+
+    def __init__(self, instances, http, router=None, mirror=None, products=None, notify=None, threads=RUNNER_THREADS):
+        self.instances = list(instances)
+        self.http = http
+        self.router = router
+        self.mirror = mirror
+        self.products = products
+        self.notify = notify or (lambda message: None)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='runner')
+
+        self.stores = {}
+        self.resamplers = {}
+        fetch = delta_candle_fetcher(http)
+        for symbol in sorted({i.symbol for i in self.instances}):
+            group = [i for i in self.instances if i.symbol == symbol]
+            base = min(i.step for i in group)
+            for i in group:
+                if i.step % base:
+                    raise ValueError(f"{i.name}: {i.timeframe} is not a multiple of the {resolution_name(base)} base candles")
+            history = max(i.history_bars * i.step for i in group) + max(i.step for i in group)
+            self.stores[symbol] = CandleStore(symbol, resolution_name(base), fetch, history_seconds=history)
+            for step in sorted({i.step for i in group if i.step != base}):
+                self.resamplers[(symbol, step)] = Resampler(resolution_name(step), resolution_name(base),
+                                                            max_bars=history // step + 1)
+        tick = math.gcd(*(i.step for i in self.instances))
+        self.scheduler = CandleScheduler(resolution_name(tick))
+        self.sync_latency = {symbol: LatencyHistogram() for symbol in self.stores}
+        self.tick_latency = LatencyHistogram()
+        if self.products is not None:
+            self.check_products()
+
+    def check_products(self):
+        """Look every configured symbol up once; raises ValueError if Delta's product list lacks one."""
+        unknown = []
+        for symbol in self.stores:
+            try:
+                self.products.get(symbol)
+            except KeyError as e:
+                if self.products.fetched_at is not None:
+                    unknown.append(symbol)
+                else:
+                    print(f"{symbol}: {e.args[0]}; retried on the first signal.")
+                    sys.stdout.flush()
+            except Exception as e:
+                print(f"{symbol}: product lookup failed at startup ({e!r}); retried on the first signal.")
+                sys.stdout.flush()
+        if unknown:
+            raise ValueError(f"Unknown Delta product(s): {', '.join(unknown)}")
+
+    def _sync(self, symbol):
+        started = time.perf_counter()
+        try:
+            self.stores[symbol].sync()
+            ok = True
+        except CandleFetchError as e:
+            print(f"{symbol}: error fetching candles: {e.status_code}. Response: {e.text}")
+            ok = False
+        self.sync_latency[symbol].record(time.perf_counter() - started, ok=ok)
+        return ok
+
+    def candles(self, symbol, step, close):
+        """The symbol's bars at `step` up to `close`; a resampled bar is only complete once its last base bar is in."""
+        store = self.stores[symbol]
+        if step == store.step:
+            return store.data
+        resampler = self.resamplers[(symbol, step)]
+        bars = resampler.sync(store.data)
+        if not resampler.complete(close):
+            bars = bars[bars['time'] < close - step]   # the last bucket is incomplete: leave it out (stale)
+        return bars
+
+    def _evaluate(self, instance, candles, close):
+        started = time.perf_counter()
+        result = instance.evaluate(candles, close)
+        instance.latency.record(time.perf_counter() - started)
+        return result
+
+    def tick(self, close):
+        """Sync and evaluate everything closing at `close`; returns {instance name: side} of the signals."""
+        started = time.perf_counter()
+        due = [i for i in self.instances if close % i.step == 0]
+        symbols = sorted({i.symbol for i in due})
+        synced = dict(zip(symbols, self.pool.map(self._sync, symbols)))
+        due = [i for i in due if synced[i.symbol]]
+
+        # Instances sharing a symbol and timeframe share one resampled array
+        frames = {(i.symbol, i.step): None for i in due}
+        for key in frames:
+            frames[key] = self.candles(*key, close)
+        results = list(self.pool.map(lambda i: self._evaluate(i, frames[(i.symbol, i.step)], close), due))
+
+        signals = {}
+        for instance, result in zip(due, results):
+            if result is None:
+                print(f"> {instance.name}: no new candle closed at {close} yet. Skipping.")
+                continue
+            side, latest = result
+            if side:
+                instance.signals += 1
+                signals[instance.name] = side
+                self.trade(instance, side, latest)
+        self.tick_latency.record(time.perf_counter() - started)
+        print(f"> Close {close}: {len(due)} instance(s) handled in {(time.perf_counter() - started) * 1000:.0f}ms, "
+              f"signals: {signals or 'none'}")
+        sys.stdout.flush()
+        return signals
+
+    def trade(self, instance, side, latest):
+        stop_loss_price, take_profit_price = instance.strategy.bracket_prices(side == 'buy', latest, instance.params)
+        print(f"{instance.name}: {side.upper()} 🔔signal at close {latest['close']:.2f}, "
+              f"SL {stop_loss_price:.2f}, TP {take_profit_price:.2f}")
+        sys.stdout.flush()
+        if self.router is None:
+            self.notify(f"🔔 *SIGNAL* `{instance.name}` *{side.upper()}* at `{latest['close']:.2f}` (not traded)")
+            return
+        try:
+            product = self.products.get(instance.symbol)
+            results = self.router.route(
+                lambda client: has_open_trades(client, instance.symbol, self.products, self.mirror),
+                lambda client: place_bracket_order(client, product, side, instance.quantity, stop_loss_price, take_profit_price),
+            )
+        except Exception as e:
+            # A delisted symbol or a failed product lookup only costs this instance its signal
+            print(f"{instance.name}: {side.upper()} signal not traded: {e!r}")
+            sys.stdout.flush()
+            self.notify(f"⚠️ *SIGNAL NOT TRADED* ⚠️\nInstance: `{instance.name}`\nSide: *{side.upper()}*\nError: `{e}`")
+            return
+        for result in results:
+            if result.outcome == 'placed':
+                order = result.order
+                self.notify(f"🔔 *TRADE ALERT!* 🔔\nInstance: `{instance.name}`\nClient: `{result.account}`\n"
+                            f"Side: *{side.upper()}*\nQuantity: `{instance.quantity}`\n"
+                            f"SL: `{order['bracket_stop_loss_price']:.2f}`\nTP: `{order['bracket_take_profit_price']:.2f}`")
+            elif result.outcome in ('failed', 'timeout', 'busy', 'error'):
+                self.notify(f"⚠️ *ORDER NOT CONFIRMED* ⚠️\nInstance: `{instance.name}`\nClient: `{result.account}`\n"
+                            f"Side: *{side.upper()}*\nStatus: `{result.outcome}`")
+
+    def report(self):
+        lines = [f"tick (sync + evaluate all due): {self.tick_latency.summary()}"] if self.tick_latency.total else []
+        lines += [f"sync {symbol} {store.resolution}: {self.sync_latency[symbol].summary()}"
+                  for symbol, store in self.stores.items() if self.sync_latency[symbol].total]
+        lines += [f"{i.name}: {i.latency.summary()} evaluations={i.evaluations} stale={i.stale} signals={i.signals}"
+                  for i in self.instances if i.latency.total]
+        return lines
+
+    def run(self):
+        for symbol, store in self.stores.items():
+            names = ", ".join(i.name for i in self.instances if i.symbol == symbol)
+            print(f"{symbol}: {store.resolution} base candles for {names}")
+        sys.stdout.flush()
+        while True:
+            close = self.scheduler.wait()
+            try:
+                self.tick(close)
+            except Exception as e:
+                print(f"> Close {close}: tick failed ({e!r}); waiting for the next close.")
+                sys.stdout.flush()
+            if close % 3600 == 0:
+                print("Runner latency:")
+                for line in self.report():
+                    print(f"  {line}")
+                self.http.print_latency_report()
+                if self.router:
+                    self.router.print_latency_report()
+                    print(self.products.report())
+                    print(self.mirror.report())
+                print(self.scheduler.report())
+                sys.stdout.flush()
+
+def parse_instance(text):
+    """'strategy:symbol:timeframe[:quantity]' -> Instance keyword arguments."""
+    parts = text.split(':')
+    if len(parts) not in (3, 4):
+        raise ValueError(f"expected strategy:symbol:timeframe[:quantity], got {text!r}")
+    spec = {'strategy': parts[0], 'symbol': parts[1], 'timeframe': parts[2]}
+    if len(parts) == 4:
+        spec['quantity'] = int(parts[3])
+    return spec
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--instance', action='append', default=[], metavar='STRATEGY:SYMBOL:TIMEFRAME[:QTY]',
+                        help=f"Strategy instance to run (repeatable); strategies: {', '.join(STRATEGIES)}.")
+    parser.add_argument('--config', help="JSON file with an 'instances' list.")
+    parser.add_argument('--dry-run', action='store_true', help="Log signals without placing orders.")
+    args = parser.parse_args(argv)
+
+    specs = [parse_instance(text) for text in args.instance]
+    if args.config:
+        with open(args.config) as f:
+            specs += json.load(f)['instances']
+    instances = [Instance(**spec) for spec in (specs or DEFAULT_INSTANCES)]
+
+    http = HttpClient(headers={'Accept': 'application/json'})
+
+    def notify(message):
+        if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
+            try:
+                http.post(f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage",
+                          json={'chat_id': TELEGRAM_CHAT_ID, 'text': message, 'parse_mode': 'Markdown'}, timeout=10)
+            except Exception as e:
+                print(f"Error sending Telegram message: {e}")
+
+    router = mirror = products = None
+    credentials = credentials_from_env()
+    if credentials and not args.dry_run:
+        router = OrderRouter(delta_clients(credentials))
+        mirror = AccountMirror(router.clients).start()
+        products = ProductRegistry(delta_product_fetcher(http)).start()
+    else:
+        print("No DELTA_API_KEY_n accounts configured (or --dry-run): signals are logged, not traded.")
+    StrategyRunner(instances, http, router, mirror, products, notify).run()
+
+if __name__ == "__main__":
+    main()
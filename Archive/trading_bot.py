@@ -1,14 +1,19 @@
-mport sys # Import sys for flushing output
-import time # Import time for time.localtime() and time.sleep()
-import pandas as pd
+import sys # Import sys for flushing output
 import requests
 import datetime
-from ta.momentum import RSIIndicator as RSI
-from ta.trend import ADXIndicator
-from delta_rest_client import DeltaRestClient, OrderType # Ensure this is imported
 import pytz # Import pytz for timezone conversion
 import os # Import os (needed for os.environ.get calls for credentials, even if hardcoded)
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_client import HttpClient
+from candle_store import CandleFetchError, CandleStore, delta_candle_fetcher
+from indicators import IndicatorEngine
+from rsi_adx_strategy import bracket_prices, signal_columns, indicators as strategy_indicators
+from scheduler import CandleScheduler
+from order_router import OrderRouter, bracket_order_payload, delta_clients, has_open_trades
+from product_registry import ProductRegistry, delta_product_fetcher
+from account_mirror import AccountMirror
+
 # ==== Store all client credentials here ====
 # WARNING: API KEYS AND SECRETS ARE HARDCODED BELOW.
 # THIS IS HIGHLY INSECURE FOR PRODUCTION OR PUBLIC REPOSITORIES.
@@ -41,25 +46,33 @@ TP_RISK_RATIO = 5
 # Define the target timezone
 INDIA_TZ = pytz.timezone('Asia/Kolkata')
 
-# ==== Helper Function for Price Rounding ====
-def round_to_tick_size(price, tick_size):
-    """
-    Rounds a price to the nearest multiple of the exchange's tick size.
-    Ensures inputs are floats for division and handles zero tick_size.
-    """
-    try:
-        price_f = float(price)
-        tick_size_f = float(tick_size)
-    except (ValueError, TypeError) as e:
-        print(f"Error converting price ({price}) or tick_size ({tick_size}) to float in round_to_tick_size: {e}")
-        sys.stdout.flush()
-        return float(price) if isinstance(price, (int, float)) else 0.0
+# Shared keep-alive client for Delta Exchange and Telegram (rate limits, retries, latency stats)
+HTTP = HttpClient(headers={'Accept': 'application/json'})
 
-    if tick_size_f == 0:
-        print("Warning: tick_size is zero in round_to_tick_size. Returning original price.")
-        sys.stdout.flush()
-        return price_f
-    return round(price_f / tick_size_f) * tick_size_f
+# Product id and tick size, loaded once and reloaded in the background instead of fetched per order
+PRODUCTS = ProductRegistry(delta_product_fetcher(HTTP)).start()
+
+# Candles since yesterday midnight are kept locally (and on disk); each minute
+# only the bars since the last stored one are fetched.
+CANDLES = CandleStore(symbol, Time_period, delta_candle_fetcher(HTTP), history_seconds=3 * 86400)
+
+# The constants above, as passed to the strategy functions shared with the backtester
+STRATEGY = {
+    'RSI_Period': RSI_Period, 'Vol_EMA_Pd': Vol_EMA_Pd, 'ADX_Len': ADX_Len,
+    'adx_follow': adx_follow, 'adx_BT': adx_BT, 'adx_BTU': adx_BTU, 'TP_RISK_RATIO': TP_RISK_RATIO,
+}
+
+# Streaming RSI / volume EMA / ADX: same values as `ta` and pandas, updated once per new candle
+INDICATORS = IndicatorEngine(lambda: strategy_indicators(STRATEGY))
+
+# Wakes once per Time_period candle close (+ CANDLE_SETTLE_SECONDS) instead of polling every second
+SCHEDULER = CandleScheduler(Time_period)
+
+# One cached DeltaRestClient per account; a signal is checked and placed on all accounts in parallel
+ORDERS = OrderRouter(delta_clients(client_credentials))
+
+# Open orders and positions per account, kept current from Delta's private WebSocket
+MIRROR = AccountMirror(ORDERS.clients).start()
 
 # ==== Function to send Telegram messages ====
 def send_telegram_message(message):
@@ -80,9 +93,9 @@ def send_telegram_message(message):
         'parse_mode': 'Markdown' # Optional: allows bold, italics, etc.
     }
     try:
-        response = requests.post(url, json=payload)
+        response = HTTP.post(url, json=payload, timeout=10)
         response.raise_for_status() # Raise an exception for HTTP errors
-        print(f"Telegram message sent successfully.")
+        print("Telegram message sent successfully.")
         sys.stdout.flush()
     except requests.exceptions.RequestException as e:
         print(f"Error sending Telegram message: {e}")
@@ -95,45 +108,17 @@ def send_telegram_message(message):
 # ==== Function to check for open orders and positions ====
 def check_for_open_trades(client, symbol):
     """
-    Checks if there are any open orders or current positions for the given symbol
-    for a specific client account.
+    Checks if there are any open orders, or a current position in the given symbol,
+    for a specific client account (see order_router.has_open_trades).
     Args:
         client (DeltaRestClient): An initialized DeltaRestClient instance.
         symbol (str): The trading pair symbol.
     Returns:
         bool: True if there are open orders or a non-zero position, False otherwise.
     """
-    truncated_api_key = client.api_key[:6] + '...' + client.api_key[-4:] if client.api_key else "N/A"
-    try:
-        open_orders_response = client.get_live_orders()
-        if open_orders_response and isinstance(open_orders_response, list) and len(open_orders_response) > 0:
-            print(f"Client {truncated_api_key}: Found {len(open_orders_response)} open order(s). Skipping new order.")
-            sys.stdout.flush()
-            return True
-
-        product = client.get_product(symbol)
-        market_id = product['id']
-
-        position_response = client.get_position(product_id=market_id)
-
-        if position_response and isinstance(position_response, dict) and 'size' in position_response:
-            position_size = float(position_response.get('size', 0))
-            if abs(position_size) > 0:
-                print(f"Client {truncated_api_key}: Found an open position of size {position_size} for {symbol}. Skipping new order.")
-                sys.stdout.flush()
-                return True
-
-        print(f"Client {truncated_api_key}: No open orders or current positions found. Ready to place new order.")
-        sys.stdout.flush()
-        return False
-
-    except Exception as e:
-        print(f"Client {truncated_api_key}: Error checking for open trades: {e}")
-        sys.stdout.flush()
-        import traceback
-        traceback.print_exc()
-        sys.stdout.flush()
-        return True
+    # From the local mirror when it is in sync with the exchange (see Archive/account_mirror.py), else over REST.
+    # Any open order on the account blocks a new entry, whatever its product.
+    return has_open_trades(client, symbol, PRODUCTS, MIRROR, any_product=True)
 
 
 # ==== Trade Execution Function ====
@@ -147,86 +132,48 @@ def place_order(client, side, symbol, size, signal_candle_data):
         symbol (str): The trading pair symbol.
         size (int): The quantity of the asset to trade.
         signal_candle_data (pd.Series): The pandas Series containing the OHLCV data for the candle that generated the signal.
+
+    Returns:
+        dict: The order as sent (entry estimate, rounded SL/TP) with the exchange response, or None if it failed.
     """
     truncated_api_key = client.api_key[:6] + '...' + client.api_key[-4:] if client.api_key else "N/A"
     try:
-        product = client.get_product(symbol)
+        # From memory, no REST call on the order path (see Archive/product_registry.py)
+        product = PRODUCTS.get(symbol)
         market_id = product['id']
-        tick_size = product.get('tick_size', 0.01)
+        tick_size = product['tick_size']
 
         print(f"Client {truncated_api_key}: Preparing bracket order for {symbol} with market ID: {market_id}")
         sys.stdout.flush()
 
-        if side not in ['buy', 'sell']:
-            raise ValueError("Invalid side, must be 'buy' or 'sell'")
-
         entry_price_estimate = float(signal_candle_data['close'])
-        stop_loss_price = 0.0
-        take_profit_price = 0.0
-        risk_points = 0.0
-
-        if side == 'buy':
-            stop_loss_price = float(signal_candle_data['low'])
-            risk_points = entry_price_estimate - stop_loss_price
-            if risk_points <= 0:
-                print(f"Client {truncated_api_key}: Warning: Calculated risk for BUY is non-positive. Adjusting SL to be 0.1% below entry.")
-                sys.stdout.flush()
-                risk_points = entry_price_estimate * 0.001
-                stop_loss_price = entry_price_estimate - risk_points
-            take_profit_price = entry_price_estimate + (risk_points * TP_RISK_RATIO)
-
-        elif side == 'sell':
-            stop_loss_price = float(signal_candle_data['high'])
-            risk_points = stop_loss_price - entry_price_estimate
-            if risk_points <= 0:
-                print(f"Client {truncated_api_key}: Warning: Calculated risk for SELL is non-positive. Adjusting SL to be 0.1% above entry.")
-                sys.stdout.flush()
-                risk_points = entry_price_estimate * 0.001
-                stop_loss_price = entry_price_estimate + risk_points
-            take_profit_price = entry_price_estimate - (risk_points * TP_RISK_RATIO)
+        # SL beyond the signal candle's low (buy) / high (sell), or 0.1% away if it closed at that extreme
+        stop_loss_price, take_profit_price = bracket_prices(side == 'buy', signal_candle_data, STRATEGY)
+        risk_points = abs(entry_price_estimate - stop_loss_price)
 
         print(f"Client {truncated_api_key}: DEBUG: tick_size from API: {tick_size} (type: {type(tick_size)})")
         print(f"Client {truncated_api_key}: DEBUG: stop_loss_price before rounding: {stop_loss_price} (type: {type(stop_loss_price)})")
         print(f"Client {truncated_api_key}: DEBUG: take_profit_price before rounding: {take_profit_price} (type: {type(take_profit_price)})")
         sys.stdout.flush()
 
-        stop_loss_price = round_to_tick_size(stop_loss_price, tick_size)
-        take_profit_price = round_to_tick_size(take_profit_price, tick_size)
+        # Rounded to tick_size, as in the runner's orders (order_router.bracket_order_payload)
+        payload = bracket_order_payload(product, side, size, stop_loss_price, take_profit_price)
+        stop_loss_price, take_profit_price = payload['bracket_stop_loss_price'], payload['bracket_take_profit_price']
 
         print(f"Client {truncated_api_key}: Calculated Entry Estimate: {entry_price_estimate:.2f}, SL: {stop_loss_price:.2f}, TP: {take_profit_price:.2f}")
         print(f"Client {truncated_api_key}: Risk Points: {risk_points:.2f}, Reward Points: {risk_points * TP_RISK_RATIO:.2f}")
         sys.stdout.flush()
 
-        payload = {
-            "product_id": market_id,
-            "size": size,
-            "side": side,
-            "order_type": "market_order",
-            "post_only": False,
-            "bracket_stop_loss_price": stop_loss_price,
-            "bracket_take_profit_price": take_profit_price,
-            "bracket_stop_loss_limit_price": stop_loss_price,
-            "bracket_take_profit_limit_price": take_profit_price,
-        }
-
         response = client.request("POST", "/v2/orders", payload, auth=True)
         order_response_data = response.json()
         print(f"Client {truncated_api_key}: Bracket order placed for {side.upper()}. Response: {order_response_data}")
         sys.stdout.flush()
-
-        # Send Telegram notification after successful order placement
-        telegram_message = (
-            f"🔔 *TRADE ALERT!* 🔔\n"
-            f"Client: `{truncated_api_key}`\n"
-            f"Symbol: `{symbol}`\n"
-            f"Side: *{side.upper()}*\n"
-            f"Quantity: `{size}`\n"
-            f"Entry Est: `{entry_price_estimate:.2f}`\n"
-            f"SL: `{stop_loss_price:.2f}`\n"
-            f"TP: `{take_profit_price:.2f}`\n"
-            f"Response: ```json\n{order_response_data}\n```"
-        )
-        send_telegram_message(telegram_message)
+        return {
+            'entry_price_estimate': entry_price_estimate,
+            'stop_loss_price': stop_loss_price,
+            'take_profit_price': take_profit_price,
+            'response': order_response_data,
+        }
 
     except Exception as e:
         print(f"Client {truncated_api_key}: Order failed: {e}")
@@ -242,119 +189,116 @@ def place_order(client, side, symbol, size, signal_candle_data):
             f"Error: `{e}`"
         )
         send_telegram_message(telegram_error_message)
+        return None
+
+def send_trade_alert(truncated_api_key, side, symbol, size, order):
+    """Telegram notification for an order returned by place_order (sent once every account has been routed)."""
+    telegram_message = (
+        f"🔔 *TRADE ALERT!* 🔔\n"
+        f"Client: `{truncated_api_key}`\n"
+        f"Symbol: `{symbol}`\n"
+        f"Side: *{side.upper()}*\n"
+        f"Quantity: `{size}`\n"
+        f"Entry Est: `{order['entry_price_estimate']:.2f}`\n"
+        f"SL: `{order['stop_loss_price']:.2f}`\n"
+        f"TP: `{order['take_profit_price']:.2f}`\n"
+        f"Response: ```json\n{order['response']}\n```"
+    )
+    send_telegram_message(telegram_message)
 
 # ==== Main Loop ====
 while True:
+    # Sleep until the next Time_period candle has closed, plus a settle delay
+    candle_close = SCHEDULER.wait()
+
+    if candle_close % 3600 == 0: # Hourly HTTP latency and scheduler summary, before any `continue` below can skip it
+        HTTP.print_latency_report()
+        ORDERS.print_latency_report()
+        print(PRODUCTS.report())
+        print(MIRROR.report())
+        print(SCHEDULER.report())
+        sys.stdout.flush()
+
     # Get current time in UTC, then convert to India timezone
     current_utc_time = datetime.datetime.now(pytz.utc)
     current_ist_time = current_utc_time.astimezone(INDIA_TZ)
+    sys.stdout.flush()
 
-    cmin = current_ist_time.strftime("%M")
-    csec = current_ist_time.strftime("%S")
-
-    time.sleep(1)
-
-    if int(cmin) % 1 == 0 and int(csec) == 6:
-        sys.stdout.flush()
-
-        yesterday = datetime.date.today() - datetime.timedelta(days=1)
-        start_date = datetime.datetime.combine(yesterday, datetime.time(0, 0, 0))
-        start_timestamp = int(pytz.utc.localize(start_date).timestamp())
-        end_timestamp = int(datetime.datetime.now(pytz.utc).timestamp())
-
-
-        headers = {'Accept': 'application/json'}
-        r = requests.get(
-            'https://api.india.delta.exchange/v2/history/candles',
-            params={'resolution': Time_period, 'symbol': symbol, 'start': start_timestamp, 'end': end_timestamp},
-            headers=headers
-        )
-
-        if r.status_code == 200 and 'result' in r.json():
-            df = pd.DataFrame(r.json()['result'])
-            df['date_time'] = pd.to_datetime(df['time'], unit='s').dt.tz_localize('UTC').dt.tz_convert(INDIA_TZ).dt.tz_localize(None)
-            df = df.sort_values(by='time', ascending=True)
-
-            if len(df) < max(RSI_Period, ADX_Len) + 2:
-                print("Not enough historical data from API to calculate indicators. Waiting for more data.")
-                sys.stdout.flush()
-                time.sleep(55)
-                continue
-
-            df['rsi'] = RSI(df.close, RSI_Period).rsi()
-            df['Prsi'] = df['rsi'].shift(1)
-            df['VolEMA'] = df['volume'].ewm(span=Vol_EMA_Pd).mean()
-            df['vol_change'] = (df['volume'] - df['volume'].shift(1)) / df['volume'].shift(1).replace(0, 1)
-            df['adx'] = ADXIndicator(df['high'], df['low'], df['close'], window=ADX_Len).adx()
-
-
-            df['Follow_Sell'] = ((df['Prsi'] - df['rsi']) >= 3.0) & (df['volume'] > df['VolEMA']) & (df['Prsi'] > 50) & (df['Prsi'] < 55) & (df['adx'] >= adx_follow) & (df['vol_change'] >= 0.75)
-            df['Follow_Buy'] = ((df['rsi'] - df['Prsi']) >= 3.0) & (df['volume'] > df['VolEMA']) & (df['Prsi'] < 50) & (df['Prsi'] > 45) & (df['adx'] >= adx_follow) & (df['vol_change'] >= 0.75)
-            df['BT_Sell'] = ((df['Prsi'] - df['rsi']) >= 3.0) & (df['Prsi'] > 65) & (df['adx'] >= adx_BT) & (df['adx'] < adx_BTU)
-            df['BT_Buy'] = ((df['rsi'] - df['Prsi']) >= 3.0) & (df['Prsi'] < 35) & (df['adx'] >= adx_BT) & (df['adx'] < adx_BTU)
-
-            df_cleaned = df.dropna()
+    try:
+        CANDLES.sync()
+        fetch_error = None
+    except CandleFetchError as e:
+        fetch_error = e
+
+    if fetch_error is None:
+        if len(CANDLES) < max(RSI_Period, ADX_Len) + 2:
+            print("Not enough historical data from API to calculate indicators. Waiting for more data.")
+            sys.stdout.flush()
+            continue
 
-            if df_cleaned.empty:
-                print("DataFrame is empty after dropping NaN values from indicators. Not enough valid data for a signal.")
-                sys.stdout.flush()
-                time.sleep(55)
-                continue
+        # RSI, volume EMA and ADX carry over from the last close; the just-closed candle is evaluated
+        previous, latest = INDICATORS.sync(CANDLES.data, until=candle_close)[-2:]
+        if not SCHEDULER.new_bar(latest['time']):
+            print(f"> No new {Time_period} candle closed since the last evaluation. Skipping.")
+            sys.stdout.flush()
+            continue
+        latest['date_time'] = datetime.datetime.fromtimestamp(latest['time'], INDIA_TZ).replace(tzinfo=None)
+        # Follow/BT signal columns, shared with Archive/backtest.py (see rsi_adx_strategy.signal_columns)
+        for column, value in signal_columns(latest, previous, STRATEGY).items():
+            latest[column] = value
+
+        if latest[['rsi', 'Prsi', 'VolEMA', 'vol_change', 'adx']].isna().any():
+            print("Indicators are still warming up. Not enough valid data for a signal.")
+            sys.stdout.flush()
+            continue
 
-            latest = df_cleaned.iloc[-1]
+        required_signal_columns = ['Follow_Sell', 'Follow_Buy', 'BT_Sell', 'BT_Buy']
+        if not all(col in latest.index for col in required_signal_columns):
+            print(f"Error: Required signal columns missing in latest candle data after cleanup: {required_signal_columns}")
+            print(f"Available columns in latest: {latest.index.tolist()}")
+            sys.stdout.flush()
+            continue
 
-            required_signal_columns = ['Follow_Sell', 'Follow_Buy', 'BT_Sell', 'BT_Buy']
-            if not all(col in latest.index for col in required_signal_columns):
-                print(f"Error: Required signal columns missing in latest candle data after cleanup: {required_signal_columns}")
-                print(f"Available columns in latest: {latest.index.tolist()}")
-                sys.stdout.flush()
-                time.sleep(55)
-                continue
+        # Removed the line that fetched the runner's public IP address
+        # runner_ip = os.environ.get('RUNNER_PUBLIC_IP', 'UNKNOWN_IP')
 
-            # Removed the line that fetched the runner's public IP address
-            # runner_ip = os.environ.get('RUNNER_PUBLIC_IP', 'UNKNOWN_IP')
+        # MODIFIED: Removed the IP address from the print statement
+        print(f"> No signal detected at: [{current_ist_time.strftime('%H:%M:%S')}]")
+        sys.stdout.flush()
 
-            # MODIFIED: Removed the IP address from the print statement
-            print(f"> No signal detected at: [{current_ist_time.strftime('%H:%M:%S')}]")
+        signal_type = None
+        if latest['Follow_Sell']:
+            signal_type = 'sell'
+        elif latest['Follow_Buy']:
+            signal_type = 'buy'
+        elif latest['BT_Sell']:
+            signal_type = 'sell'
+        elif latest['BT_Buy']:
+            signal_type = 'buy'
+
+        if signal_type:
+            print(f"{signal_type.upper()} 🔔signal detected at {latest['date_time']}")
             sys.stdout.flush()
-
-            signal_type = None
-            if latest['Follow_Sell']:
-                signal_type = 'sell'
-            elif latest['Follow_Buy']:
-                signal_type = 'buy'
-            elif latest['BT_Sell']:
-                signal_type = 'sell'
-            elif latest['BT_Buy']:
-                signal_type = 'buy'
-
-            if signal_type:
-                print(f"{signal_type.upper()} 🔔signal detected at {latest['date_time']}")
-                sys.stdout.flush()
-                for creds in client_credentials:
-                    # The check for missing API keys/secrets is no longer needed here
-                    # as they are hardcoded. If a credential pair is empty, it means
-                    # it was hardcoded as such.
-                    client = DeltaRestClient(
-                        base_url='https://api.india.delta.exchange',
-                        api_key=creds['api_key'],
-                        api_secret=creds['api_secret']
-                    )
-                    if not check_for_open_trades(client, symbol):
-                        place_order(client, signal_type, symbol, order_quantity, latest)
-                    else:
-                        truncated_api_key = client.api_key[:6] + '...' + client.api_key[-4:]
-                        print(f"Client {truncated_api_key}: Skipping order placement due to existing open trades.")
-                        sys.stdout.flush()
-            else:
-                #optional
-                #print(f"No trade signal | RSI: {latest['rsi']:.0f} (Prev: {latest['Prsi']:.0f}) | Volume: {latest['volume']:.0f} (EMA: {latest['VolEMA']:.0f}) | ADX: {latest['adx']:.0f} | Volume Change: {latest['vol_change'] * 100:.0f}%")
-                sys.stdout.flush()
-
+            # Every account is checked and submitted at once (see Archive/order_router.py)
+            results = ORDERS.route(
+                lambda client: check_for_open_trades(client, symbol),
+                lambda client: place_order(client, signal_type, symbol, order_quantity, latest),
+            )
+            for result in results:
+                if result.outcome == 'placed':
+                    send_trade_alert(result.account, signal_type, symbol, order_quantity, result.order)
+                elif result.outcome == 'open_trades':
+                    print(f"Client {result.account}: Skipping order placement due to existing open trades.")
+                    sys.stdout.flush()
+                elif result.outcome in ('timeout', 'busy', 'error'):
+                    send_telegram_message(f"⚠️ *ORDER NOT CONFIRMED* ⚠️\nClient: `{result.account}`\nSymbol: `{symbol}`\n"
+                                          f"Side: *{signal_type.upper()}*\nStatus: `{result.outcome}`")
         else:
-            print(f"Error fetching data: {r.status_code}. Response: {r.text}")
+            #optional
+            #print(f"No trade signal | RSI: {latest['rsi']:.0f} (Prev: {latest['Prsi']:.0f}) | Volume: {latest['volume']:.0f} (EMA: {latest['VolEMA']:.0f}) | ADX: {latest['adx']:.0f} | Volume Change: {latest['vol_change'] * 100:.0f}%")
             sys.stdout.flush()
-            send_telegram_message(f"❌ *Data Fetch Error!* ❌\nStatus Code: `{r.status_code}`\nResponse: `{r.text}`")
-
 
-        time.sleep(55) # Sleep for almost the rest of the minute
+    else:
+        print(f"Error fetching data: {fetch_error.status_code}. Response: {fetch_error.text}")
+        sys.stdout.flush()
+        send_telegram_message(f"❌ *Data Fetch Error!* ❌\nStatus Code: `{fetch_error.status_code}`\nResponse: `{fetch_error.text}`")
@@ -0,0 +1,71 @@
+"""Concurrent fan-out of a finished chart to its delivery sinks.
+
+Each sink (Telegram, S3, Google Sheets, ...) runs on its own worker with its
+own deadline and retry budget, so a cycle takes as long as the slowest sink
+rather than the sum of all of them, and one failing sink never blocks the
+others. Every run returns per-sink latency.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class Sink:
+    """A named delivery target: send() raises (or returns False) on failure."""
+
+    def __init__(self, name, send, timeout=30.0, retries=2, backoff=1.0):
+        self.name = name
+        self.send = send
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+class DeliveryResult:
+    def __init__(self, name, ok, seconds, attempts, error=None):
+        self.name = name
+        self.ok = ok
+        self.seconds = seconds
+        self.attempts = attempts
+        self.error = error
+
+def _run_sink(sink, deadline):
+    started = time.perf_counter()
+    error = None
+    for attempt in range(1, sink.retries + 2):
+        try:
+            if sink.send() is not False:
+                return DeliveryResult(sink.name, True, time.perf_counter() - started, attempt)
+            error = "sink reported failure"
+        except Exception as e:
+            error = repr(e)
+        delay = sink.backoff * 2 ** (attempt - 1)
+        if attempt > sink.retries or time.monotonic() + delay >= deadline:
+            break
+        print(f"{sink.name}: attempt {attempt} failed ({error}); retrying in {delay:g}s")
+        time.sleep(delay)
+    return DeliveryResult(sink.name, False, time.perf_counter() - started, attempt, error)
+
+def deliver(sinks):
+    """Run every sink concurrently; returns one DeliveryResult per sink, in order."""
+    if not sinks:
+        return []
+    pool = ThreadPoolExecutor(max_workers=len(sinks), thread_name_prefix="delivery")
+    started = time.monotonic()
+    futures = [pool.submit(_run_sink, sink, started + sink.timeout) for sink in sinks]
+    results = []
+    try:
+        for sink, future in zip(sinks, futures):
+            remaining = max(started + sink.timeout - time.monotonic(), 0)
+            try:
+                results.append(future.result(timeout=remaining))
+            except Exception as e:
+                error = f"timed out after {sink.timeout:g}s" if not future.done() else repr(e)
+                results.append(DeliveryResult(sink.name, False, time.monotonic() - started, None, error))
+    finally:
+        # Do not wait for sinks that blew their deadline; they finish (or fail) in the background.
+        pool.shutdown(wait=False)
+    return results
+
+def print_delivery_report(results):
+    for r in results:
+        status = "ok" if r.ok else f"FAILED ({r.error})"
+        attempts = f", {r.attempts} attempt(s)" if r.attempts else ""
+        print(f"  {r.name:<10} {r.seconds * 1000:8.1f} ms{attempts}  {status}")
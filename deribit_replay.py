@@ -0,0 +1,163 @@
+"""Record and replay Deribit REST responses for offline GEX runs.
+
+A fixture is a JSON file holding every response of one collection cycle,
+keyed by request path and query, plus the time it was recorded:
+
+    python deribit_replay.py record fixtures/deribit_btc_options.json
+    python deribit_replay.py compare fixtures/deribit_btc_options.json
+
+`record` captures the price, instrument list, book summaries and the
+per-instrument tickers of the next expiry; `compare` replays them and prints
+the net GEX per strike from the bulk and per-instrument paths side by side.
+Both pick the options with gex_monitor.select_options, as every cycle does.
+`compare` exits with status 1 if either path fails or a strike's values
+differ by more than COMPARE_TOLERANCE.
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from gex_snapshot import GexSnapshot
+from instrument_cache import InstrumentCache
+
+# Largest accepted per-strike gap between the bulk (local Black-76 from mark IV)
+# and ticker (Deribit's greeks) net GEX: the larger of the absolute and the
+# relative bound. One unit absorbs the rounding of the per-strike values.
+COMPARE_TOLERANCE = float(os.environ.get('GEX_COMPARE_TOLERANCE', 1))
+COMPARE_REL_TOLERANCE = float(os.environ.get('GEX_COMPARE_REL_TOLERANCE', 0.05))
+
+def fixture_key(url):
+    """Strip scheme, host and API prefix so fixtures are portable between hosts."""
+    parts = urlsplit(url)
+    path = parts.path.split('/api/v2', 1)[-1]
+    return f"{path}?{parts.query}" if parts.query else path
+
+class ReplayResponse:
+    """Minimal stand-in for requests.Response built from a recorded body."""
+
+    def __init__(self, url, body):
+        self.url = url
+        self._body = body
+        self.status_code = 200 if body is not None else 404
+        self.ok = body is not None
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} no recorded response for {fixture_key(self.url)}")
+
+class RecordingSession:
+    """Wrap a requests.Session and keep the JSON body of every successful GET."""
+
+    def __init__(self, session):
+        self.session = session
+        self.responses = {}
+        self.recorded_at_ms = int(time.time() * 1000)
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        resp = self.session.get(url, **kwargs)
+        if resp.ok:
+            body = resp.json()
+            with self._lock:
+                self.responses[fixture_key(url)] = body
+        return resp
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'recorded_at_ms': self.recorded_at_ms, 'responses': self.responses}, f, indent=1)
+        print(f"Recorded {len(self.responses)} response(s) to {path}")
+
+class ReplaySession:
+    """Serve GETs from a fixture recorded by RecordingSession."""
+
+    def __init__(self, path):
+        with open(path) as f:
+            fixture = json.load(f)
+        self.recorded_at_ms = fixture['recorded_at_ms']
+        self.responses = fixture['responses']
+
+    def get(self, url, **kwargs):
+        return ReplayResponse(url, self.responses.get(fixture_key(url)))
+
+def _select_options(gex_monitor, now_ms=None):
+    """Price, expiry label and in-range options of the next expiry, picked by gex_monitor.select_options."""
+    price = gex_monitor.get_current_price()
+    if price is None:
+        raise SystemExit("No BTC-PERPETUAL mark price.")
+    clock = time.time if now_ms is None else lambda: now_ms / 1000
+    with tempfile.TemporaryDirectory() as tmp:
+        # A private cache, so the list comes from the session (recorded or replayed), never from disk
+        cache = InstrumentCache(gex_monitor.get_instruments, path=os.path.join(tmp, 'instruments.json'), clock=clock)
+        expiry_ts, options = gex_monitor.select_options(price, cache)
+    if not options:
+        raise SystemExit("No options selected.")
+    return price, gex_monitor.format_ts_to_label(expiry_ts), options
+
+def record(path):
+    import gex_monitor
+    session = RecordingSession(gex_monitor.SESSION)
+    gex_monitor.SESSION = session
+    price, expiry_label, options = _select_options(gex_monitor)
+    print(f"Recording {len(options)} {expiry_label} options around ${price:,.0f}...")
+    gex_monitor.fetch_greeks_and_oi(options, mode='bulk')
+    gex_monitor.fetch_greeks_and_oi(options, mode='ticker')
+    session.save(path)
+
+def compare(path, tolerance=COMPARE_TOLERANCE, rel_tolerance=COMPARE_REL_TOLERANCE):
+    """Replay a fixture through both fetch paths; returns the strikes whose net GEX gap exceeds the tolerance.
+
+    Raises SystemExit if either path yields nothing or misses an instrument.
+    """
+    import gex_monitor
+    session = ReplaySession(path)
+    gex_monitor.SESSION = session
+    now_ms = session.recorded_at_ms
+    price, expiry_label, options = _select_options(gex_monitor, now_ms=now_ms)
+
+    # Called directly: fetch_greeks_and_oi would silently fall back to the ticker path
+    bulk = gex_monitor.fetch_greeks_and_oi_bulk(options, now_ms=now_ms)
+    if bulk is None or not bulk[0]:
+        raise SystemExit("Bulk path returned nothing (book summaries missing from the fixture?).")
+    bulk, bulk_failed = bulk
+    ticker, ticker_failed = gex_monitor.fetch_greeks_and_oi_batch([i["instrument_name"] for i in options])
+    if bulk_failed or ticker_failed:
+        raise SystemExit(f"Missing instruments: bulk {bulk_failed}, ticker {ticker_failed}")
+    bulk_snapshot = GexSnapshot.from_instruments(options, bulk, price)
+    ticker_snapshot = GexSnapshot.from_instruments(options, ticker, price)
+    bulk_gex = dict(zip(bulk_snapshot.strikes.tolist(), bulk_snapshot.net_gex.tolist()))
+    ticker_gex = dict(zip(ticker_snapshot.strikes.tolist(), ticker_snapshot.net_gex.tolist()))
+
+    print(f"{expiry_label} net GEX around ${price:,.0f} ({len(options)} options)")
+    print(f"{'Strike':<10} | {'Bulk':>8} | {'Ticker':>8} | {'Diff':>6}")
+    print("-" * 42)
+    max_diff = 0
+    over = []
+    for strike in sorted(set(bulk_gex) | set(ticker_gex)):
+        b = bulk_gex.get(strike, 0)
+        t = ticker_gex.get(strike, 0)
+        max_diff = max(max_diff, abs(b - t))
+        exceeded = abs(b - t) > max(tolerance, rel_tolerance * max(abs(b), abs(t)))
+        if exceeded:
+            over.append(strike)
+        print(f"{strike:<10.0f} | {b:>8} | {t:>8} | {b - t:>6}{'  FAIL' if exceeded else ''}")
+    print(f"Total net GEX: bulk {sum(bulk_gex.values())}, ticker {sum(ticker_gex.values())}; max strike diff {max_diff}")
+    print(f"Tolerance max({tolerance:g}, {rel_tolerance:.0%} of the strike's value): "
+          f"{f'{len(over)} strike(s) over' if over else 'all strikes within'}")
+    return over
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] not in ('record', 'compare'):
+        raise SystemExit("usage: python deribit_replay.py record|compare FIXTURE.json")
+    if sys.argv[1] == 'record':
+        record(sys.argv[2])
+    else:
+        raise SystemExit(1 if compare(sys.argv[2]) else 0)
@@ -0,0 +1,133 @@
+"""Reusable GEX chart renderer.
+
+The Figure, Axes, lines, legend and labels are built once with matplotlib's
+object-oriented API (no pyplot, so no global figure state to leak when a
+render fails). Each snapshot only moves the existing artists: bar rectangles
+and per-strike value labels come from pools that grow to the largest strike
+count seen and hide what a smaller snapshot does not use.
+"""
+import io
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+
+class GexChartRenderer:
+    """Render GexSnapshots to PNG bytes, reusing one Agg figure."""
+
+    def __init__(self, figsize=(12, 7), title='BTC GEX for next expiry'):
+        self.figure = Figure(figsize=figsize)
+        FigureCanvasAgg(self.figure)
+        ax = self.ax = self.figure.add_subplot()
+        params = self.figure.subplotpars
+        self._default_margins = (params.left, params.bottom, params.right, params.top)
+
+        self.call_bars = []
+        self.put_bars = []
+        self.gex_labels = []
+        self._legend_zero_gamma = None
+
+        self.gex_line, = ax.plot([], [], color='blue', marker='o', linewidth=2, label='Net GEX')
+        ax.axhline(0, color='gray', linestyle='--', linewidth=0.8)
+        self.price_line = ax.axvline(0, color='red', linestyle=':', linewidth=2)
+        self.zero_gamma_line = ax.axvline(0, color='purple', linestyle='-.', linewidth=1.5)
+        # Legend entries for the bar pools, which have no single artist of their own.
+        self.call_handle = Rectangle((0, 0), 0, 0, facecolor='red', alpha=0.6, label='Call OI')
+        self.put_handle = Rectangle((0, 0), 0, 0, facecolor='green', alpha=0.6, label='Put OI')
+
+        self.itm_text = self.figure.text(
+            0.01, 0.97, "", fontsize=12, color='black', ha='left', va='top',
+            bbox=dict(boxstyle="round,pad=0.5", fc="white", ec="gray", alpha=0.7))
+
+        ax.set_title(title, fontsize=14)
+        ax.set_xlabel('Strike Price', fontsize=12)
+        ax.set_ylabel('Net Gamma Exposure (BTC Eq) & OI', fontsize=12)
+        ax.tick_params(axis='x', labelrotation=90)
+        ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+        # Net GEX vs hypothetical spot on a secondary axis
+        self.profile_ax = ax.twinx()
+        self.profile_line, = self.profile_ax.plot([], [], color='purple', linewidth=1.5, alpha=0.7,
+                                                  label='Net GEX vs spot')
+        self.profile_ax.set_ylabel('Net GEX at spot level', fontsize=12, color='purple')
+        self.profile_ax.legend(loc='lower right')
+
+    def _grow_pools(self, n):
+        while len(self.call_bars) < n:
+            for pool, color in ((self.call_bars, 'red'), (self.put_bars, 'green')):
+                bar = self.ax.add_patch(Rectangle((0, 0), 0, 0, facecolor=color, alpha=0.6))
+                bar.sticky_edges.y.append(0)  # like Axes.bar: no margin below the baseline
+                pool.append(bar)
+            self.gex_labels.append(self.ax.text(0, 0, "", fontsize=10, color='blue', ha='center'))
+
+    def _update_legend(self, price, zero_gamma):
+        has_zero_gamma = zero_gamma is not None
+        if self._legend_zero_gamma != has_zero_gamma:
+            handles = [self.gex_line, self.price_line] + ([self.zero_gamma_line] if has_zero_gamma else [])
+            self.legend = self.ax.legend(handles=handles + [self.call_handle, self.put_handle])
+            self._legend_zero_gamma = has_zero_gamma
+        texts = self.legend.get_texts()
+        texts[1].set_text(f'Current BTC Price (${price:,.0f})')
+        if has_zero_gamma:
+            texts[2].set_text(f'Zero gamma (${zero_gamma:,.0f})')
+
+    def update(self, snapshot, spot_grid, spot_profile, zero_gamma=None):
+        """Point every artist at a new snapshot without rebuilding the figure."""
+        strikes = snapshot.strikes
+        n = len(strikes)
+        self._grow_pools(n)
+        bar_width = float(np.diff(strikes).min()) * 0.8 if n > 1 else 1000
+        shift = bar_width / 5
+
+        # SEPARATED bars: Call OI (red, left), Put OI (green, right)
+        for i, (strike, call_oi, put_oi, gex) in enumerate(zip(strikes.tolist(), snapshot.call_oi.tolist(),
+                                                              snapshot.put_oi.tolist(), snapshot.net_gex.tolist())):
+            self.call_bars[i].set_bounds(strike - shift - bar_width / 4, 0, bar_width / 2, call_oi)
+            self.put_bars[i].set_bounds(strike + shift - bar_width / 4, 0, bar_width / 2, put_oi)
+            label = self.gex_labels[i]
+            label.set_position((strike, gex))
+            label.set_text(f"{gex}")
+            label.set_verticalalignment('bottom' if gex >= 0 else 'top')
+            for artist in (self.call_bars[i], self.put_bars[i], label):
+                artist.set_visible(True)
+        # Unused pool entries are emptied as well as hidden: legend placement
+        # ('best') looks at every artist on the axes, visible or not.
+        for bar in self.call_bars[n:] + self.put_bars[n:]:
+            bar.set_bounds(0, 0, 0, 0)
+            bar.set_visible(False)
+        for label in self.gex_labels[n:]:
+            label.set_text("")
+            label.set_visible(False)
+
+        self.gex_line.set_data(strikes, snapshot.net_gex)
+        self.price_line.set_xdata([snapshot.price, snapshot.price])
+        self.zero_gamma_line.set_visible(zero_gamma is not None)
+        if zero_gamma is not None:
+            self.zero_gamma_line.set_xdata([zero_gamma, zero_gamma])
+        self.itm_text.set_text(f"Call OI ITM: {snapshot.call_oi_itm_pct:.1f}%\n"
+                               f"Put OI ITM: {snapshot.put_oi_itm_pct:.1f}%")
+        self._update_legend(snapshot.price, zero_gamma)
+
+        self.ax.set_xticks(strikes)
+        for tick_label in self.ax.get_xticklabels():
+            tick_label.set_horizontalalignment('right')
+        self.ax.relim(visible_only=True)
+        self.ax.autoscale_view()
+
+        self.profile_line.set_data(spot_grid, spot_profile)
+        self.profile_ax.relim()
+        self.profile_ax.autoscale_view()
+
+        # Tick label widths move with the data, so the margins are recomputed
+        # every time, starting from the defaults as a fresh figure would
+        # (tight_layout's result depends slightly on where it starts).
+        self.figure.subplots_adjust(*self._default_margins)
+        self.figure.tight_layout()
+
+    def render(self, snapshot, spot_grid, spot_profile, zero_gamma=None):
+        """Update the figure for snapshot and return it as PNG bytes."""
+        self.update(snapshot, spot_grid, spot_profile, zero_gamma)
+        buffer = io.BytesIO()
+        self.figure.savefig(buffer, format='png')
+        return buffer.getvalue()
@@ -0,0 +1,172 @@
+"""Benchmark the reusable chart renderer against the per-cycle pyplot path.
+
+Each mode renders the same sequence of synthetic snapshots in its own
+subprocess, so peak RSS is measured per mode:
+
+    python gex_chart_bench.py                  # both modes, 200 renders each
+    python gex_chart_bench.py --renders 500 --strikes 30
+
+'pyplot' is the chart code gex_monitor ran before GexChartRenderer: a new
+pyplot figure, bars, per-strike labels, tight_layout and savefig every
+cycle. The report also gives the largest pixel difference between the two
+renderings of the last snapshot.
+"""
+import argparse
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from gex_greeks import black76_gamma_array
+from gex_snapshot import GexSnapshot
+
+MODES = ('pyplot', 'renderer')
+
+def synthetic_snapshots(count, strikes=12, seed=7):
+    """Snapshots around a drifting price, with a repriced spot profile, like one monitor cycle each."""
+    rng = np.random.default_rng(seed)
+    price = 120000.0
+    now_ms = 1760000000000
+    expiry = now_ms + 18 * 3600 * 1000
+    for _ in range(count):
+        price += rng.normal(0, 150)
+        centre = round(price / 1000) * 1000
+        strike_row = centre + 1000 * (np.arange(strikes) - strikes // 2)
+        strike = np.repeat(strike_row, 2)
+        is_call = np.tile([True, False], strikes)
+        iv = rng.uniform(35, 55, strike.size)
+        oi = rng.uniform(0, 400, strike.size)
+        t = np.full(strike.size, (expiry - now_ms) / (365 * 24 * 3600 * 1000))
+        gamma = black76_gamma_array(price, strike, iv / 100, t)
+        snapshot = GexSnapshot(strike, is_call, gamma, oi, price, iv=iv, expiry=np.full(strike.size, expiry))
+        spot_grid = np.linspace(price - 6000, price + 6000, 200)
+        spot_profile, zero_gamma = snapshot.zero_gamma_level(spot_grid, now_ms)
+        yield snapshot, spot_grid, spot_profile, zero_gamma
+
+def render_with_pyplot(snapshot, spot_grid, spot_profile, zero_gamma):
+    """The pre-renderer chart code: a fresh pyplot figure per snapshot."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    sorted_strikes = snapshot.strikes.tolist()
+    gex_values = snapshot.net_gex.tolist()
+    price = snapshot.price
+    plt.figure(figsize=(12, 7))
+    bar_width = min(abs(sorted_strikes[i+1]-sorted_strikes[i]) for i in range(len(sorted_strikes)-1)) * 0.8 if len(sorted_strikes) > 1 else 1000
+    shift = bar_width / 5
+    plt.bar([s - shift for s in sorted_strikes], snapshot.call_oi.tolist(), width=bar_width/2, color='red', alpha=0.6, label='Call OI')
+    plt.bar([s + shift for s in sorted_strikes], snapshot.put_oi.tolist(), width=bar_width/2, color='green', alpha=0.6, label='Put OI')
+    plt.plot(sorted_strikes, gex_values, color='blue', marker='o', linewidth=2, label='Net GEX')
+    for x, y in zip(sorted_strikes, gex_values):
+        plt.text(x, y, f"{y}", fontsize=10, color='blue', ha='center', va='bottom' if y >= 0 else 'top')
+    plt.gcf().text(
+        0.01, 0.97,
+        f"Call OI ITM: {snapshot.call_oi_itm_pct:.1f}%\nPut OI ITM: {snapshot.put_oi_itm_pct:.1f}%",
+        fontsize=12, color='black', ha='left', va='top',
+        bbox=dict(boxstyle="round,pad=0.5", fc="white", ec="gray", alpha=0.7)
+    )
+    plt.axhline(0, color='gray', linestyle='--', linewidth=0.8)
+    plt.axvline(price, color='red', linestyle=':', linewidth=2, label=f'Current BTC Price (${price:,.0f})')
+    if zero_gamma is not None:
+        plt.axvline(zero_gamma, color='purple', linestyle='-.', linewidth=1.5, label=f'Zero gamma (${zero_gamma:,.0f})')
+    plt.title('BTC GEX for next expiry', fontsize=14)
+    plt.xlabel('Strike Price', fontsize=12)
+    plt.ylabel('Net Gamma Exposure (BTC Eq) & OI', fontsize=12)
+    plt.xticks(sorted_strikes, rotation=90, ha='right')
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    plt.legend()
+    profile_ax = plt.gca().twinx()
+    profile_ax.plot(spot_grid, spot_profile, color='purple', linewidth=1.5, alpha=0.7, label='Net GEX vs spot')
+    profile_ax.set_ylabel('Net GEX at spot level', fontsize=12, color='purple')
+    profile_ax.legend(loc='lower right')
+    plt.tight_layout()
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format='png')
+    plt.close()
+    return buffer.getvalue()
+
+def current_rss_mib():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return None
+
+def run_mode(mode, renders, strikes, last_png=None):
+    """Render every snapshot with one mode; returns latency and memory stats."""
+    snapshots = list(synthetic_snapshots(renders, strikes))
+    if mode == 'pyplot':
+        render = render_with_pyplot
+    else:
+        from gex_chart import GexChartRenderer
+        render = GexChartRenderer().render
+    latencies = []
+    rss_after_first = None
+    for snapshot in snapshots:
+        started = time.perf_counter()
+        png = render(*snapshot)
+        latencies.append(time.perf_counter() - started)
+        if rss_after_first is None:
+            rss_after_first = current_rss_mib()
+    if last_png:
+        with open(last_png, 'wb') as f:
+            f.write(png)
+    steady = np.array(latencies[1:] or latencies) * 1000
+    rss_end = current_rss_mib()
+    return {
+        'mode': mode,
+        'first_ms': latencies[0] * 1000,
+        'mean_ms': float(steady.mean()),
+        'p50_ms': float(np.percentile(steady, 50)),
+        'p95_ms': float(np.percentile(steady, 95)),
+        'peak_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'rss_growth_mib': None if rss_end is None else rss_end - rss_after_first,
+    }
+
+def pixel_diff(png_a, png_b):
+    import matplotlib.image as mpimg
+    a, b = mpimg.imread(png_a), mpimg.imread(png_b)
+    if a.shape != b.shape:
+        return None
+    return float(np.abs(a - b).max())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--renders', type=int, default=200)
+    parser.add_argument('--strikes', type=int, default=12)
+    parser.add_argument('--mode', choices=MODES, help="Run one mode in this process and print JSON (used internally).")
+    parser.add_argument('--last-png', help="With --mode, write the last rendered chart here.")
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.renders, args.strikes, args.last_png)))
+        return
+
+    import tempfile
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in MODES:
+            png_path = f"{tmp}/{mode}.png"
+            out = subprocess.run([sys.executable, __file__, '--mode', mode, '--renders', str(args.renders),
+                                  '--strikes', str(args.strikes), '--last-png', png_path],
+                                 check=True, capture_output=True, text=True).stdout
+            results[mode] = json.loads(out.strip().splitlines()[-1])
+        diff = pixel_diff(f"{tmp}/pyplot.png", f"{tmp}/renderer.png")
+
+    print(f"{args.renders} renders, {args.strikes} strikes")
+    print(f"{'mode':<10} {'first':>9} {'mean':>9} {'p50':>9} {'p95':>9} {'peak RSS':>10} {'RSS growth':>11}")
+    for r in results.values():
+        growth = f"{r['rss_growth_mib']:8.1f} MiB" if r['rss_growth_mib'] is not None else "        n/a"
+        print(f"{r['mode']:<10} {r['first_ms']:7.1f}ms {r['mean_ms']:7.1f}ms {r['p50_ms']:7.1f}ms "
+              f"{r['p95_ms']:7.1f}ms {r['peak_rss_mib']:6.1f} MiB {growth}")
+    speedup = results['pyplot']['mean_ms'] / results['renderer']['mean_ms']
+    print(f"Renderer speedup (mean): {speedup:.2f}x")
+    print("Last chart max pixel difference:", "size differs" if diff is None else f"{diff:.3f}")
+
+if __name__ == "__main__":
+    main()
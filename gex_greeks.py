@@ -0,0 +1,69 @@
+"""Local Black-76 greeks for Deribit BTC options.
+
+Deribit prices options off the matching future, so gamma is computed on the
+underlying (forward) price with zero rates. Implied vols are decimals
+(0.55 == 55%) and times are in years of 365 days.
+"""
+import math
+
+import numpy as np
+
+MS_PER_YEAR = 365 * 24 * 3600 * 1000
+
+def year_fraction(expiry_ts, now_ms):
+    """Years between now_ms and expiry_ts (both epoch milliseconds), floored at zero."""
+    return max(expiry_ts - now_ms, 0) / MS_PER_YEAR
+
+def black76_gamma(forward, strike, iv, t):
+    """Gamma per 1 USD move of the underlying; identical for calls and puts."""
+    if forward <= 0 or strike <= 0 or iv <= 0 or t <= 0:
+        return 0.0
+    vol_sqrt_t = iv * math.sqrt(t)
+    d1 = (math.log(forward / strike) + 0.5 * iv * iv * t) / vol_sqrt_t
+    return math.exp(-0.5 * d1 * d1) / (math.sqrt(2 * math.pi) * forward * vol_sqrt_t)
+
+def black76_gamma_array(forward, strike, iv, t):
+    """Vectorized black76_gamma over NumPy arrays (broadcasting); invalid inputs give 0."""
+    forward, strike, iv, t = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (forward, strike, iv, t)))
+    valid = (forward > 0) & (strike > 0) & (iv > 0) & (t > 0)
+    gamma = np.zeros(forward.shape)
+    f, k, v, tt = forward[valid], strike[valid], iv[valid], t[valid]
+    vol_sqrt_t = v * np.sqrt(tt)
+    d1 = (np.log(f / k) + 0.5 * v * v * tt) / vol_sqrt_t
+    gamma[valid] = np.exp(-0.5 * d1 * d1) / (np.sqrt(2 * np.pi) * f * vol_sqrt_t)
+    return gamma
+
+def gex_profile(spot_grid, strike, is_call, iv, t, oi):
+    """Net GEX (calls minus puts, gamma*OI*1000 as charted) at every hypothetical spot level.
+
+    Gamma is repriced for the whole instrument x grid matrix in one
+    broadcast; options without a usable IV or time to expiry contribute 0.
+    """
+    spot_grid = np.asarray(spot_grid, dtype=float)
+    strike, iv, t, oi = (np.asarray(x, dtype=float) for x in (strike, iv, t, oi))
+    valid = (strike > 0) & (iv > 0) & (t > 0) & np.isfinite(iv)
+    strike, iv, t = strike[valid, None], iv[valid, None], t[valid, None]
+    weights = np.where(np.asarray(is_call)[valid], 1.0, -1.0) * oi[valid] * 1000
+
+    spot = spot_grid[None, :]
+    vol_sqrt_t = iv * np.sqrt(t)
+    d1 = (np.log(spot / strike) + 0.5 * iv * iv * t) / vol_sqrt_t
+    gamma = np.exp(-0.5 * d1 * d1) / (np.sqrt(2 * np.pi) * spot * vol_sqrt_t)
+    return weights @ gamma
+
+def zero_gamma_level(spot_grid, profile, spot=None):
+    """Spot level where the GEX profile changes sign, linearly interpolated.
+
+    With several crossings the one closest to `spot` (or the grid centre)
+    wins; None when the profile never changes sign on the grid.
+    """
+    spot_grid = np.asarray(spot_grid, dtype=float)
+    profile = np.asarray(profile, dtype=float)
+    crossing = np.nonzero(np.signbit(profile[:-1]) != np.signbit(profile[1:]))[0]
+    if not crossing.size:
+        return None
+    x0, x1 = spot_grid[crossing], spot_grid[crossing + 1]
+    y0, y1 = profile[crossing], profile[crossing + 1]
+    levels = x0 - y0 * (x1 - x0) / np.where(y1 != y0, y1 - y0, 1.0)
+    reference = spot_grid[len(spot_grid) // 2] if spot is None else spot
+    return float(levels[np.argmin(np.abs(levels - reference))])
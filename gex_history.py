@@ -0,0 +1,284 @@
+"""Day-by-day GEX history from the local snapshot store.
+
+Reads one day of snapshots from GexStore and renders:
+
+  * a strike x time heatmap of net GEX, with spot and the zero-gamma level
+    drawn over it, and
+  * a time-lapse of the per-strike net GEX bars, as MP4 or GIF (piped to
+    ffmpeg) or as a PNG sprite sheet of sampled frames.
+
+    python gex_history.py --date 2025-10-09
+    python gex_history.py --date 2025-10-09 --format gif --upload
+
+The day's data is a small time x strike matrix; frames are drawn one at a
+time on a single blitted Agg figure and written straight to the encoder, so
+memory stays flat however many snapshots the day holds. Outputs go to S3
+under a date-partitioned prefix (HISTORY_PREFIX/dt=YYYY-MM-DD/...) instead
+of one loose PNG per run.
+"""
+import argparse
+import datetime
+import os
+import shutil
+import subprocess
+import time
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import TwoSlopeNorm, to_rgba
+from matplotlib.figure import Figure
+
+from gex_monitor import IST, S3_BUCKET_NAME, format_ts_to_label, get_s3_client
+from gex_store import GexStore
+
+HISTORY_PREFIX = os.environ.get('GEX_HISTORY_PREFIX', 'gex-history')
+FRAME_SIZE = (8, 4.5)   # inches at FRAME_DPI -> 800x450 frames
+FRAME_DPI = 100
+GREEN, RED = to_rgba('green'), to_rgba('red')
+CONTENT_TYPES = {'.png': 'image/png', '.gif': 'image/gif', '.mp4': 'video/mp4'}
+
+def day_bounds_ms(day, tz=IST):
+    """[start, end) epoch ms of a calendar day in tz."""
+    start = tz.localize(datetime.datetime.combine(day, datetime.time()))
+    end = tz.localize(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time()))
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+
+def history_key(day, filename, prefix=HISTORY_PREFIX):
+    return f"{prefix}/dt={day:%Y-%m-%d}/{filename}"
+
+class GexHistory:
+    """Net GEX of a run of snapshots on one shared strike axis (time x strike)."""
+
+    def __init__(self, rows):
+        self.ts = np.array([r['ts'] for r in rows], dtype=np.int64)
+        self.price = np.array([r['price'] for r in rows], dtype=float)
+        self.zero_gamma = np.array([np.nan if r['zero_gamma'] is None else r['zero_gamma'] for r in rows])
+        self.expiry = np.array([r['expiry'] for r in rows], dtype=np.int64)
+        self.strikes = np.unique(np.concatenate([r['strikes'] for r in rows])) if rows else np.empty(0)
+        # Strikes missing from a snapshot (outside its price window) stay NaN.
+        self.net_gex = np.full((len(rows), len(self.strikes)), np.nan)
+        for i, r in enumerate(rows):
+            self.net_gex[i, np.searchsorted(self.strikes, r['strikes'])] = r['net_gex']
+
+    @classmethod
+    def load(cls, store, start_ms, end_ms, expiry=None):
+        return cls(store.query(start_ms, end_ms, expiry=expiry))
+
+    def __len__(self):
+        return len(self.ts)
+
+    def times(self, tz=IST):
+        return [datetime.datetime.fromtimestamp(ts / 1000, tz=tz) for ts in self.ts.tolist()]
+
+def render_heatmap(history, path, title='BTC net GEX by strike'):
+    """Strike x time heatmap with spot and zero gamma overlaid; writes a PNG."""
+    import matplotlib.dates as mdates
+
+    fig = Figure(figsize=(14, 7))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    times = mdates.date2num(history.times())
+    # Cell edges halfway between samples/strikes so gaps in either stay visible.
+    t_edges = np.concatenate([[times[0]], (times[1:] + times[:-1]) / 2, [times[-1]]]) if len(times) > 1 \
+        else np.array([times[0] - 1 / 1440, times[0] + 1 / 1440])
+    s_mid = (history.strikes[1:] + history.strikes[:-1]) / 2
+    s_step = np.diff(history.strikes).min() if len(history.strikes) > 1 else 1000
+    s_edges = np.concatenate([[history.strikes[0] - s_step / 2], s_mid, [history.strikes[-1] + s_step / 2]])
+
+    limit = np.nanmax(np.abs(history.net_gex)) if np.isfinite(history.net_gex).any() else 1
+    mesh = ax.pcolormesh(t_edges, s_edges, np.ma.masked_invalid(history.net_gex.T), cmap='RdYlGn',
+                         norm=TwoSlopeNorm(0, -limit or -1, limit or 1), shading='flat')
+    ax.plot(times, history.price, color='black', linewidth=1.2, label='BTC price')
+    ax.plot(times, history.zero_gamma, color='purple', linestyle='-.', linewidth=1.2, label='Zero gamma')
+    ax.xaxis_date(IST)
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M', tz=IST))
+    ax.set_title(title, fontsize=14)
+    ax.set_xlabel('Time (IST)', fontsize=12)
+    ax.set_ylabel('Strike Price', fontsize=12)
+    ax.legend(loc='upper left')
+    fig.colorbar(mesh, ax=ax, label='Net GEX (BTC Eq)')
+    fig.tight_layout()
+    fig.savefig(path, format='png')
+
+class FrameRenderer:
+    """Per-snapshot net GEX bars on a fixed strike axis, blitted onto a cached background."""
+
+    def __init__(self, history, figsize=FRAME_SIZE, dpi=FRAME_DPI):
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        ax = self.ax = self.fig.add_subplot()
+        strikes = history.strikes
+        width = (np.diff(strikes).min() if len(strikes) > 1 else 1000) * 0.8
+        limit = np.nanmax(np.abs(history.net_gex)) if np.isfinite(history.net_gex).any() else 1
+        # One collection for all bars: a single draw call per frame instead of one per strike.
+        self.bar_left = strikes - width / 2
+        self.bar_right = strikes + width / 2
+        self.bars = PolyCollection([], animated=True)
+        ax.add_collection(self.bars)
+        self.price_line = ax.axvline(strikes[0], color='red', linestyle=':', linewidth=2, animated=True)
+        self.zero_gamma_line = ax.axvline(strikes[0], color='purple', linestyle='-.', linewidth=1.5,
+                                          animated=True)
+        self.label = ax.text(0.01, 0.97, "", transform=ax.transAxes, ha='left', va='top', fontsize=11,
+                             animated=True)
+        ax.axhline(0, color='gray', linestyle='--', linewidth=0.8)
+        ax.set_xlim(strikes[0] - width, strikes[-1] + width)
+        ax.set_ylim(-limit * 1.1 or -1, limit * 1.1 or 1)
+        ax.set_xlabel('Strike Price')
+        ax.set_ylabel('Net GEX (BTC Eq)')
+        ax.grid(axis='y', linestyle='--', alpha=0.7)
+        self.title = None
+        self._set_title('BTC net GEX by strike')
+        self.size = self.canvas.get_width_height()
+
+    def _set_title(self, title):
+        """Redraw the static background; only needed when the title (day or expiry) changes."""
+        self.ax.set_title(title, fontsize=12)
+        self.fig.tight_layout()
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.title = title
+
+    def frame(self, history, i, when):
+        """RGBA frame (height x width x 4 view of the canvas buffer) for snapshot i."""
+        gex = np.nan_to_num(history.net_gex[i])
+        zeros = np.zeros_like(gex)
+        self.bars.set_verts(np.stack([np.column_stack([self.bar_left, zeros]), np.column_stack([self.bar_left, gex]),
+                                      np.column_stack([self.bar_right, gex]), np.column_stack([self.bar_right, zeros])],
+                                     axis=1))
+        self.bars.set_facecolor(np.where(gex[:, None] >= 0, GREEN, RED))
+        self.price_line.set_xdata([history.price[i]] * 2)
+        zero_gamma = history.zero_gamma[i]
+        self.zero_gamma_line.set_visible(bool(np.isfinite(zero_gamma)))
+        if np.isfinite(zero_gamma):
+            self.zero_gamma_line.set_xdata([zero_gamma] * 2)
+        # Glyph rendering dominates the frame time, so the per-frame label is kept
+        # short and the date and expiry live in the (cached) title.
+        self.label.set_text(f"{when:%H:%M}  ${history.price[i]:,.0f}  GEX {int(gex.sum()):,}")
+        title = f"BTC net GEX by strike, {when:%Y-%m-%d} IST, {format_ts_to_label(int(history.expiry[i]))}"
+        if title != self.title:
+            self._set_title(title)
+
+        self.canvas.restore_region(self.background)
+        for artist in (self.bars, self.price_line, self.zero_gamma_line, self.label):
+            self.ax.draw_artist(artist)
+        return np.asarray(self.canvas.buffer_rgba())
+
+class FFmpegWriter:
+    """Pipe raw RGBA frames into ffmpeg; MP4 (H.264) or GIF by file extension."""
+
+    def __init__(self, path, size, fps):
+        ffmpeg = shutil.which('ffmpeg')
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg not found on PATH; use --format sprite or install ffmpeg")
+        width, height = size
+        if path.endswith('.gif'):
+            codec = ['-vf', 'split[a][b];[a]palettegen[p];[b][p]paletteuse']
+        else:
+            codec = ['-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+        self.proc = subprocess.Popen(
+            [ffmpeg, '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgba',
+             '-s', f'{width}x{height}', '-r', str(fps), '-i', '-'] + codec + [path],
+            stdin=subprocess.PIPE)
+
+    def write(self, frame):
+        self.proc.stdin.write(frame.tobytes())
+
+    def close(self):
+        self.proc.stdin.close()
+        if self.proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with status {self.proc.returncode}")
+
+class SpriteSheetWriter:
+    """Tile every frame, downscaled by an integer factor, into one PNG sheet."""
+
+    def __init__(self, path, size, count, columns=10, scale=4):
+        self.path = path
+        self.scale = scale
+        self.columns = min(columns, count)
+        width, height = size
+        self.tile = (-(-height // scale), -(-width // scale))
+        rows = -(-count // self.columns)
+        self.sheet = np.full((rows * self.tile[0], self.columns * self.tile[1], 3), 255, dtype=np.uint8)
+        self.written = 0
+
+    def write(self, frame):
+        row, col = divmod(self.written, self.columns)
+        h, w = self.tile
+        self.sheet[row * h:(row + 1) * h, col * w:(col + 1) * w] = frame[::self.scale, ::self.scale, :3]
+        self.written += 1
+
+    def close(self):
+        from PIL import Image
+        Image.fromarray(self.sheet).save(self.path)
+
+def render_timelapse(history, path, fmt='mp4', fps=24, step=1, sprite_columns=10, sprite_scale=4):
+    """Stream one frame per `step` snapshots into an MP4, GIF or sprite sheet; returns the frame count."""
+    indices = range(0, len(history), step)
+    renderer = FrameRenderer(history)
+    if fmt == 'sprite':
+        writer = SpriteSheetWriter(path, renderer.size, len(indices), sprite_columns, sprite_scale)
+    else:
+        writer = FFmpegWriter(path, renderer.size, fps)
+    times = history.times()
+    try:
+        for i in indices:
+            writer.write(renderer.frame(history, i, times[i]))
+    finally:
+        writer.close()
+    return len(indices)
+
+def upload_outputs(paths, day, bucket=S3_BUCKET_NAME, prefix=HISTORY_PREFIX):
+    """Upload local outputs under the day's S3 partition; returns the keys."""
+    s3 = get_s3_client()
+    keys = []
+    for path in paths:
+        key = history_key(day, os.path.basename(path), prefix)
+        content_type = CONTENT_TYPES.get(os.path.splitext(path)[1], 'application/octet-stream')
+        s3.upload_file(path, bucket, key, ExtraArgs={'ContentType': content_type})
+        print(f"Uploaded {path} to s3://{bucket}/{key}")
+        keys.append(key)
+    return keys
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a day of stored GEX snapshots as a heatmap and time-lapse")
+    parser.add_argument('--date', type=datetime.date.fromisoformat,
+                        default=datetime.datetime.now(IST).date(), help="day in IST, YYYY-MM-DD (default: today)")
+    parser.add_argument('--store', default=None, help="snapshot store path (default: GEX_STORE_PATH)")
+    parser.add_argument('--expiry', type=int, help="only snapshots of this expiry (epoch ms)")
+    parser.add_argument('--format', choices=('mp4', 'gif', 'sprite'), default='mp4')
+    parser.add_argument('--fps', type=int, default=24)
+    parser.add_argument('--step', type=int, default=1, help="use every Nth snapshot (default: %(default)s)")
+    parser.add_argument('--out', default='.', help="output directory (default: %(default)s)")
+    parser.add_argument('--upload', action='store_true', help=f"upload to s3://{S3_BUCKET_NAME}/{HISTORY_PREFIX}/dt=.../")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    store = GexStore(args.store) if args.store else GexStore()
+    try:
+        history = GexHistory.load(store, *day_bounds_ms(args.date), expiry=args.expiry)
+    finally:
+        store.close()
+    if not len(history):
+        print(f"No snapshots stored for {args.date}.")
+        return
+    print(f"Loaded {len(history)} snapshots x {len(history.strikes)} strikes in {time.perf_counter() - started:.2f}s")
+
+    os.makedirs(args.out, exist_ok=True)
+    heatmap_path = os.path.join(args.out, f"gex_heatmap_{args.date}.png")
+    started = time.perf_counter()
+    render_heatmap(history, heatmap_path, title=f"BTC net GEX by strike, {args.date} (IST)")
+    print(f"Heatmap written to {heatmap_path} in {time.perf_counter() - started:.2f}s")
+
+    extension = 'png' if args.format == 'sprite' else args.format
+    suffix = '_sprites' if args.format == 'sprite' else ''
+    timelapse_path = os.path.join(args.out, f"gex_timelapse_{args.date}{suffix}.{extension}")
+    started = time.perf_counter()
+    frames = render_timelapse(history, timelapse_path, args.format, fps=args.fps, step=args.step)
+    print(f"{frames} frames written to {timelapse_path} in {time.perf_counter() - started:.2f}s")
+
+    if args.upload:
+        upload_outputs([heatmap_path, timelapse_path], args.date)
+
+if __name__ == "__main__":
+    main()
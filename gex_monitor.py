@@ -1,22 +1,51 @@
-import requests
 import time
-import gspread
+_IMPORT_STARTED = time.perf_counter()
+
 import datetime
+import functools
 import json
 import os
-import matplotlib
-matplotlib.use('Agg')  # For non-GUI environments
-import matplotlib.pyplot as plt
 import pytz
-import boto3
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+
+from gex_greeks import black76_gamma, black76_gamma_array, year_fraction
+from gex_snapshot import GexSnapshot
+from gex_store import GexStore
+from sheet_writer import SheetWriter
+from gex_term_structure import TermStructure
+from instrument_cache import InstrumentCache, first_0800_expiry
+from delivery import Sink, deliver, print_delivery_report
+from http_client import HttpClient
+from phase_timer import PhaseTimer
 
-from oauth2client.service_account import ServiceAccountCredentials
+# matplotlib and boto3 are imported on first use (see get_chart_renderer
+# and get_s3_client) so a cycle that fails early never pays for them.
+TIMINGS = PhaseTimer()
+TIMINGS.record('import core modules', time.perf_counter() - _IMPORT_STARTED)
 
 # --- Configuration ---
 BASE_URL = "https://www.deribit.com/api/v2"
 HEADERS = {"Accept": "application/json"}
 PRICE_RANGE_POINTS = 6000
 
+# Per-instrument ticker fetching: max requests in flight, per-request timeout
+# (seconds) and an overall deadline for one batch (seconds).
+MAX_IN_FLIGHT = int(os.environ.get('GEX_MAX_IN_FLIGHT', 16))
+TICKER_TIMEOUT = float(os.environ.get('GEX_TICKER_TIMEOUT', 10))
+BATCH_TIMEOUT = float(os.environ.get('GEX_BATCH_TIMEOUT', 60))
+
+# 'bulk': one book-summary call for OI plus local Black-76 gamma from mark IV.
+# 'ticker': one /public/ticker call per instrument (also the bulk fallback).
+FETCH_MODE = os.environ.get('GEX_FETCH_MODE', 'bulk')
+
+# Term-structure mode: instruments per ticker batch when the bulk path is unavailable.
+TERM_BATCH_SIZE = int(os.environ.get('GEX_TERM_BATCH_SIZE', 500))
+
+# Hypothetical spot levels across ±PRICE_RANGE_POINTS for the GEX-vs-spot curve.
+GAMMA_GRID_POINTS = int(os.environ.get('GEX_GAMMA_GRID_POINTS', 500))
+
 IST = pytz.timezone('Asia/Kolkata')
 
 TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
@@ -25,47 +54,81 @@ TELEGRAM_CHAT_ID = os.environ.get('TELEGRAM_CHAT_ID')
 S3_BUCKET_NAME = "gex-charts-mybitcoin"
 LATEST_CHART_KEY = "latest_gex_chart.png"
 
+# Per-sink delivery deadlines (seconds); the sinks run in parallel.
+TELEGRAM_TIMEOUT = float(os.environ.get('GEX_TELEGRAM_TIMEOUT', 30))
+S3_TIMEOUT = float(os.environ.get('GEX_S3_TIMEOUT', 30))
+
 SHEET_CREDENTIALS = '/home/ubuntu/Algo/gex-sheet-integration-1fa62d638e51.json'
 SHEET_NAME = 'BTC GEX log'
-
-scope = [
-    "https://spreadsheets.google.com/feeds",
-    "https://www.googleapis.com/auth/drive"
-]
-
-creds = ServiceAccountCredentials.from_json_keyfile_name(SHEET_CREDENTIALS, scope)
-gs_client = gspread.authorize(creds)
-
-def append_gex_data_to_sheet(row):
-    try:
-        sh = gs_client.open(SHEET_NAME)
-        worksheet = sh.sheet1
-        result = worksheet.append_row(row, value_input_option='USER_ENTERED')
-        print("Appended row to Google Sheet:", row)
-        print("Google Sheets API response:", result)
-    except Exception as e:
-        print("Error appending to Google Sheet:", repr(e))
-
-def upload_to_s3(file_name, bucket, object_name=None):
-    if object_name is None:
-        object_name = os.path.basename(file_name)
-    s3_client = boto3.client('s3')
-    try:
-        s3_client.upload_file(file_name, bucket, object_name,
-                              ExtraArgs={'ContentType': 'image/png'})
-        print(f"File {file_name} uploaded to s3://{bucket}/{object_name}")
-    except Exception as e:
-        print(f"Error uploading file to S3: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
-    return True
+# The local snapshot store is the system of record; Sheets receives a batched
+# export once this many rows are pending (0 disables the export).
+SHEET_EXPORT_BATCH = int(os.environ.get('GEX_SHEET_EXPORT_BATCH', 1))
+# Seconds to wait at the end of a cycle for queued rows to reach the sheet.
+SHEET_DRAIN_TIMEOUT = float(os.environ.get('GEX_SHEET_DRAIN_TIMEOUT', 30))
+
+def make_session(pool_size=MAX_IN_FLIGHT):
+    """Shared pooled client (rate-limited, retrying) sized for pool_size concurrent requests."""
+    return HttpClient(headers=HEADERS, pool_size=pool_size)
+
+# Deribit and Telegram calls share one client: pooled connections per host,
+# per-host rate limits and per-endpoint latency stats (printed on exit).
+SESSION = make_session()
+
+# Authorized lazily on the writer thread, the first time rows are flushed.
+SHEET_WRITER = SheetWriter(SHEET_CREDENTIALS, SHEET_NAME)
+
+def _mark_rows_exported(store_path, row_ids):
+    store = GexStore(store_path)
+    store.mark_exported(row_ids)
+    store.close()
+
+def export_pending_rows_to_sheet(store, min_rows=1):
+    """Queue every not-yet-exported snapshot row for a batched background append to the Google Sheet."""
+    pending = store.pending_sheet_rows()
+    if not pending or min_rows <= 0 or len(pending) < min_rows:
+        return 0
+    return SHEET_WRITER.enqueue(pending, on_flushed=functools.partial(_mark_rows_exported, store.path))
+
+_chart_renderer = None
+_s3_client = None
+
+def get_chart_renderer():
+    """Import matplotlib and build the reusable chart figure on first use."""
+    global _chart_renderer
+    if _chart_renderer is None:
+        with TIMINGS.phase('import matplotlib + build chart'):
+            from gex_chart import GexChartRenderer
+            _chart_renderer = GexChartRenderer()
+    return _chart_renderer
+
+def get_s3_client():
+    """Import boto3 and build the S3 client on first use."""
+    global _s3_client
+    if _s3_client is None:
+        with TIMINGS.phase('import boto3 + S3 client'):
+            import boto3
+            _s3_client = boto3.client('s3')
+    return _s3_client
+
+def upload_png_to_s3(png_bytes, bucket, object_name):
+    """Upload an in-memory PNG with the pooled S3 client; raises on failure."""
+    get_s3_client().put_object(Bucket=bucket, Key=object_name, Body=png_bytes, ContentType='image/png')
+    print(f"Chart uploaded to s3://{bucket}/{object_name}")
+
+def send_telegram_photo(png_bytes, caption, timeout=None):
+    """Post the chart to the Telegram chat over the shared client; raises on failure."""
+    telegram_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
+    files = {'photo': ('gex_chart.png', png_bytes, 'image/png')}
+    data = {'chat_id': TELEGRAM_CHAT_ID, 'caption': caption}
+    response = SESSION.post(telegram_url, files=files, data=data, timeout=timeout or TELEGRAM_TIMEOUT)
+    response.raise_for_status()
+    print(f"Chart sent to Telegram. Response: {response.json()}")
 
 def get_current_price():
     """Get the current BTC-PERPETUAL mark price from Deribit."""
     try:
         url = f"{BASE_URL}/public/ticker?instrument_name=BTC-PERPETUAL"
-        resp = requests.get(url, headers=HEADERS, timeout=10)
+        resp = SESSION.get(url, timeout=10)
         resp.raise_for_status()
         data = resp.json()
         return data['result']['mark_price']
@@ -77,7 +140,7 @@ def get_instruments():
     """Fetch all BTC option instruments from Deribit."""
     try:
         url = f"{BASE_URL}/public/get_instruments?currency=BTC&kind=option&expired=false"
-        resp = requests.get(url, headers=HEADERS, timeout=15)
+        resp = SESSION.get(url, timeout=15)
         resp.raise_for_status()
         data = resp.json()
         return data['result']
@@ -85,36 +148,205 @@ def get_instruments():
         print(f"Error fetching BTC instruments: {e}")
         return []
 
-def get_next_expiry(instruments):
+def get_next_expiry(instruments, now_ms=None):
     """Find the next expiry timestamp (8:00 UTC) from the instruments list."""
     expiries = sorted(set(i['expiration_timestamp'] for i in instruments))
-    now = int(time.time() * 1000)
-    for ts in expiries:
-        if ts > now:
-            dt = datetime.datetime.fromtimestamp(ts/1000, tz=datetime.timezone.utc)
-            if dt.hour == 8 and dt.minute == 0:
-                return ts
-    return None
+    now = int(time.time() * 1000) if now_ms is None else now_ms
+    return first_0800_expiry(expiries, now)
+
+INSTRUMENT_CACHE = InstrumentCache(get_instruments)
 
 def format_ts_to_label(ts):
     """Format timestamp to expiry label, e.g. 20JUN25."""
     dt = datetime.datetime.fromtimestamp(ts/1000, tz=datetime.timezone.utc)
     return dt.strftime('%d%b%y').upper()
 
-def get_greeks_and_oi(instrument_name):
+def select_options(price, cache=None):
+    """(expiry_ts, options) of the next 08:00 UTC expiry within ±PRICE_RANGE_POINTS of price, sorted by strike.
+
+    Prints why and returns empty options when there is no instrument list,
+    no such expiry or no option in range.
+    """
+    cache = cache or INSTRUMENT_CACHE
+    if not cache.get():
+        print("No BTC options instruments found.")
+        return None, []
+    expiry_ts = cache.next_expiry()
+    if not expiry_ts:
+        print("No upcoming expiry found matching the next 8 AM UTC time.")
+        return None, []
+    expiry_label = format_ts_to_label(expiry_ts)
+    if not cache.options_for_expiry(expiry_ts):
+        print(f"No options found for {expiry_label} expiry.")
+        return expiry_ts, []
+    options = cache.options_in_range(expiry_ts, price - PRICE_RANGE_POINTS, price + PRICE_RANGE_POINTS)
+    if not options:
+        print(f"No options found within ±{PRICE_RANGE_POINTS} price range for {expiry_label} expiry.")
+    return expiry_ts, options
+
+def get_greeks_and_oi(instrument_name, session=None, timeout=TICKER_TIMEOUT):
     """Fetch gamma and open interest for an instrument."""
     try:
         url = f"{BASE_URL}/public/ticker?instrument_name={instrument_name}"
-        resp = requests.get(url, headers=HEADERS, timeout=10)
+        resp = (session or SESSION).get(url, timeout=timeout)
         resp.raise_for_status()
         data = resp.json()['result']
         gamma = data.get('greeks', {}).get('gamma', 0.0)
         oi = data.get('open_interest', 0)
-        return {'gamma': gamma, 'oi': oi}
+        return {'gamma': gamma, 'oi': oi, 'mark_iv': data.get('mark_iv')}
     except Exception as e:
         print(f"Error fetching greeks/OI for {instrument_name}: {e}")
         return None
 
+def fetch_greeks_and_oi_batch(instrument_names, max_in_flight=MAX_IN_FLIGHT,
+                              timeout=TICKER_TIMEOUT, batch_timeout=BATCH_TIMEOUT):
+    """Fetch gamma and OI for many instruments with at most max_in_flight requests at once.
+
+    Returns (results, failed): results maps instrument name to the
+    get_greeks_and_oi dict, failed lists the instruments that errored or
+    did not finish before batch_timeout.
+    """
+    results = {}
+    pool = ThreadPoolExecutor(max_workers=max_in_flight)
+    futures = {pool.submit(get_greeks_and_oi, name, SESSION, timeout): name
+               for name in instrument_names}
+    try:
+        for future in as_completed(futures, timeout=batch_timeout):
+            data = future.result()
+            if data is not None:
+                results[futures[future]] = data
+    except FuturesTimeoutError:
+        print(f"Ticker batch exceeded {batch_timeout:.0f}s; continuing with {len(results)} completed instrument(s).")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    failed = sorted(name for name in instrument_names if name not in results)
+    if failed:
+        print(f"Failed to fetch greeks/OI for {len(failed)} instrument(s): {', '.join(failed)}")
+    return results, failed
+
+def get_book_summaries():
+    """Fetch the book summary (OI, mark IV, underlying price) of every BTC option in one call."""
+    try:
+        url = f"{BASE_URL}/public/get_book_summary_by_currency?currency=BTC&kind=option"
+        resp = SESSION.get(url, timeout=15)
+        resp.raise_for_status()
+        return resp.json()['result']
+    except Exception as e:
+        print(f"Error fetching BTC option book summaries: {e}")
+        return None
+
+def fetch_greeks_and_oi_bulk(instruments, now_ms=None):
+    """Build gamma and OI for instruments from a single book-summary call.
+
+    Gamma is computed locally with Black-76 from each option's mark IV and
+    underlying price. Returns (results, failed) like fetch_greeks_and_oi_batch,
+    or None when the bulk endpoint is unavailable.
+    """
+    summaries = get_book_summaries()
+    if summaries is None:
+        return None
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    by_name = {s['instrument_name']: s for s in summaries}
+
+    results = {}
+    for instr in instruments:
+        summary = by_name.get(instr["instrument_name"])
+        if summary is None or summary.get('mark_iv') is None or summary.get('underlying_price') is None:
+            continue
+        t = year_fraction(instr["expiration_timestamp"], now_ms)
+        gamma = black76_gamma(summary['underlying_price'], instr["strike"], summary['mark_iv'] / 100, t)
+        results[instr["instrument_name"]] = {'gamma': gamma, 'oi': summary.get('open_interest') or 0,
+                                             'mark_iv': summary['mark_iv']}
+
+    failed = sorted(i["instrument_name"] for i in instruments if i["instrument_name"] not in results)
+    if failed:
+        print(f"No book summary for {len(failed)} instrument(s): {', '.join(failed)}")
+    return results, failed
+
+def fetch_greeks_and_oi(instruments, mode=None, now_ms=None):
+    """Fetch gamma and OI for instruments, using the bulk path with per-instrument fallback."""
+    mode = mode or FETCH_MODE
+    if mode == 'bulk':
+        bulk = fetch_greeks_and_oi_bulk(instruments, now_ms=now_ms)
+        if bulk is not None and bulk[0]:
+            return bulk
+        print("Bulk book-summary fetch unavailable; falling back to per-instrument tickers.")
+    return fetch_greeks_and_oi_batch([i["instrument_name"] for i in instruments])
+
+def accumulate_term_structure(instruments, mode=None, now_ms=None):
+    """Fill a TermStructure for every instrument, in bulk or in bounded ticker batches."""
+    term = TermStructure(instruments)
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    mode = mode or FETCH_MODE
+
+    if mode == 'bulk':
+        summaries = get_book_summaries()
+        if summaries is not None:
+            by_name = {s['instrument_name']: s for s in summaries}
+            rows = [(i, by_name[i["instrument_name"]]) for i in instruments
+                    if i["instrument_name"] in by_name
+                    and by_name[i["instrument_name"]].get('mark_iv') is not None
+                    and by_name[i["instrument_name"]].get('underlying_price') is not None]
+            if rows:
+                strike = np.array([i["strike"] for i, _ in rows], dtype=float)
+                expiry = np.array([i["expiration_timestamp"] for i, _ in rows], dtype=np.int64)
+                gamma = black76_gamma_array(
+                    np.array([s['underlying_price'] for _, s in rows], dtype=float), strike,
+                    np.array([s['mark_iv'] for _, s in rows], dtype=float) / 100,
+                    np.maximum(expiry - now_ms, 0) / (365 * 24 * 3600 * 1000))
+                term.add(strike, expiry, np.array([i["option_type"] == "call" for i, _ in rows]), gamma,
+                         np.array([s.get('open_interest') or 0 for _, s in rows], dtype=float))
+                return term
+        print("Bulk book-summary fetch unavailable; falling back to per-instrument tickers.")
+
+    for start in range(0, len(instruments), TERM_BATCH_SIZE):
+        chunk = instruments[start:start + TERM_BATCH_SIZE]
+        greeks, _ = fetch_greeks_and_oi_batch([i["instrument_name"] for i in chunk])
+        rows = [(i["strike"], i["expiration_timestamp"], i["option_type"] == "call",
+                 greeks[i["instrument_name"]]["gamma"], greeks[i["instrument_name"]]["oi"])
+                for i in chunk if i["instrument_name"] in greeks]
+        if rows:
+            term.add(*(np.array(column) for column in zip(*rows)))
+        print(f"Processed {min(start + TERM_BATCH_SIZE, len(instruments))}/{len(instruments)} instruments...")
+    return term
+
+def calculate_term_structure(output_path=None):
+    """Net GEX across every listed expiry: per-expiry totals, top strikes and a cumulative profile."""
+    print("\n" + "=" * 50)
+    print("Beginning term-structure GEX cycle...")
+    started = time.time()
+
+    price = get_current_price()
+    if price is None:
+        print("Failed to get current BTC price. Cycle completed with errors.")
+        return None
+    instruments = INSTRUMENT_CACHE.get()
+    if not instruments:
+        print("No BTC options instruments found. Cycle completed with errors.")
+        return None
+
+    term = accumulate_term_structure(instruments)
+    print(f"Aggregated {term.rows_added} of {len(instruments)} instruments into "
+          f"{len(term.strikes)} strikes x {len(term.expiries)} expiries in {time.time() - started:.1f}s")
+    print(f"Current BTC Price: ${price:,.2f}")
+
+    print(f"\n{'Expiry':<10} | {'Net GEX':>10}")
+    print("-" * 23)
+    for ts, gex in zip(term.expiries, term.per_expiry):
+        print(f"{format_ts_to_label(int(ts)):<10} | {gex:>10,}")
+    print(f"{'TOTAL':<10} | {int(term.per_strike.sum()):>10,}")
+
+    per_strike = term.per_strike
+    top = np.argsort(-np.abs(per_strike))[:5]
+    print("\nLargest |GEX| strikes: " + ", ".join(f"{term.strikes[i]:,.0f} ({per_strike[i]:,})" for i in top))
+
+    if output_path:
+        term.write_csv(output_path, format_ts_to_label)
+        print(f"Strike x expiry matrix written to {output_path}")
+    print("==================================================")
+    return term
+
 def calculate_gamma_exposure():
     print("\n" + "=" * 50)
     print("Beginning new data collection cycle...")
@@ -135,97 +367,42 @@ def calculate_gamma_exposure():
         print("Cycle completed with errors.")
         return
 
+    TIMINGS.lap('fetch BTC price')
     print(f"Current BTC Price (from BTC-PERPETUAL Mark Price): ${price:,.2f}")
 
     lower_strike_bound = price - PRICE_RANGE_POINTS
     upper_strike_bound = price + PRICE_RANGE_POINTS
     print(f"Filtering strikes between {lower_strike_bound:,.0f} and {upper_strike_bound:,.0f} (±{PRICE_RANGE_POINTS} from current price)")
 
-    instruments = get_instruments()
-    if not instruments:
-        print("No BTC options instruments found. Skipping this iteration.")
-        print("Cycle completed with errors.")
-        return
-
-    target_expiry_ts = get_next_expiry(instruments)
-    if not target_expiry_ts:
-        print("No upcoming expiry found matching the next 8 AM UTC time. Skipping this iteration.")
+    target_expiry_ts, relevant_options_filtered_by_price = select_options(price)
+    if not relevant_options_filtered_by_price:
+        print("Skipping this iteration.")
         print("Cycle completed with errors.")
         return
 
     expiry_label = format_ts_to_label(target_expiry_ts)
     print(f"Targeting next expiry: {expiry_label} (approx. {datetime.datetime.fromtimestamp(target_expiry_ts/1000, tz=datetime.timezone.utc).isoformat()} UTC)")
 
-    relevant_options_all_strikes = [
-        i for i in instruments
-        if i["expiration_timestamp"] == target_expiry_ts
-    ]
-    if not relevant_options_all_strikes:
-        print(f"No options found for {expiry_label} expiry. Skipping this iteration.")
-        print("Cycle completed with errors.")
-        return
+    TIMINGS.lap('load instruments')
+    print(f"\nProcessing {len(relevant_options_filtered_by_price)} options for {expiry_label} expiry within price range...\n")
 
-    relevant_options_filtered_by_price = [
-        i for i in relevant_options_all_strikes
-        if lower_strike_bound <= i["strike"] <= upper_strike_bound
-    ]
-    if not relevant_options_filtered_by_price:
-        print(f"No options found within ±{PRICE_RANGE_POINTS} price range for {expiry_label} expiry. Skipping this iteration.")
+    greeks, failed = fetch_greeks_and_oi(relevant_options_filtered_by_price)
+    TIMINGS.lap('fetch greeks/OI')
+    snapshot = GexSnapshot.from_instruments(relevant_options_filtered_by_price, greeks, price)
+    if not len(snapshot):
+        print("No greeks/OI data could be fetched for any instrument. Skipping this iteration.")
         print("Cycle completed with errors.")
         return
 
-    print(f"\nProcessing {len(relevant_options_filtered_by_price)} options for {expiry_label} expiry within price range...\n")
-
-    strike_map = {}
-    for instr in relevant_options_filtered_by_price:
-        instrument_name = instr["instrument_name"]
-        data = get_greeks_and_oi(instrument_name)
-        if data is None:
-            continue
-        strike = instr["strike"]
-        gamma_from_api = data["gamma"]
-        oi_from_api = data["oi"]
-        option_type = instr["option_type"]
-        if strike not in strike_map:
-            strike_map[strike] = {"call_gamma_sum": 0.0, "call_oi_sum": 0,
-                                  "put_gamma_sum": 0.0, "put_oi_sum": 0}
-        if option_type == "call":
-            strike_map[strike]["call_gamma_sum"] += gamma_from_api * oi_from_api
-            strike_map[strike]["call_oi_sum"] += oi_from_api
-        else:
-            strike_map[strike]["put_gamma_sum"] += gamma_from_api * oi_from_api
-            strike_map[strike]["put_oi_sum"] += oi_from_api
-
-    net_gex_map = {}
-    call_oi_map = {}
-    put_oi_map = {}
-
-    for strike in strike_map:
-        call_total_gamma_oi = strike_map[strike]["call_gamma_sum"]
-        put_total_gamma_oi = strike_map[strike]["put_gamma_sum"]
-        net_gex = call_total_gamma_oi - put_total_gamma_oi
-        net_gex_map[strike] = round(net_gex * 1000)
-        call_oi_map[strike] = strike_map[strike]["call_oi_sum"]
-        put_oi_map[strike] = strike_map[strike]["put_oi_sum"]
-
-    sorted_strikes = sorted(net_gex_map.keys())
-    gex_values = [net_gex_map[s] for s in sorted_strikes]
-    call_oi_values = [call_oi_map[s] for s in sorted_strikes]
-    put_oi_values = [put_oi_map[s] for s in sorted_strikes]
-    total_net_gex = sum(gex_values)
+    total_net_gex = snapshot.total_net_gex
     current_time_hhmm = now_ist.strftime('%H:%M')
 
-    gex_below = sum(abs(gex) for strike, gex in net_gex_map.items() if strike < price)
-    gex_above = sum(abs(gex) for strike, gex in net_gex_map.items() if strike > price)
-    gex_total = gex_below + gex_above
-    if gex_total > 0 and gex_below > 0:
-        ratio = (gex_above / gex_below)*100
-        ratio_str = f"{ratio:.0f}%"
-    else:
-        ratio = None
-        ratio_str = "N/A"
-
-    largest_gex_strike = max(net_gex_map, key=lambda x: abs(net_gex_map[x]))
+    gex_below = snapshot.gex_below
+    gex_above = snapshot.gex_above
+    ratio = snapshot.ratio
+    ratio_str = f"{ratio:.0f}%" if ratio is not None else "N/A"
+
+    largest_gex_strike = snapshot.largest_gex_strike
     distance_to_largest_gex = abs(price - largest_gex_strike)
 
     direction_line = ""
@@ -234,19 +411,15 @@ def calculate_gamma_exposure():
     elif price < largest_gex_strike:
         direction_line = f"👆🏻 by {int(distance_to_largest_gex)}"
 
-    # --- OI In The Money Calculations ---
-
-    # Call OI in the money = strikes BELOW price
-    total_call_oi = sum(call_oi_values)
-    call_oi_itm = sum(call_oi_map[s] for s in sorted_strikes if s < price)
-    call_oi_itm_pct = (call_oi_itm / total_call_oi) * 100 if total_call_oi > 0 else 0
-
-    # Put OI in the money = strikes ABOVE price
-    total_put_oi = sum(put_oi_values)
-    put_oi_itm = sum(put_oi_map[s] for s in sorted_strikes if s > price)
-    put_oi_itm_pct = (put_oi_itm / total_put_oi) * 100 if total_put_oi > 0 else 0
+    # OI in the money: calls struck below price, puts struck above price
+    call_oi_itm_pct = snapshot.call_oi_itm_pct
+    put_oi_itm_pct = snapshot.put_oi_itm_pct
 
-    # --- END OI In The Money Calculations ---
+    # GEX repriced over hypothetical spot levels and the zero-gamma flip
+    spot_grid = np.linspace(lower_strike_bound, upper_strike_bound, GAMMA_GRID_POINTS)
+    spot_profile, zero_gamma = snapshot.zero_gamma_level(spot_grid, int(now_utc.timestamp() * 1000))
+    zero_gamma_line = f"Zero gamma: {zero_gamma:,.0f}" if zero_gamma is not None else "Zero gamma: N/A"
+    print(zero_gamma_line)
 
     sheet_row = [
         now_ist.strftime("%Y-%m-%d %H:%M:%S"),
@@ -259,66 +432,18 @@ def calculate_gamma_exposure():
         direction_line,
         total_net_gex
     ]
-    append_gex_data_to_sheet(sheet_row)
-
-    temp_dir = "/tmp"
-    output_filename = "current_gex_chart.png"
-    temp_filepath = os.path.join(temp_dir, output_filename)
+    TIMINGS.lap('compute GEX + zero gamma')
+    store = GexStore()
+    store.append(now_utc.timestamp() * 1000, target_expiry_ts, snapshot, sheet_row, zero_gamma=zero_gamma)
+    export_pending_rows_to_sheet(store, SHEET_EXPORT_BATCH)
+    store.close()
 
+    sheets_flushed = False
     try:
-        print("Generating and saving chart locally...")
-        plt.figure(figsize=(12, 7))
-
-        bar_width = min(abs(sorted_strikes[i+1]-sorted_strikes[i]) for i in range(len(sorted_strikes)-1)) * 0.8 if len(sorted_strikes) > 1 else 1000
-
-        # SEPARATED bars: Call OI (red, left), Put OI (green, right)
-        shift = bar_width / 5
-
-        plt.bar(
-            [s - shift for s in sorted_strikes],
-            call_oi_values,
-            width=bar_width/2,
-            color='red',
-            alpha=0.6,
-            label='Call OI'
-        )
-        plt.bar(
-            [s + shift for s in sorted_strikes],
-            put_oi_values,
-            width=bar_width/2,
-            color='green',
-            alpha=0.6,
-            label='Put OI'
-        )
-
-        # GEX as a blue line with data labels
-        plt.plot(sorted_strikes, gex_values, color='blue', marker='o', linewidth=2, label='Net GEX')
-        for x, y in zip(sorted_strikes, gex_values):
-            plt.text(x, y, f"{y}", fontsize=10, color='blue', ha='center', va='bottom' if y >= 0 else 'top')
-
-        # OI ITM overlay top left
-        plt.gcf().text(
-            0.01, 0.97,
-            f"Call OI ITM: {call_oi_itm_pct:.1f}%\nPut OI ITM: {put_oi_itm_pct:.1f}%",
-            fontsize=12,
-            color='black',
-            ha='left',
-            va='top',
-            bbox=dict(boxstyle="round,pad=0.5", fc="white", ec="gray", alpha=0.7)
-        )
-
-        plt.axhline(0, color='gray', linestyle='--', linewidth=0.8)
-        plt.axvline(price, color='red', linestyle=':', linewidth=2, label=f'Current BTC Price (${price:,.0f})')
-        plt.title('BTC GEX for next expiry', fontsize=14)
-        plt.xlabel('Strike Price', fontsize=12)
-        plt.ylabel('Net Gamma Exposure (BTC Eq) & OI', fontsize=12)
-        plt.xticks(sorted_strikes, rotation=90, ha='right')
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
-        plt.legend()
-        plt.tight_layout()
-        plt.savefig(temp_filepath)
-        print(f"Plot saved locally to: {temp_filepath}")
-        plt.close()
+        print("Rendering chart...")
+        png_bytes = get_chart_renderer().render(snapshot, spot_grid, spot_profile, zero_gamma)
+        print(f"Chart rendered ({len(png_bytes) / 1024:.0f} KiB).")
+        TIMINGS.lap('render chart')
 
         no_trade_line=""
         if ratio is not None and 80 <= ratio <= 120:
@@ -328,7 +453,6 @@ def calculate_gamma_exposure():
         elif ratio is not None and ratio > 120:
             no_trade_line = "👆🏻 Bullish bias\n"
 
-        telegram_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
         caption = (
             f"GEX below: {gex_below}\n"
             f"GEX above: {gex_above}\n"
@@ -338,30 +462,55 @@ def calculate_gamma_exposure():
             f"----\n"
             f"{direction_line} upto {largest_gex_strike:.0f}\n"
             f"Net GEX: {total_net_gex:,.0f}\n"
+            f"{zero_gamma_line}\n"
             f"Call OI ITM: {call_oi_itm_pct:.1f}% | Put OI ITM: {put_oi_itm_pct:.1f}%"
         )
 
-        with open(temp_filepath, 'rb') as photo_file:
-            files = {'photo': photo_file}
-            data = {'chat_id': TELEGRAM_CHAT_ID, 'caption': caption}
-            print("Sending chart to Telegram...")
-            response = requests.post(telegram_url, files=files, data=data)
-            response.raise_for_status()
-            print(f"Chart sent to Telegram. Response: {response.json()}")
-
-        print(f"Uploading chart to S3 bucket: {S3_BUCKET_NAME}...")
-        upload_to_s3(temp_filepath, S3_BUCKET_NAME, LATEST_CHART_KEY)
+        print("Delivering chart to Telegram and S3 and flushing Google Sheet rows in parallel...")
+        results = deliver([
+            # sendPhoto is not idempotent: re-posting after a read timeout or a 5xx can post the chart twice.
+            # SESSION already retries the POST where Telegram cannot have received it (429, connect timeout).
+            Sink('Telegram', functools.partial(send_telegram_photo, png_bytes, caption),
+                 timeout=TELEGRAM_TIMEOUT, retries=0),
+            Sink('S3', functools.partial(upload_png_to_s3, png_bytes, S3_BUCKET_NAME, LATEST_CHART_KEY),
+                 timeout=S3_TIMEOUT),
+            # The writer retries on its own; this sink only waits for the queue to drain.
+            Sink('Sheets', functools.partial(SHEET_WRITER.drain, SHEET_DRAIN_TIMEOUT),
+                 timeout=SHEET_DRAIN_TIMEOUT + 1, retries=0),
+        ])
+        sheets_flushed = True
+        print("Delivery results:")
+        print_delivery_report(results)
+        TIMINGS.lap('deliver (Telegram, S3, Sheets)')
     except Exception as e:
-        print(f"Error generating plot, sending to Telegram, or uploading to S3: {e}")
+        print(f"Error generating plot or delivering the chart: {e}")
         import traceback
         traceback.print_exc()
-    finally:
-        if os.path.exists(temp_filepath):
-            os.remove(temp_filepath)
-            print(f"Cleaned up temporary file: {temp_filepath}")
+
+    if not sheets_flushed and not SHEET_WRITER.drain(SHEET_DRAIN_TIMEOUT):
+        print(f"Google Sheet rows still pending after {SHEET_DRAIN_TIMEOUT:.0f}s; they stay queued in the local store.")
 
     print("Data collection cycle completed successfully.")
     print("==================================================")
 
+def main(argv=None):
+    """Command-line entry point; prints import/init and cycle phase timings on exit."""
+    import argparse
+    parser = argparse.ArgumentParser(description="BTC GEX monitor")
+    parser.add_argument('--term-structure', action='store_true',
+                        help="aggregate GEX across every listed expiry instead of the next one")
+    parser.add_argument('--output', metavar='CSV', help="with --term-structure, write the strike x expiry matrix here")
+    args = parser.parse_args(argv)
+
+    TIMINGS.lap('startup')
+    try:
+        if args.term_structure:
+            calculate_term_structure(args.output)
+        else:
+            calculate_gamma_exposure()
+    finally:
+        TIMINGS.report()
+        SESSION.print_latency_report()
+
 if __name__ == "__main__":
-    calculate_gamma_exposure()
+    main()
@@ -0,0 +1,93 @@
+"""Columnar GEX engine.
+
+A GexSnapshot holds one row per option (strike, call/put, gamma, OI) in
+NumPy arrays and derives everything the monitor reports -- net GEX per
+strike, the GEX below/above price and their ratio, the largest-|GEX| strike
+and the in-the-money OI percentages -- as single vectorized reductions, so
+the cost stays flat whether it is fed a ±PRICE_RANGE_POINTS window or the
+full chain. With mark IV and expiry columns it can also reprice the chain's
+gamma over a grid of hypothetical spot levels to find the zero-gamma flip.
+"""
+import numpy as np
+
+from gex_greeks import MS_PER_YEAR, gex_profile, zero_gamma_level
+
+class GexSnapshot:
+    """Per-option columns plus per-strike aggregates for one spot price."""
+
+    def __init__(self, strike, is_call, gamma, oi, price, iv=None, expiry=None):
+        self.strike = np.asarray(strike, dtype=float)
+        self.is_call = np.asarray(is_call, dtype=bool)
+        self.gamma = np.asarray(gamma, dtype=float)
+        self.oi = np.asarray(oi, dtype=float)
+        self.price = float(price)
+        # Optional columns for repricing: mark IV in percent, expiry in epoch ms.
+        self.iv = np.full(len(self.strike), np.nan) if iv is None else np.asarray(iv, dtype=float)
+        self.expiry = np.zeros(len(self.strike), dtype=np.int64) if expiry is None else np.asarray(expiry, dtype=np.int64)
+
+        # Per-strike aggregation: unique() sorts the strikes and maps every
+        # option to its strike slot, bincount sums each column per slot.
+        self.strikes, slot = np.unique(self.strike, return_inverse=True)
+        n = len(self.strikes)
+        signed_gamma_oi = np.where(self.is_call, 1.0, -1.0) * self.gamma * self.oi
+        self.net_gex = np.rint(np.bincount(slot, weights=signed_gamma_oi, minlength=n) * 1000).astype(np.int64)
+        self.call_oi = np.bincount(slot, weights=np.where(self.is_call, self.oi, 0.0), minlength=n)
+        self.put_oi = np.bincount(slot, weights=np.where(self.is_call, 0.0, self.oi), minlength=n)
+
+    @classmethod
+    def from_instruments(cls, instruments, greeks, price):
+        """Build from instrument dicts and a {instrument_name: {'gamma', 'oi', 'mark_iv'}} map; missing names are skipped."""
+        rows = [(i["strike"], i["option_type"] == "call", g["gamma"], g["oi"],
+                 np.nan if g.get("mark_iv") is None else g["mark_iv"], i["expiration_timestamp"])
+                for i in instruments for g in (greeks.get(i["instrument_name"]),) if g is not None]
+        strike, is_call, gamma, oi, iv, expiry = zip(*rows) if rows else ((),) * 6
+        return cls(strike, is_call, gamma, oi, price, iv=iv, expiry=expiry)
+
+    def __len__(self):
+        return len(self.strikes)
+
+    @property
+    def total_net_gex(self):
+        return int(self.net_gex.sum())
+
+    @property
+    def gex_below(self):
+        return int(np.abs(self.net_gex[self.strikes < self.price]).sum())
+
+    @property
+    def gex_above(self):
+        return int(np.abs(self.net_gex[self.strikes > self.price]).sum())
+
+    @property
+    def ratio(self):
+        """GEX above as a percentage of GEX below, or None when there is nothing below."""
+        below = self.gex_below
+        return self.gex_above / below * 100 if below > 0 else None
+
+    @property
+    def largest_gex_strike(self):
+        if not len(self.strikes):
+            return None
+        return float(self.strikes[np.argmax(np.abs(self.net_gex))])
+
+    @property
+    def call_oi_itm_pct(self):
+        """Share of call OI struck below price."""
+        total = self.call_oi.sum()
+        return float(self.call_oi[self.strikes < self.price].sum() / total * 100) if total > 0 else 0
+
+    @property
+    def put_oi_itm_pct(self):
+        """Share of put OI struck above price."""
+        total = self.put_oi.sum()
+        return float(self.put_oi[self.strikes > self.price].sum() / total * 100) if total > 0 else 0
+
+    def spot_profile(self, spot_grid, now_ms):
+        """Net GEX at each hypothetical spot level, with gamma repriced from strike, expiry and mark IV."""
+        t = np.maximum(self.expiry - now_ms, 0) / MS_PER_YEAR
+        return gex_profile(spot_grid, self.strike, self.is_call, self.iv / 100, t, self.oi)
+
+    def zero_gamma_level(self, spot_grid, now_ms):
+        """(profile, flip level) over spot_grid; the level is None when GEX keeps one sign."""
+        profile = self.spot_profile(spot_grid, now_ms)
+        return profile, zero_gamma_level(spot_grid, profile, spot=self.price)
@@ -0,0 +1,118 @@
+"""Local append-only store of GEX snapshots (SQLite).
+
+Every cycle is one row: the summary numbers that go to the Google Sheet,
+the sheet row itself, and the full per-strike arrays (strike, net GEX, call
+OI, put OI) packed as float64 blobs. Rows are indexed by timestamp and by
+(expiry, timestamp) so history range queries stay cheap, and an `exported`
+flag lets the Sheets exporter push everything it has not sent yet in a
+single batched append.
+"""
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+GEX_STORE_PATH = os.environ.get(
+    'GEX_STORE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gex_snapshots.sqlite'))
+
+ARRAY_COLUMNS = ('strikes', 'net_gex', 'call_oi', 'put_oi')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    expiry INTEGER NOT NULL,
+    price REAL NOT NULL,
+    gex_below INTEGER,
+    gex_above INTEGER,
+    ratio REAL,
+    largest_gex_strike REAL,
+    total_net_gex INTEGER,
+    zero_gamma REAL,
+    call_oi_itm_pct REAL,
+    put_oi_itm_pct REAL,
+    sheet_row TEXT NOT NULL,
+    exported INTEGER NOT NULL DEFAULT 0,
+    strikes BLOB,
+    net_gex BLOB,
+    call_oi BLOB,
+    put_oi BLOB
+);
+CREATE INDEX IF NOT EXISTS snapshots_ts ON snapshots (ts);
+CREATE INDEX IF NOT EXISTS snapshots_expiry_ts ON snapshots (expiry, ts);
+CREATE INDEX IF NOT EXISTS snapshots_pending ON snapshots (id) WHERE exported = 0;
+"""
+
+def _pack(values):
+    return np.asarray(values, dtype=np.float64).tobytes()
+
+def _unpack(blob):
+    return np.frombuffer(blob, dtype=np.float64) if blob is not None else np.empty(0)
+
+class GexStore:
+    """Append-only SQLite log of GEX snapshots with range queries."""
+
+    def __init__(self, path=GEX_STORE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def append(self, ts_ms, expiry_ts, snapshot, sheet_row, zero_gamma=None):
+        """Record one cycle's GexSnapshot and its sheet row; returns the row id."""
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO snapshots (ts, expiry, price, gex_below, gex_above, ratio, largest_gex_strike,"
+                " total_net_gex, zero_gamma, call_oi_itm_pct, put_oi_itm_pct, sheet_row,"
+                " strikes, net_gex, call_oi, put_oi) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (int(ts_ms), int(expiry_ts), snapshot.price, snapshot.gex_below, snapshot.gex_above,
+                 snapshot.ratio, snapshot.largest_gex_strike, snapshot.total_net_gex, zero_gamma,
+                 snapshot.call_oi_itm_pct, snapshot.put_oi_itm_pct, json.dumps(sheet_row),
+                 _pack(snapshot.strikes), _pack(snapshot.net_gex), _pack(snapshot.call_oi),
+                 _pack(snapshot.put_oi)))
+        return cursor.lastrowid
+
+    def query(self, start_ms=None, end_ms=None, expiry=None, with_arrays=True):
+        """Snapshots with start_ms <= ts < end_ms (optionally for one expiry), oldest first.
+
+        Each result is a dict of the summary columns; with_arrays adds the
+        per-strike arrays as NumPy float64 arrays.
+        """
+        columns = "id, ts, expiry, price, gex_below, gex_above, ratio, largest_gex_strike, total_net_gex," \
+                  " zero_gamma, call_oi_itm_pct, put_oi_itm_pct"
+        if with_arrays:
+            columns += ", " + ", ".join(ARRAY_COLUMNS)
+        clauses, params = [], []
+        if expiry is not None:
+            clauses.append("expiry = ?")
+            params.append(int(expiry))
+        if start_ms is not None:
+            clauses.append("ts >= ?")
+            params.append(int(start_ms))
+        if end_ms is not None:
+            clauses.append("ts < ?")
+            params.append(int(end_ms))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = []
+        for row in self.conn.execute(f"SELECT {columns} FROM snapshots{where} ORDER BY ts", params):
+            record = dict(row)
+            if with_arrays:
+                for name in ARRAY_COLUMNS:
+                    record[name] = _unpack(record[name])
+            rows.append(record)
+        return rows
+
+    def pending_sheet_rows(self, limit=1000):
+        """(id, sheet_row) pairs not yet exported to Google Sheets, oldest first."""
+        cursor = self.conn.execute(
+            "SELECT id, sheet_row FROM snapshots WHERE exported = 0 ORDER BY id LIMIT ?", (limit,))
+        return [(row['id'], json.loads(row['sheet_row'])) for row in cursor]
+
+    def mark_exported(self, ids):
+        with self.conn:
+            self.conn.executemany("UPDATE snapshots SET exported = 1 WHERE id = ?", [(i,) for i in ids])
+
+    def close(self):
+        self.conn.close()
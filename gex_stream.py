@@ -0,0 +1,386 @@
+"""Long-running GEX monitor fed by Deribit WebSocket ticker channels.
+
+Instead of rebuilding everything from REST once per cron run, this keeps one
+WebSocket open, subscribes to BTC-PERPETUAL and to the ticker channel of
+every next-expiry option within ±PRICE_RANGE_POINTS of spot, and updates the
+per-strike net GEX as ticks arrive:
+
+    python gex_stream.py                      # live
+    python gex_stream.py --record ticks.jsonl # also save notifications for replay
+
+The subscription follows spot as it moves and is rebuilt when the expiry
+rolls. Point DERIBIT_WS_URL (or --url) at serve_replay() to run against
+recorded messages instead of the exchange.
+"""
+import asyncio
+import bisect
+import datetime
+import heapq
+import json
+import os
+import time
+
+import websockets
+
+from gex_monitor import (INSTRUMENT_CACHE, PRICE_RANGE_POINTS, IST, format_ts_to_label,
+                         get_next_expiry)
+
+WS_URL = os.environ.get('DERIBIT_WS_URL', "wss://www.deribit.com/ws/api/v2")
+TICKER_INTERVAL = '100ms'
+PERPETUAL = 'BTC-PERPETUAL'
+HEARTBEAT_SECONDS = 30
+RECONNECT_SECONDS = 5
+REPORT_INTERVAL = float(os.environ.get('GEX_STREAM_REPORT_INTERVAL', 5))
+CHAIN_RETRY_SECONDS = float(os.environ.get('GEX_CHAIN_RETRY_SECONDS', 60))   # reload interval while no expiry is found
+
+def ticker_channel(instrument_name):
+    return f"ticker.{instrument_name}.{TICKER_INTERVAL}"
+
+class GexBook:
+    """Net GEX per strike for one expiry, updated incrementally per tick.
+
+    Mirrors calculate_gamma_exposure: per-strike GEX is
+    round((call gamma*OI - put gamma*OI) * 1000), "below"/"above" sum the
+    absolute per-strike GEX on each side of price, and the largest strike is
+    the one with the biggest absolute GEX. Each tick touches one strike; a
+    price move only reclassifies the strikes it crossed.
+    """
+
+    def __init__(self, price):
+        self.price = price
+        self.instruments = {}   # name -> (strike, +1 call / -1 put)
+        self.exposure = {}      # name -> signed gamma * OI
+        self.by_strike = {}     # strike -> set of instrument names
+        self.strikes = []       # sorted strikes with at least one instrument
+        self.strike_gex = {}    # strike -> rounded net GEX
+        self.gex_below = 0
+        self.gex_above = 0
+        self.total_net_gex = 0
+        self._heap = []         # (-abs(gex), strike), stale entries skipped lazily
+
+    def add_instrument(self, instr):
+        name = instr["instrument_name"]
+        if name in self.instruments:
+            return
+        strike = instr["strike"]
+        self.instruments[name] = (strike, 1 if instr["option_type"] == "call" else -1)
+        self.exposure[name] = 0.0
+        if strike not in self.by_strike:
+            self.by_strike[strike] = set()
+            self.strike_gex[strike] = 0
+            bisect.insort(self.strikes, strike)
+        self.by_strike[strike].add(name)
+
+    def remove_instrument(self, name):
+        if name not in self.instruments:
+            return
+        strike, _ = self.instruments.pop(name)
+        del self.exposure[name]
+        self.by_strike[strike].discard(name)
+        self._refresh_strike(strike)
+        if not self.by_strike[strike]:
+            del self.by_strike[strike]
+            del self.strike_gex[strike]
+            self.strikes.pop(bisect.bisect_left(self.strikes, strike))
+
+    def update(self, name, gamma, oi):
+        """Apply a ticker update; returns False for instruments not in the book."""
+        if name not in self.instruments:
+            return False
+        strike, sign = self.instruments[name]
+        self.exposure[name] = sign * (gamma or 0.0) * (oi or 0)
+        self._refresh_strike(strike)
+        return True
+
+    def _side(self, strike, price):
+        return -1 if strike < price else (1 if strike > price else 0)
+
+    def _add_to_side(self, strike, value):
+        side = self._side(strike, self.price)
+        if side < 0:
+            self.gex_below += value
+        elif side > 0:
+            self.gex_above += value
+
+    def _refresh_strike(self, strike):
+        # Recompute from the (at most two) instruments at this strike so that
+        # floating-point error cannot accumulate across ticks.
+        new = round(sum(self.exposure[n] for n in self.by_strike[strike]) * 1000)
+        old = self.strike_gex[strike]
+        if new == old:
+            return
+        self.strike_gex[strike] = new
+        self.total_net_gex += new - old
+        self._add_to_side(strike, abs(new) - abs(old))
+        heapq.heappush(self._heap, (-abs(new), strike))
+        if len(self._heap) > 4 * len(self.strikes) + 16:
+            self._heap = [(-abs(g), s) for s, g in self.strike_gex.items()]
+            heapq.heapify(self._heap)
+
+    def set_price(self, price):
+        """Move spot, reclassifying only the strikes between the old and new price."""
+        old = self.price
+        if price == old:
+            return
+        lo = bisect.bisect_left(self.strikes, min(old, price))
+        hi = bisect.bisect_right(self.strikes, max(old, price))
+        for strike in self.strikes[lo:hi]:
+            self._add_to_side(strike, -abs(self.strike_gex[strike]))
+        self.price = price
+        for strike in self.strikes[lo:hi]:
+            self._add_to_side(strike, abs(self.strike_gex[strike]))
+
+    def largest_gex_strike(self):
+        while self._heap:
+            neg_abs, strike = self._heap[0]
+            if strike in self.strike_gex and abs(self.strike_gex[strike]) == -neg_abs:
+                return strike
+            heapq.heappop(self._heap)
+        return None
+
+    def summary(self):
+        if self.gex_below + self.gex_above > 0 and self.gex_below > 0:
+            ratio = self.gex_above / self.gex_below * 100
+        else:
+            ratio = None
+        return {
+            'price': self.price,
+            'gex_below': self.gex_below,
+            'gex_above': self.gex_above,
+            'ratio': ratio,
+            'largest_gex_strike': self.largest_gex_strike(),
+            'total_net_gex': self.total_net_gex,
+        }
+
+class GexStreamDaemon:
+    """Keep a GexBook current from Deribit ticker subscriptions."""
+
+    def __init__(self, url=WS_URL, price_range=PRICE_RANGE_POINTS, report_interval=REPORT_INTERVAL,
+                 load_instruments=INSTRUMENT_CACHE.get, clock=time.time, record_path=None, on_update=None,
+                 chain_retry=CHAIN_RETRY_SECONDS):
+        self.url = url
+        self.price_range = price_range
+        self.report_interval = report_interval
+        self.chain_retry = chain_retry
+        self.load_instruments = load_instruments
+        self.clock = clock
+        self.record_path = record_path
+        self.on_update = on_update
+
+        self.book = None
+        self.expiry_ts = None
+        self.chain = []          # next-expiry instruments sorted by strike
+        self.chain_strikes = []
+        self.subscribed = set()  # option instrument names currently subscribed
+        self._window = None
+        self._next_id = 0
+        self._last_report = 0.0
+        self._chain_loaded_at = 0.0
+        self._record_file = None
+
+    def _now_ms(self):
+        return int(self.clock() * 1000)
+
+    async def _send(self, ws, method, params):
+        self._next_id += 1
+        await ws.send(json.dumps({"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params}))
+
+    async def _load_chain(self):
+        # The instrument list is fetched over REST; keep that off the event loop so ticks keep flowing
+        try:
+            instruments = await asyncio.to_thread(self.load_instruments)
+        except Exception as e:
+            print(f"Instrument list fetch failed: {e!r}")
+            instruments = None
+        self._chain_loaded_at = self.clock()
+        self.expiry_ts = get_next_expiry(instruments, now_ms=self._now_ms()) if instruments else None
+        self.chain = sorted((i for i in instruments if i["expiration_timestamp"] == self.expiry_ts),
+                            key=lambda i: i["strike"]) if self.expiry_ts else []
+        self.chain_strikes = [i["strike"] for i in self.chain]
+        self._window = None
+        if self.expiry_ts:
+            print(f"Streaming {format_ts_to_label(self.expiry_ts)} expiry ({len(self.chain)} instruments listed).")
+        else:
+            print(f"No upcoming 08:00 UTC expiry found; reloading the chain in {self.chain_retry:g}s.")
+
+    async def _sync_subscriptions(self, ws):
+        """Subscribe/unsubscribe so that exactly the in-range options of the expiry are streamed."""
+        price = self.book.price
+        lo = bisect.bisect_left(self.chain_strikes, price - self.price_range)
+        hi = bisect.bisect_right(self.chain_strikes, price + self.price_range)
+        if (lo, hi) == self._window:
+            return
+        self._window = (lo, hi)
+        wanted = {i["instrument_name"]: i for i in self.chain[lo:hi]}
+        added = [name for name in wanted if name not in self.subscribed]
+        removed = [name for name in self.subscribed if name not in wanted]
+        for name in removed:
+            self.book.remove_instrument(name)
+        for name in added:
+            self.book.add_instrument(wanted[name])
+        if removed:
+            await self._send(ws, "public/unsubscribe", {"channels": [ticker_channel(n) for n in removed]})
+        if added:
+            await self._send(ws, "public/subscribe", {"channels": [ticker_channel(n) for n in added]})
+        self.subscribed = set(wanted)
+        print(f"Window {price - self.price_range:,.0f}-{price + self.price_range:,.0f}: "
+              f"+{len(added)} / -{len(removed)} channels, {len(self.subscribed)} options subscribed.")
+
+    async def _roll_expiry(self, ws):
+        if self.subscribed:
+            await self._send(ws, "public/unsubscribe", {"channels": [ticker_channel(n) for n in self.subscribed]})
+        self.subscribed = set()
+        price = self.book.price if self.book else None
+        await self._load_chain()
+        if price is not None:
+            self.book = GexBook(price)
+            if self.expiry_ts:
+                await self._sync_subscriptions(ws)
+
+    async def _handle(self, ws, message):
+        method = message.get("method")
+        if method == "heartbeat":
+            if message.get("params", {}).get("type") == "test_request":
+                await self._send(ws, "public/test", {})
+            return
+        if method != "subscription":
+            if "error" in message:
+                print(f"Deribit error: {message['error']}")
+            return
+
+        data = message["params"]["data"]
+        name = data.get("instrument_name")
+        if name == PERPETUAL:
+            price = data.get("mark_price")
+            if price is None:
+                return
+            if self.book is None:
+                self.book = GexBook(price)
+            else:
+                self.book.set_price(price)
+            if self.expiry_ts:
+                await self._sync_subscriptions(ws)
+        elif self.book is not None:
+            self.book.update(name, data.get("greeks", {}).get("gamma", 0.0), data.get("open_interest", 0))
+
+        if self.expiry_ts and self._now_ms() >= self.expiry_ts:
+            print("Expiry reached; rolling to the next expiry.")
+            await self._roll_expiry(ws)
+        elif not self.expiry_ts and self.clock() - self._chain_loaded_at >= self.chain_retry:
+            await self._roll_expiry(ws)
+        self._maybe_report()
+
+    def _maybe_report(self):
+        if self.book is None or not self.book.strikes:
+            return
+        now = self.clock()
+        if now - self._last_report < self.report_interval:
+            return
+        self._last_report = now
+        summary = self.book.summary()
+        summary['expiry_label'] = format_ts_to_label(self.expiry_ts)
+        if self.on_update:
+            self.on_update(summary)
+            return
+        stamp = datetime.datetime.fromtimestamp(now, tz=datetime.timezone.utc).astimezone(IST)
+        ratio_str = f"{summary['ratio']:.0f}%" if summary['ratio'] is not None else "N/A"
+        print(f"[{stamp.strftime('%H:%M:%S')}] {summary['expiry_label']} ${summary['price']:,.0f} | "
+              f"below {summary['gex_below']} above {summary['gex_above']} ratio {ratio_str} | "
+              f"largest {summary['largest_gex_strike']:.0f} | net {summary['total_net_gex']:,}")
+
+    async def run(self):
+        """Connect, subscribe and process ticks until cancelled; reconnects after drops."""
+        await self._load_chain()
+        if self.record_path:
+            self._record_file = open(self.record_path, 'a')
+        try:
+            while True:
+                try:
+                    async with websockets.connect(self.url, max_size=None) as ws:
+                        self.subscribed = set()
+                        self._window = None
+                        await self._send(ws, "public/set_heartbeat", {"interval": HEARTBEAT_SECONDS})
+                        await self._send(ws, "public/subscribe", {"channels": [ticker_channel(PERPETUAL)]})
+                        if self.book is not None and self.expiry_ts:
+                            await self._sync_subscriptions(ws)
+                        async for raw in ws:
+                            try:
+                                message = json.loads(raw)
+                                if self._record_file and message.get("method") == "subscription":
+                                    self._record_file.write(raw if isinstance(raw, str) else raw.decode())
+                                    self._record_file.write("\n")
+                                await self._handle(ws, message)
+                            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                                # One malformed message is skipped rather than dropping the connection
+                                print(f"Skipping malformed message ({e!r}): {str(raw)[:200]}")
+                except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+                    print(f"WebSocket connection lost ({e!r}); reconnecting in {RECONNECT_SECONDS}s...")
+                    await asyncio.sleep(RECONNECT_SECONDS)
+                except Exception as e:
+                    print(f"WebSocket stream failed ({e!r}); reconnecting in {RECONNECT_SECONDS}s...")
+                    await asyncio.sleep(RECONNECT_SECONDS)
+        finally:
+            if self._record_file:
+                self._record_file.close()
+
+async def serve_replay(messages, host="127.0.0.1", port=0, delay=0.0, drop_after=None, reject_first=False):
+    """Start a local stand-in for the Deribit WebSocket API.
+
+    Every JSON-RPC request is acknowledged, and once the client has
+    subscribed to BTC-PERPETUAL the recorded subscription notifications in
+    `messages` (dicts or JSON strings, e.g. from --record) are sent in order,
+    `delay` seconds apart. To exercise reconnects, `reject_first` answers
+    the first handshake with HTTP 503 and `drop_after` closes the first
+    connection after that many notifications; the next connection resumes
+    where it stopped. Returns the server; its URL is
+    f"ws://{host}:{server.sockets[0].getsockname()[1]}".
+    """
+    messages = [m if isinstance(m, str) else json.dumps(m) for m in messages]
+    sent = [0]          # notifications replayed so far, across connections
+    handshakes = [0]
+    connections = [0]
+
+    def process_request(connection, request):
+        handshakes[0] += 1
+        if reject_first and handshakes[0] == 1:
+            return connection.respond(503, "Service Unavailable\n")
+
+    async def handler(ws):
+        connections[0] += 1
+        first = connections[0] == 1
+        replaying = False
+        async for raw in ws:
+            request = json.loads(raw)
+            params = request.get("params", {})
+            await ws.send(json.dumps({"jsonrpc": "2.0", "id": request.get("id"),
+                                      "result": params.get("channels", "ok")}))
+            if not replaying and ticker_channel(PERPETUAL) in params.get("channels", []):
+                replaying = True
+                while sent[0] < len(messages):
+                    if first and drop_after is not None and sent[0] >= drop_after:
+                        await ws.close()
+                        return
+                    await ws.send(messages[sent[0]])
+                    sent[0] += 1
+                    await asyncio.sleep(delay)
+
+    return await websockets.serve(handler, host, port, process_request=process_request)
+
+def load_recorded_messages(path):
+    with open(path) as f:
+        return [line for line in (l.strip() for l in f) if line]
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Stream live BTC GEX from Deribit WebSocket tickers")
+    parser.add_argument('--url', default=WS_URL, help="WebSocket endpoint (default: %(default)s)")
+    parser.add_argument('--record', metavar='PATH', help="append every ticker notification to a JSONL file")
+    parser.add_argument('--report-interval', type=float, default=REPORT_INTERVAL,
+                        help="seconds between GEX summaries (default: %(default)s)")
+    args = parser.parse_args()
+
+    daemon = GexStreamDaemon(url=args.url, report_interval=args.report_interval, record_path=args.record)
+    try:
+        asyncio.run(daemon.run())
+    except KeyboardInterrupt:
+        print("Stopped.")
@@ -0,0 +1,66 @@
+"""Strike x expiry GEX matrix for the whole BTC option term structure.
+
+The grid is fixed up front from the instrument list (every listed strike and
+expiry), and option rows are added in chunks with np.add.at, so memory is
+bounded by strikes x expiries no matter how many instruments are streamed
+through or how they are batched.
+"""
+import csv
+
+import numpy as np
+
+class TermStructure:
+    """Accumulates signed gamma*OI per (strike, expiry) cell."""
+
+    def __init__(self, instruments):
+        self.strikes = np.unique(np.array([i["strike"] for i in instruments], dtype=float))
+        self.expiries = np.unique(np.array([i["expiration_timestamp"] for i in instruments], dtype=np.int64))
+        self._gamma_oi = np.zeros((len(self.strikes), len(self.expiries)))
+        self._oi = np.zeros((len(self.strikes), len(self.expiries)))
+        self.rows_added = 0
+
+    def add(self, strike, expiry, is_call, gamma, oi):
+        """Add a chunk of option rows (equal-length arrays) to the grid."""
+        strike = np.asarray(strike, dtype=float)
+        if not strike.size:
+            return
+        si = np.searchsorted(self.strikes, strike)
+        ei = np.searchsorted(self.expiries, np.asarray(expiry, dtype=np.int64))
+        oi = np.asarray(oi, dtype=float)
+        np.add.at(self._gamma_oi, (si, ei), np.where(is_call, 1.0, -1.0) * np.asarray(gamma, dtype=float) * oi)
+        np.add.at(self._oi, (si, ei), oi)
+        self.rows_added += strike.size
+
+    @property
+    def matrix(self):
+        """Net GEX per strike (rows) and expiry (columns), scaled like the single-expiry chart."""
+        return np.rint(self._gamma_oi * 1000).astype(np.int64)
+
+    @property
+    def per_strike(self):
+        """Net GEX per strike summed over expiries (sums of the rounded cells, like total_net_gex)."""
+        return self.matrix.sum(axis=1)
+
+    @property
+    def per_expiry(self):
+        return self.matrix.sum(axis=0)
+
+    @property
+    def cumulative_profile(self):
+        """Running total of per-strike net GEX from the lowest strike up."""
+        return np.cumsum(self.per_strike)
+
+    def active_strikes(self):
+        """Mask of strikes that carry open interest in any expiry."""
+        return self._oi.sum(axis=1) > 0
+
+    def write_csv(self, path, label_expiry):
+        """Write strike rows with one column per expiry plus the total and cumulative GEX."""
+        mask = self.active_strikes()
+        matrix = self.matrix[mask]
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['strike'] + [label_expiry(int(ts)) for ts in self.expiries] + ['total', 'cumulative'])
+            for strike, row, total, cumulative in zip(self.strikes[mask], matrix, self.per_strike[mask],
+                                                      np.cumsum(self.per_strike[mask])):
+                writer.writerow([f"{strike:.0f}"] + row.tolist() + [int(total), int(cumulative)])
@@ -0,0 +1,203 @@
+"""Shared HTTP client for Deribit, Delta Exchange and Telegram.
+
+One HttpClient wraps a keep-alive requests.Session, so repeated calls reuse
+pooled TLS connections. It also adds:
+
+  * a token-bucket rate limit per host (HOST_RATE_LIMITS, requests/second);
+  * retries with full-jitter exponential backoff on 429 and 5xx responses
+    and on connection errors, honouring Retry-After. POSTs are only retried
+    when the request cannot have been processed (429, connect failures);
+  * a latency histogram per endpoint (method, host and path, with tokens
+    scrubbed from Telegram URLs), printed by print_latency_report().
+
+The client exposes get/post/request with requests' signatures, so it
+drops in wherever a requests.Session was used.
+"""
+import random
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+# Sustained requests/second per host, kept under each venue's public limits;
+# the bucket allows bursts of the same size.
+HOST_RATE_LIMITS = {
+    'www.deribit.com': 20,
+    'api.india.delta.exchange': 10,
+    'api.telegram.org': 25,
+}
+DEFAULT_RATE_LIMIT = 10
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended.
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_TELEGRAM_TOKEN = re.compile(r'/bot[^/]+/')
+
+def endpoint_name(method, url):
+    """'GET www.deribit.com/api/v2/public/ticker': no query string, no bot token."""
+    parts = urlsplit(url)
+    return f"{method.upper()} {parts.hostname}{_TELEGRAM_TOKEN.sub('/bot<token>/', parts.path)}"
+
+class RateLimiter:
+    """Token bucket: acquire() blocks until a request may be sent."""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self.tokens = self.burst
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token; returns the seconds spent waiting for it."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1 - 1e-9:  # tolerance so float rounding cannot spin
+                    self.tokens = max(self.tokens - 1, 0.0)
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            self.sleep(delay)
+            waited += delay
+
+class LatencyHistogram:
+    """Bucketed request latencies plus error and retry counts for one endpoint."""
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.total = 0
+        self.errors = 0
+        self.retries = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds, ok=True):
+        ms = seconds * 1000
+        i = 0
+        while i < len(self.buckets_ms) and ms > self.buckets_ms[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += 1
+        self.errors += not ok
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q):
+        """Upper bound (ms) of the bucket holding the q-th percentile; the max for the open bucket."""
+        if not self.total:
+            return None
+        rank = q / 100 * self.total
+        seen = 0
+        for bound, count in zip(self.buckets_ms, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max_ms
+
+    def summary(self):
+        return (f"n={self.total} mean={self.sum_ms / self.total:.0f}ms p50<={self.percentile(50):.0f}ms "
+                f"p95<={self.percentile(95):.0f}ms p99<={self.percentile(99):.0f}ms max={self.max_ms:.0f}ms "
+                f"errors={self.errors} retries={self.retries}")
+
+class HttpClient:
+    """Pooled, rate-limited, retrying HTTP client with per-endpoint latency stats."""
+
+    def __init__(self, headers=None, pool_size=16, rate_limits=None, max_retries=3, backoff=0.5,
+                 max_backoff=8.0, timeout=15):
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.rate_limits = dict(HOST_RATE_LIMITS if rate_limits is None else rate_limits)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self._limiters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, host):
+        with self._lock:
+            if host not in self._limiters:
+                self._limiters[host] = RateLimiter(self.rate_limits.get(host, DEFAULT_RATE_LIMIT))
+            return self._limiters[host]
+
+    def histogram(self, endpoint):
+        with self._lock:
+            return self._histograms.setdefault(endpoint, LatencyHistogram())
+
+    def _retry_delay(self, attempt, response):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def request(self, method, url, endpoint=None, **kwargs):
+        """Send a request, retrying per the module rules; returns the last response or raises the last error."""
+        method = method.upper()
+        kwargs.setdefault('timeout', self.timeout)
+        endpoint = endpoint or endpoint_name(method, url)
+        histogram = self.histogram(endpoint)
+        limiter = self.limiter(urlsplit(url).hostname)
+        idempotent = method in IDEMPOTENT_METHODS
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire()
+            started = time.perf_counter()
+            response = error = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            histogram.record(time.perf_counter() - started,
+                             ok=response is not None and response.status_code < 400)
+
+            if response is not None:
+                retryable = response.status_code == 429 or (idempotent and response.status_code in RETRY_STATUSES)
+            else:
+                retryable = idempotent or isinstance(error, requests.ConnectTimeout)
+            if not retryable or attempt == self.max_retries:
+                if response is None:
+                    raise error
+                return response
+            delay = self._retry_delay(attempt, response)
+            reason = response.status_code if response is not None else type(error).__name__
+            print(f"{endpoint}: {reason}, retrying in {delay:.2f}s ({attempt + 1}/{self.max_retries})")
+            histogram.retries += 1
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def latency_report(self):
+        """One line per endpoint, busiest first."""
+        with self._lock:
+            items = sorted(self._histograms.items(), key=lambda item: -item[1].total)
+        return [f"{endpoint}: {histogram.summary()}" for endpoint, histogram in items if histogram.total]
+
+    def print_latency_report(self):
+        lines = self.latency_report()
+        if lines:
+            print("HTTP latency by endpoint:")
+            for line in lines:
+                print(f"  {line}")
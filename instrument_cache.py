@@ -0,0 +1,122 @@
+"""Cached, indexed Deribit option instrument list.
+
+The full BTC option list is large and only changes when Deribit lists new
+strikes or an expiry passes, so it is kept in memory and on disk for
+INSTRUMENT_CACHE_TTL seconds. The cache is also dropped as soon as the next
+08:00 UTC expiry it was built for is in the past. Instruments are indexed by
+expiration_timestamp and sorted by strike, so picking the options of one
+expiry within a strike range is a bisect, not a scan of the whole list.
+"""
+import bisect
+import datetime
+import json
+import os
+import time
+
+INSTRUMENT_CACHE_PATH = os.environ.get('GEX_INSTRUMENT_CACHE', '/tmp/deribit_btc_option_instruments.json')
+INSTRUMENT_CACHE_TTL = float(os.environ.get('GEX_INSTRUMENT_CACHE_TTL', 6 * 3600))
+
+# Only these fields are used downstream; trimming keeps the cache file small.
+CACHED_FIELDS = ('instrument_name', 'expiration_timestamp', 'strike', 'option_type')
+
+def first_0800_expiry(sorted_expiries, now_ms):
+    """First expiry after now_ms that falls on 08:00 UTC, or None."""
+    for ts in sorted_expiries[bisect.bisect_right(sorted_expiries, now_ms):]:
+        dt = datetime.datetime.fromtimestamp(ts/1000, tz=datetime.timezone.utc)
+        if dt.hour == 8 and dt.minute == 0:
+            return ts
+    return None
+
+class InstrumentCache:
+    """In-memory + on-disk instrument list with TTL and expiry-roll invalidation."""
+
+    def __init__(self, fetch, path=INSTRUMENT_CACHE_PATH, ttl=INSTRUMENT_CACHE_TTL, clock=time.time):
+        self.fetch = fetch
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self.instruments = []
+        self.fetched_at = None
+        self._by_expiry = {}     # expiration_timestamp -> (strikes, instruments), both sorted by strike
+        self._expiries = []
+        self._next_expiry = None
+
+    def _now_ms(self):
+        return int(self.clock() * 1000)
+
+    def _index(self, instruments, fetched_at):
+        self.instruments = [{k: i[k] for k in CACHED_FIELDS} for i in instruments]
+        self.fetched_at = fetched_at
+        groups = {}
+        for instr in self.instruments:
+            groups.setdefault(instr['expiration_timestamp'], []).append(instr)
+        self._by_expiry = {}
+        for ts, group in groups.items():
+            group.sort(key=lambda i: i['strike'])
+            self._by_expiry[ts] = ([i['strike'] for i in group], group)
+        self._expiries = sorted(self._by_expiry)
+        self._next_expiry = first_0800_expiry(self._expiries, self._now_ms())
+
+    def is_valid(self):
+        if self.fetched_at is None or not self.instruments:
+            return False
+        if self.clock() - self.fetched_at > self.ttl:
+            return False
+        # The list was built for an expiry that has now passed: strikes of
+        # the new front expiry may have been listed since.
+        return self._next_expiry is not None and self._next_expiry > self._now_ms()
+
+    def _load_from_disk(self):
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+            self._index(cached['instruments'], cached['fetched_at'])
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Ignoring unreadable instrument cache {self.path}: {e}")
+
+    def _save_to_disk(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'fetched_at': self.fetched_at, 'instruments': self.instruments}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not write instrument cache {self.path}: {e}")
+
+    def refresh(self):
+        """Fetch a fresh list; keep serving the stale one if the fetch fails."""
+        instruments = self.fetch()
+        if not instruments:
+            if self.instruments:
+                print("Instrument fetch failed; using the stale cached instrument list.")
+            return self.instruments
+        self._index(instruments, self.clock())
+        self._save_to_disk()
+        return self.instruments
+
+    def get(self):
+        """Return the instrument list, reloading from disk or Deribit when stale."""
+        if self.is_valid():
+            return self.instruments
+        if self.fetched_at is None:
+            self._load_from_disk()
+            if self.is_valid():
+                print(f"Loaded {len(self.instruments)} instruments from cache {self.path}")
+                return self.instruments
+        return self.refresh()
+
+    def next_expiry(self):
+        """Next 08:00 UTC expiry of the cached list."""
+        self.get()
+        return first_0800_expiry(self._expiries, self._now_ms())
+
+    def options_for_expiry(self, expiry_ts):
+        self.get()
+        return self._by_expiry.get(expiry_ts, ([], []))[1]
+
+    def options_in_range(self, expiry_ts, lower, upper):
+        """Options of expiry_ts with lower <= strike <= upper, sorted by strike."""
+        self.get()
+        strikes, group = self._by_expiry.get(expiry_ts, ([], []))
+        return group[bisect.bisect_left(strikes, lower):bisect.bisect_right(strikes, upper)]
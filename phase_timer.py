@@ -0,0 +1,36 @@
+"""Wall-clock timings for startup and cycle phases."""
+import contextlib
+import time
+
+class PhaseTimer:
+    """Collects (phase, seconds) pairs and prints them as one report."""
+
+    def __init__(self):
+        self.phases = []
+        self._last = time.perf_counter()
+
+    def record(self, name, seconds):
+        self.phases.append((name, seconds))
+
+    def lap(self, name):
+        """Record the time since the previous lap (or since the timer was created)."""
+        now = time.perf_counter()
+        self.record(name, now - self._last)
+        self._last = now
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time a block, e.g. a deferred import or client construction."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def report(self, title="Phase timings"):
+        if not self.phases:
+            return
+        print(f"{title}:")
+        width = max(len(name) for name, _ in self.phases)
+        for name, seconds in self.phases:
+            print(f"  {name:<{width}}  {seconds * 1000:8.1f} ms")
@@ -0,0 +1,130 @@
+"""Background Google Sheets writer.
+
+Authorizes once, keeps the worksheet handle, and appends queued rows in
+batches from a daemon thread with retry and exponential backoff, so a slow
+or failing Google API never holds up chart generation or Telegram delivery.
+The OAuth token is checked before each flush and the client is rebuilt once
+it has expired or the API rejects it. gspread and oauth2client are only
+imported on the writer thread, the first time a batch is flushed.
+"""
+import queue
+import threading
+import time
+
+SHEET_SCOPE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+
+class SheetWriter:
+    """Queue rows for one worksheet and flush them in batches off the caller's thread."""
+
+    def __init__(self, credentials_path, sheet_name, scope=SHEET_SCOPE, batch_size=100,
+                 max_retries=5, backoff=2.0, max_backoff=60.0):
+        self.credentials_path = credentials_path
+        self.sheet_name = sheet_name
+        self.scope = scope
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._creds = None
+        self._worksheet = None
+        self._queue = queue.Queue()
+        self._queued_ids = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _reset(self):
+        self._creds = None
+        self._worksheet = None
+
+    def worksheet(self):
+        """Cached worksheet handle; re-authorizes when the access token has expired."""
+        if self._creds is not None and getattr(self._creds, 'access_token_expired', False):
+            print("Google access token expired; re-authorizing.")
+            self._reset()
+        if self._worksheet is None:
+            import gspread
+            from oauth2client.service_account import ServiceAccountCredentials
+            self._creds = ServiceAccountCredentials.from_json_keyfile_name(self.credentials_path, self.scope)
+            self._worksheet = gspread.authorize(self._creds).open(self.sheet_name).sheet1
+        return self._worksheet
+
+    def enqueue(self, rows, on_flushed=None):
+        """Queue (row_id, row) pairs; on_flushed(row_ids) runs on the writer thread after each successful batch.
+
+        Ids already queued or in flight are ignored, so the same pending
+        store rows can be offered every cycle.
+        """
+        with self._lock:
+            fresh = [(row_id, row) for row_id, row in rows if row_id not in self._queued_ids]
+            self._queued_ids.update(row_id for row_id, _ in fresh)
+        for row_id, row in fresh:
+            self._queue.put((row_id, row, on_flushed))
+        self._ensure_thread()
+        return len(fresh)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="sheet-writer", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._flush(batch)
+            finally:
+                with self._lock:
+                    self._queued_ids.difference_update(row_id for row_id, _, _ in batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _flush(self, batch):
+        rows = [row for _, row, _ in batch]
+        delay = self.backoff
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                result = self.worksheet().append_rows(rows, value_input_option='USER_ENTERED')
+                print(f"Appended {len(rows)} row(s) to Google Sheet.")
+                print("Google Sheets API response:", result)
+                break
+            except Exception as e:
+                if getattr(getattr(e, 'response', None), 'status_code', None) == 401:
+                    self._reset()
+                if attempt == self.max_retries:
+                    print(f"Giving up on {len(rows)} Google Sheet row(s) after {attempt} attempts:", repr(e))
+                    return
+                print(f"Error appending to Google Sheet (attempt {attempt}/{self.max_retries}, retrying in {delay:g}s):", repr(e))
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+
+        callbacks = {}
+        for row_id, _, on_flushed in batch:
+            if on_flushed is not None:
+                callbacks.setdefault(on_flushed, []).append(row_id)
+        for on_flushed, ids in callbacks.items():
+            try:
+                on_flushed(ids)
+            except Exception as e:
+                print("Error in Google Sheet flush callback:", repr(e))
+
+    def drain(self, timeout=None):
+        """Wait up to timeout seconds for queued rows to be flushed; returns True when the queue is empty."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
@@ -0,0 +1,7 @@
+"""The bot modules import each other as top-level modules, as when run from Archive/."""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'Archive'))
@@ -0,0 +1,97 @@
+"""AccountMirror against serve_fake_exchange: event-by-event state, resync after reconnects, REST reconciliation."""
+import asyncio
+import threading
+import time
+from collections import namedtuple
+
+import pytest
+
+import account_mirror
+from account_mirror import AccountMirror, bracket_order_events, serve_fake_exchange
+
+Client = namedtuple('Client', 'api_key api_secret')
+CLIENT = Client('test-account-key-0001', 'test-secret')
+
+# open_trades('BTCUSD') after each event of bracket_order_events()
+BRACKET_CHECKS = [(1, 0.0), (2, 0.0), (3, 0.0), (2, 0.0), (2, 2.0), (1, 2.0), (1, 0.0), (0, 0.0)]
+
+@pytest.fixture(autouse=True)
+def fast_reconnect(monkeypatch):
+    monkeypatch.setattr(account_mirror, 'RECONNECT_SECONDS', 0.05)
+
+def mirror_replay(events, until, timeout=5.0, fetch_state=lambda client: ([], []), reconcile_seconds=3600,
+                  **server_options):
+    """Mirror CLIENT against serve_fake_exchange(events) until until(state) holds or `timeout` passes.
+
+    Returns the mirror, one (connect number, channel, action, open_trades) row per applied event and
+    the mirror's open_trades('BTCUSD') at the end, taken before the stream is torn down.
+    """
+    seen = []
+
+    async def run():
+        server = await serve_fake_exchange(events, {CLIENT.api_key: CLIENT.api_secret}, **server_options)
+        mirror = AccountMirror([CLIENT], url=f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}",
+                               reconcile_seconds=reconcile_seconds, fetch_state=fetch_state,
+                               on_event=lambda state, message: seen.append(
+                                   (mirror.connects, message['type'], message['action'], state.open_trades('BTCUSD'))))
+        task = asyncio.create_task(mirror.run())
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and not until(mirror.accounts[CLIENT.api_key]):
+            await asyncio.sleep(0.02)
+        final = mirror.open_trades(CLIENT.api_key, 'BTCUSD')
+        task.cancel()
+        server.close()
+        await server.wait_closed()
+        return mirror, final
+
+    mirror, final = asyncio.run(run())
+    return mirror, seen, final
+
+def test_bracket_trade_is_mirrored_event_by_event():
+    events = bracket_order_events()
+    mirror, seen, final = mirror_replay(events, lambda state: state.events >= len(events) + 2)
+    assert [row[1:] for row in seen[:2]] == [('orders', 'snapshot', None), ('positions', 'snapshot', (0, 0.0))]
+    assert [row[3] for row in seen[2:]] == BRACKET_CHECKS
+    assert final == (0, 0.0)
+    assert mirror.connects == 1
+
+def test_resyncs_from_snapshots_after_rejected_handshake_and_drop():
+    events = bracket_order_events()
+    # Dropped once the entry has filled: orders 102/103 rest and the position is open
+    mirror, seen, final = mirror_replay(events, lambda state: state.ready and not state.orders and state.events > 10,
+                                        reject_first=True, drop_after=5)
+    assert mirror.connects == 2   # the rejected handshake never connected
+    first = [row for row in seen if row[0] == 1]
+    second = [row for row in seen if row[0] == 2]
+    assert [row[3] for row in first[2:]] == BRACKET_CHECKS[:5]
+    # The new connection's snapshots carry the state so far; the remaining events follow
+    assert [row[1:] for row in second[:2]] == [('orders', 'snapshot', None), ('positions', 'snapshot', (2, 2.0))]
+    assert [row[3] for row in second[2:]] == BRACKET_CHECKS[5:]
+    assert final == (0, 0.0)
+
+def test_reconcile_keeps_a_matching_view_and_adopts_a_drifted_one():
+    events = bracket_order_events()[:5]   # entry filled, SL/TP resting, position 2
+    streamed = threading.Event()
+    rest_views = [
+        # Same as the stream: nothing to do
+        ([{'id': 102, 'state': 'pending'}, {'id': 103, 'state': 'pending'}],
+         [{'product_symbol': 'BTCUSD', 'size': 2}]),
+        # The stop fired and the stream missed it: REST wins
+        ([{'id': 103, 'state': 'pending', 'product_symbol': 'BTCUSD'}], []),
+    ]
+
+    def fetch_state(client):
+        streamed.wait(5)
+        return rest_views.pop(0) if rest_views else ([{'id': 103, 'state': 'pending', 'product_symbol': 'BTCUSD'}], [])
+
+    def done(state):
+        if state.events >= len(events) + 2:
+            streamed.set()
+        return state.drifts >= 1
+
+    mirror, _, final = mirror_replay(events, done, fetch_state=fetch_state, reconcile_seconds=0.1)
+    state = mirror.accounts[CLIENT.api_key]
+    assert state.drifts == 1
+    assert state.reconciled >= 2
+    assert sorted(state.orders) == [103] and state.positions == {}
+    assert final == (1, 0.0)
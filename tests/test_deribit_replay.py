@@ -0,0 +1,20 @@
+"""The recorded Deribit fixture replayed through both GEX fetch paths."""
+import os
+
+import deribit_replay
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'fixtures', 'deribit_btc_options.json')
+
+def test_bulk_and_ticker_net_gex_agree_within_tolerance():
+    assert deribit_replay.compare(FIXTURE) == []
+
+def test_replay_selects_the_cycle_options(monkeypatch):
+    import gex_monitor
+    session = deribit_replay.ReplaySession(FIXTURE)
+    monkeypatch.setattr(gex_monitor, 'SESSION', session)
+    price, expiry_label, options = deribit_replay._select_options(gex_monitor, now_ms=session.recorded_at_ms)
+    assert expiry_label == '10OCT25'
+    assert options == sorted(options, key=lambda i: i['strike'])
+    assert all(abs(i['strike'] - price) <= gex_monitor.PRICE_RANGE_POINTS for i in options)
+    assert len(options) == 24
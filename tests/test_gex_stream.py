@@ -0,0 +1,85 @@
+"""GexStreamDaemon against serve_replay, checked against the REST cycle's numbers for the same fixture."""
+import asyncio
+import os
+import time
+
+import pytest
+
+import deribit_replay
+import gex_monitor
+import gex_stream
+from gex_snapshot import GexSnapshot
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'fixtures', 'deribit_btc_options.json')
+
+@pytest.fixture
+def replay(monkeypatch):
+    session = deribit_replay.ReplaySession(FIXTURE)
+    monkeypatch.setattr(gex_monitor, 'SESSION', session)
+    return session
+
+def notification(data):
+    return {"jsonrpc": "2.0", "method": "subscription",
+            "params": {"channel": f"ticker.{data['instrument_name']}.100ms", "data": data}}
+
+def fixture_messages(session):
+    """The perpetual's ticker, then every recorded option ticker."""
+    tickers = [body["result"] for key, body in session.responses.items() if key.startswith("/public/ticker?")]
+    perpetual = [t for t in tickers if t["instrument_name"] == gex_stream.PERPETUAL]
+    return [notification(t) for t in perpetual + [t for t in tickers if t not in perpetual]]
+
+def rest_summary(session):
+    """What calculate_gamma_exposure reports for the fixture over the ticker path."""
+    price, _, options = deribit_replay._select_options(gex_monitor, now_ms=session.recorded_at_ms)
+    greeks, failed = gex_monitor.fetch_greeks_and_oi_batch([i["instrument_name"] for i in options])
+    assert not failed
+    snapshot = GexSnapshot.from_instruments(options, greeks, price)
+    return {'price': price, 'gex_below': snapshot.gex_below, 'gex_above': snapshot.gex_above,
+            'largest_gex_strike': snapshot.largest_gex_strike, 'total_net_gex': snapshot.total_net_gex}
+
+def stream(session, messages, expected, timeout=5.0, **server_options):
+    """Run the daemon against serve_replay(messages) until its summary matches `expected` or `timeout` passes."""
+    instruments = session.responses["/public/get_instruments?currency=BTC&kind=option&expired=false"]["result"]
+    updates = []
+
+    async def run():
+        server = await gex_stream.serve_replay(messages, **server_options)
+        daemon = gex_stream.GexStreamDaemon(
+            url=f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}", report_interval=0,
+            load_instruments=lambda: instruments, clock=lambda: session.recorded_at_ms / 1000,
+            on_update=updates.append)
+        task = asyncio.create_task(daemon.run())
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and not (updates and summary_of(updates[-1]) == expected):
+            await asyncio.sleep(0.02)
+        task.cancel()
+        server.close()
+        await server.wait_closed()
+        return daemon
+
+    daemon = asyncio.run(run())
+    return daemon, summary_of(updates[-1]) if updates else None
+
+def summary_of(update):
+    return {k: update[k] for k in ('price', 'gex_below', 'gex_above', 'largest_gex_strike', 'total_net_gex')}
+
+def test_streamed_gex_matches_the_rest_cycle(replay):
+    expected = rest_summary(replay)
+    daemon, summary = stream(replay, fixture_messages(replay), expected)
+    assert summary == expected
+    assert len(daemon.subscribed) == 24
+
+def test_reconnects_and_resumes_after_rejected_handshake_and_drop(replay, monkeypatch, capsys):
+    monkeypatch.setattr(gex_stream, 'RECONNECT_SECONDS', 0.05)
+    expected = rest_summary(replay)
+    messages = fixture_messages(replay)
+    messages[3:3] = ["garbage{", {"jsonrpc": "2.0", "method": "subscription", "params": {"data": None}}]
+    daemon, summary = stream(replay, messages, expected, reject_first=True, drop_after=8)
+    assert summary == expected
+    out = capsys.readouterr().out
+    assert "WebSocket connection lost" in out and "503" in out
+    assert out.count("Skipping malformed message") == 2
+    # The in-range options are subscribed again on the connection after the drop
+    assert out.count("+24 / -0 channels") == 2
+    assert len(daemon.subscribed) == 24
@@ -0,0 +1,39 @@
+"""IndicatorEngine and the whole-history columns against `ta`, as the bots computed them before."""
+import os
+
+import numpy as np
+
+from indicators import IndicatorEngine, demo_indicators, indicator_columns, load_candles, parity, random_walk_candles
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'fixtures', 'delta_btcusd_5m_candles.json')
+RTOL = 1e-9   # relative; the recursions are the same arithmetic as `ta`, so only float rounding may differ
+
+def assert_parity(candles):
+    errors = parity(candles, rtol=RTOL)
+    failed = {column: err for column, err in errors.items() if not err <= RTOL}
+    assert not failed, f"max relative error above {RTOL:g}: {failed}"
+
+def test_fixture_candles_match_ta():
+    candles = load_candles(FIXTURE)
+    assert len(candles) == 600
+    assert np.all(np.diff(candles['time']) == 300)
+    assert_parity(candles)
+
+def test_random_walk_candles_match_ta():
+    assert_parity(random_walk_candles(3000))
+
+def test_revised_pending_bars_do_not_leak_into_state():
+    candles = load_candles(FIXTURE)
+    engine = IndicatorEngine(demo_indicators)
+    for end in list(range(50, len(candles), 7)) + [len(candles)]:
+        # The tail is first seen with provisional values, then revised, as CandleStore does
+        provisional = candles[:end].copy()
+        provisional['close'][-1] *= 1.01
+        provisional['high'][-1] *= 1.02
+        engine.sync(provisional)
+        rows = engine.sync(candles[:end])
+    expected = indicator_columns(candles, demo_indicators)
+    for column, values in expected.items():
+        got = np.array([row[column] for row in rows], dtype=float)
+        assert np.allclose(got, values[-len(got):], rtol=RTOL, atol=0, equal_nan=True), column